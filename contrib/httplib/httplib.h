@@ -142,10 +142,15 @@ struct Request {
 };
 
 struct Response {
+    // data is sent to client as one chunk, false if connection is broken
+    typedef std::function<bool (const char* data, size_t size)> DataSink;
+    typedef std::function<void (const DataSink& sink)> ChunkedContentProvider;
+
     std::string version;
     int         status;
     Headers     headers;
     std::string body;
+    ChunkedContentProvider chunked_content_provider;
 
     bool has_header(const char* key) const;
     std::string get_header_value(const char* key) const;
@@ -154,6 +159,9 @@ struct Response {
     void set_redirect(const char* url);
     void set_content(const char* s, size_t n, const char* content_type);
     void set_content(const std::string& s, const char* content_type);
+    // body is produced by provider while response is written, with chunked
+    // transfer encoding (collected into body for HTTP/1.0 clients)
+    void set_chunked_content_provider(ChunkedContentProvider provider, const char* content_type);
 
     Response() : status(-1) {}
 };
@@ -729,8 +737,10 @@ inline const char* status_message(int status)
     switch (status) {
     case 200: return "OK";
     case 400: return "Bad Request";
+    case 403: return "Forbidden";
     case 404: return "Not Found";
     case 415: return "Unsupported Media Type";
+    case 503: return "Service Unavailable";
     default:
         case 500: return "Internal Server Error";
     }
@@ -862,8 +872,10 @@ inline bool read_content_chunked(Stream& strm, std::string& out)
     return true;
 }
 
+// untilEof: body without Content-Length and chunked encoding lasts until
+// connection is closed (responses); a request without them has no body
 template <typename T>
-bool read_content(Stream& strm, T& x, Progress progress = Progress())
+bool read_content(Stream& strm, T& x, Progress progress = Progress(), bool untilEof = true)
 {
     auto len = get_header_value_int(x.headers, "Content-Length", 0);
 
@@ -874,7 +886,7 @@ bool read_content(Stream& strm, T& x, Progress progress = Progress())
 
         if (!strcasecmp(encoding, "chunked")) {
             return read_content_chunked(strm, x.body);
-        } else {
+        } else if (untilEof && !x.has_header("Content-Length")) {
             return read_content_without_length(strm, x.body);
         }
     }
@@ -1349,6 +1361,12 @@ inline void Response::set_content(const std::string& s, const char* content_type
     set_header("Content-Type", content_type);
 }
 
+inline void Response::set_chunked_content_provider(ChunkedContentProvider provider, const char* content_type)
+{
+    chunked_content_provider = provider;
+    set_header("Content-Type", content_type);
+}
+
 // Rstream implementation
 template <typename ...Args>
 inline void Stream::write_format(const char* fmt, const Args& ...args)
@@ -1545,7 +1563,24 @@ inline void Server::write_response(Stream& strm, bool last_connection, const Req
         res.set_header("Connection", "close");
     }
 
-    if (!res.body.empty()) {
+    bool chunked = false;
+    if (res.chunked_content_provider && req.method != "HEAD") {
+        if (req.version == "HTTP/1.0") {
+            res.chunked_content_provider([&res](const char* data, size_t size) {
+                res.body.append(data, size);
+                return true;
+            });
+        } else {
+            chunked = true;
+            res.set_header("Transfer-Encoding", "chunked");
+        }
+    }
+
+    if (chunked) {
+        if (!res.has_header("Content-Type")) {
+            res.set_header("Content-Type", "text/plain");
+        }
+    } else if (!res.body.empty()) {
 #ifdef CPPHTTPLIB_ZLIB_SUPPORT
         // TODO: 'Accpet-Encoding' has gzip, not gzip;q=0
         const auto& encodings = req.get_header_value("Accept-Encoding");
@@ -1567,7 +1602,16 @@ inline void Server::write_response(Stream& strm, bool last_connection, const Req
     detail::write_headers(strm, res);
 
     // Body
-    if (!res.body.empty() && req.method != "HEAD") {
+    if (chunked) {
+        res.chunked_content_provider([&strm](const char* data, size_t size) {
+            if (size == 0) {
+                return true;
+            }
+            strm.write_format("%lx\r\n", (unsigned long)size);
+            return strm.write(data, size) == (int)size && strm.write("\r\n") == 2;
+        });
+        strm.write("0\r\n\r\n");
+    } else if (!res.body.empty() && req.method != "HEAD") {
         strm.write(res.body.c_str(), res.body.size());
     }
 
@@ -1764,7 +1808,7 @@ inline bool Server::process_request(Stream& strm, bool last_connection, bool& co
 
     // Body
     if (req.method == "POST" || req.method == "PUT") {
-        if (!detail::read_content(strm, req)) {
+        if (!detail::read_content(strm, req, Progress(), false)) {
             res.status = 400;
             write_response(strm, last_connection, req, res);
             return ret;
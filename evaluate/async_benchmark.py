@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import asyncio
+import codecs
+import time
+
+import jamspell
+
+
+async def measureLoopLag(stopEvent, interval, lags):
+    loop = asyncio.get_running_loop()
+    while not stopEvent.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - start - interval))
+
+
+async def runLoad(fixFunc, texts, concurrency):
+    queue = list(reversed(texts))
+
+    async def worker():
+        while queue:
+            await fixFunc(queue.pop())
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+
+async def benchmark(name, fixFunc, texts, concurrency, lagInterval=0.001):
+    stopEvent = asyncio.Event()
+    lags = []
+    lagTask = asyncio.ensure_future(measureLoopLag(stopEvent, lagInterval, lags))
+    startTime = time.time()
+    await runLoad(fixFunc, texts, concurrency)
+    totalTime = time.time() - startTime
+    stopEvent.set()
+    await lagTask
+    lags.sort()
+    words = sum(len(t.split()) for t in texts)
+    p99 = lags[int(0.99 * (len(lags) - 1))] if lags else 0.0
+    maxLag = lags[-1] if lags else 0.0
+    print('[info] %10s  %10.1f %10.1f %10.2f %10.2f' % (
+        name, len(texts) / totalTime, words / totalTime, 1000.0 * p99, 1000.0 * maxLag))
+
+
+def loadTexts(fname, maxTexts):
+    with codecs.open(fname, 'r', 'utf-8') as f:
+        texts = [line.strip() for line in f if line.strip()]
+    return texts[:maxTexts]
+
+
+async def runBenchmarks(corrector, texts, args):
+    async def blockingFix(text):
+        return corrector.FixFragment(text)
+
+    print('[info] %10s  %10s %10s %10s %10s' % ('', 'texts/s', 'words/s', 'lagP99ms', 'lagMaxMs'))
+    await benchmark('blocking', blockingFix, texts, args.concurrency)
+    async with jamspell.AsyncSpellCorrector(corrector, maxWorkers=args.workers,
+                                            maxBatchSize=args.batch_size) as asyncCorrector:
+        await benchmark('async', asyncCorrector.fix, texts, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AsyncSpellCorrector throughput and event loop lag')
+    parser.add_argument('model', type=str, help='path to jamspell model file')
+    parser.add_argument('file', type=str, help='text file, one fragment per line')
+    parser.add_argument('-mx', '--max_texts', type=int, default=2000, help='max fragments to correct')
+    parser.add_argument('-c', '--concurrency', type=int, default=64, help='concurrent coroutines')
+    parser.add_argument('-w', '--workers', type=int, default=4, help='executor threads')
+    parser.add_argument('-b', '--batch_size', type=int, default=32, help='max calls coalesced into one batch')
+    args = parser.parse_args()
+
+    corrector = jamspell.TSpellCorrector()
+    if not corrector.LoadLangModel(args.model):
+        raise Exception('wrong model file: %s' % args.model)
+    texts = loadTexts(args.file, args.max_texts)
+    print('[info] %d fragments, concurrency %d' % (len(texts), args.concurrency))
+    asyncio.run(runBenchmarks(corrector, texts, args))
+
+
+if __name__ == '__main__':
+    main()
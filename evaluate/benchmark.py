@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import codecs
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import utils
+from utils import loadText, generateSentences
+from evaluate import generateTypos, evaluateCorrector, JamspellCorrector
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_DATA = os.path.join(THIS_DIR, '..', 'test_data')
+
+DATASETS = {
+    'en': ('sherlockholmes.txt', 'alphabet_en.txt'),
+    'ru': ('kapitanskaya_dochka.txt', 'alphabet_ru.txt'),
+}
+
+TEST_EVERY_NTH_LINE = 20
+DEFAULT_TOLERANCE = 0.25
+# allowed absolute degradation of a metric which is zero in baseline,
+# relative tolerance would fail on any non zero value
+ZERO_BASELINE_EPSILON = 0.001
+DEFAULT_BASELINE = os.path.join(THIS_DIR, 'benchmark_baseline.json')
+
+# metric name => True if bigger is better
+METRICS = {
+    'train_sec': False,
+    'load_sec': False,
+    'cache_build_sec': False,
+    'peak_rss_mb': False,
+    'candidates_p50_ms': False,
+    'candidates_p90_ms': False,
+    'candidates_p99_ms': False,
+    'score_sentences_per_sec': True,
+    'fix_words_per_sec': True,
+    'err_rate': False,
+    'fix_rate': True,
+    'broken': False,
+}
+
+
+class TimingCorrector(JamspellCorrector):
+    def __init__(self, modelFile):
+        super(TimingCorrector, self).__init__(modelFile)
+        self.latencies = []
+
+    def correct(self, sentence, position):
+        startTime = time.time()
+        result = super(TimingCorrector, self).correct(sentence, position)
+        self.latencies.append(time.time() - startTime)
+        return result
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[int(p * (len(values) - 1))]
+
+
+def splitDataset(sourceFile, workDir):
+    trainFile = os.path.join(workDir, 'train.txt')
+    testFile = os.path.join(workDir, 'test.txt')
+    with codecs.open(sourceFile, 'r', 'utf-8') as f:
+        lines = f.readlines()
+    with codecs.open(trainFile, 'w', 'utf-8') as train, codecs.open(testFile, 'w', 'utf-8') as test:
+        for i, line in enumerate(lines):
+            (test if i % TEST_EVERY_NTH_LINE == 0 else train).write(line)
+    return trainFile, testFile
+
+
+def peakRssMb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return rss / (1024.0 * 1024.0)
+    return rss / 1024.0
+
+
+def benchmarkDataset(lang, maxWords):
+    import jamspell
+    sourceFile, alphabetFile = DATASETS[lang]
+    sourceFile = os.path.join(TEST_DATA, sourceFile)
+    alphabetFile = os.path.join(TEST_DATA, alphabetFile)
+    results = {}
+    workDir = tempfile.mkdtemp(prefix='jamspell_bench_')
+    try:
+        trainFile, testFile = splitDataset(sourceFile, workDir)
+        modelFile = os.path.join(workDir, 'model.bin')
+
+        startTime = time.time()
+        if not jamspell.TSpellCorrector().TrainLangModel(trainFile, alphabetFile, modelFile):
+            raise Exception('failed to train model for %s' % lang)
+        results['train_sec'] = time.time() - startTime
+
+        os.remove(modelFile + '.spell')
+        startTime = time.time()
+        if not jamspell.TSpellCorrector().LoadLangModel(modelFile):
+            raise Exception('failed to load model for %s' % lang)
+        loadAndBuildTime = time.time() - startTime
+
+        startTime = time.time()
+        corrector = TimingCorrector(modelFile)
+        results['load_sec'] = time.time() - startTime
+        results['cache_build_sec'] = max(0.0, loadAndBuildTime - results['load_sec'])
+
+        utils.loadAlphabet(alphabetFile)
+        random.seed(42)
+        originalText = loadText(testFile)
+        erroredText = generateTypos(originalText)
+        originalSentences = generateSentences(originalText)
+        erroredSentences = generateSentences(erroredText)
+
+        langModel = corrector.model.GetLangModel()
+        erroredLines = [' '.join(s) for s in erroredSentences]
+        startTime = time.time()
+        for line in erroredLines:
+            langModel.Score(line)
+        results['score_sentences_per_sec'] = len(erroredLines) / (time.time() - startTime)
+
+        words = sum(len(s) for s in erroredSentences)
+        fragment = '. '.join(erroredLines)
+        startTime = time.time()
+        corrector.model.FixFragment(fragment)
+        results['fix_words_per_sec'] = words / (time.time() - startTime)
+
+        errRate, fixRate, broken, _, _, _, _ = evaluateCorrector(
+            lang, corrector, originalSentences, erroredSentences, maxWords)
+        results['err_rate'] = errRate
+        results['fix_rate'] = fixRate
+        results['broken'] = broken
+        results['candidates_p50_ms'] = 1000.0 * percentile(corrector.latencies, 0.5)
+        results['candidates_p90_ms'] = 1000.0 * percentile(corrector.latencies, 0.9)
+        results['candidates_p99_ms'] = 1000.0 * percentile(corrector.latencies, 0.99)
+        results['peak_rss_mb'] = peakRssMb()
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+    return results
+
+
+def benchmarkDatasetIsolated(lang, maxWords):
+    # separate process so peak RSS is measured per dataset
+    pool = multiprocessing.Pool(1)
+    try:
+        return pool.apply(benchmarkDataset, (lang, maxWords))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def compareWithBaseline(results, baseline, tolerance, metricNames=None):
+    regressions = []
+    for lang, metrics in results['datasets'].items():
+        baseMetrics = baseline.get('datasets', {}).get(lang, {})
+        for name, value in sorted(metrics.items()):
+            if name not in baseMetrics or name not in METRICS:
+                continue
+            if metricNames is not None and name not in metricNames:
+                continue
+            baseValue = baseMetrics[name]
+            margin = abs(baseValue) * tolerance if baseValue else ZERO_BASELINE_EPSILON
+            if METRICS[name]:
+                worse = value < baseValue - margin
+            else:
+                worse = value > baseValue + margin
+            if worse:
+                regressions.append((lang, name, baseValue, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='jamspell performance benchmark')
+    parser.add_argument('-d', '--datasets', type=str, default='en,ru', help='comma separated: %s' % ','.join(sorted(DATASETS)))
+    parser.add_argument('-mx', '--max_words', type=int, default=20000, help='max words for candidates / accuracy stage')
+    parser.add_argument('-o', '--output', type=str, help='save results json to file')
+    parser.add_argument('-b', '--baseline', type=str, nargs='?', const=DEFAULT_BASELINE,
+                        help='baseline json to compare with (default: %s)' % os.path.relpath(DEFAULT_BASELINE))
+    parser.add_argument('-t', '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed relative degradation against baseline')
+    parser.add_argument('-m', '--metrics', type=str,
+                        help='comma separated metrics to compare with baseline, all by default: %s' % ','.join(sorted(METRICS)))
+    args = parser.parse_args()
+
+    results = {
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'timestamp': int(time.time()),
+        'datasets': {},
+    }
+    for lang in args.datasets.split(','):
+        print('[info] benchmarking %s' % lang)
+        results['datasets'][lang] = benchmarkDatasetIsolated(lang, args.max_words)
+
+    dump = json.dumps(results, indent=4, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(dump + '\n')
+    print(dump)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        metricNames = set(args.metrics.split(',')) if args.metrics else None
+        regressions = compareWithBaseline(results, baseline, args.tolerance, metricNames)
+        for lang, name, baseValue, value in regressions:
+            print('[error] %s %s regressed: %.4f => %.4f' % (lang, name, baseValue, value))
+        if regressions:
+            sys.exit(1)
+        print('[info] no regressions (tolerance %.0f%%)' % (100.0 * args.tolerance))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,19 +2,28 @@ import re
 from collections import Counter
 import kenlm
 
+try:
+    from . import deletes_index
+except ImportError:
+    # run as a script
+    import deletes_index
+
 def words(text): return re.findall(r'\w+', text.lower())
 
 WORDS = Counter()
 TOTAL_WORDS = 0
 LANG_MODEL = None
+INDEX = None
 
-def init(filename = 'big.txt', modelName = 'big.arpa'):
+def init(filename = 'big.txt', modelName = 'big.arpa', indexFile = None):
     global WORDS
     global TOTAL_WORDS
     global LANG_MODEL
+    global INDEX
     WORDS = Counter(words(open(filename).read()))
     TOTAL_WORDS = sum(WORDS.values())
     LANG_MODEL = kenlm.Model(modelName)
+    INDEX = deletes_index.load(indexFile or filename + '.deletes', WORDS)
 
 # def P(word, sentence, pos):
 #     subsent = sentence[max(0,pos-2):pos] + [word] + sentence[pos+1:pos+3]
@@ -37,7 +46,7 @@ def correction(sentence, pos):
 
 def candidates(word):
     "Generate possible spelling corrections for word."
-    return (known([word]) or known(edits1(word)) or known(edits2(word)) or [word])
+    return (known([word]) or INDEX.known1(word) or INDEX.known2(word) or [word])
 
 def known(words):
     "The subset of `words` that appear in the dictionary of WORDS."
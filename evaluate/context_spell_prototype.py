@@ -1,21 +1,31 @@
 import re
 from collections import Counter
-import simple_lm
+
+try:
+    from . import simple_lm
+    from . import deletes_index
+except ImportError:
+    # run as a script
+    import simple_lm
+    import deletes_index
 
 def words(text): return re.findall(r'\w+', text.lower())
 
 WORDS = Counter()
 TOTAL_WORDS = 0
 LANG_MODEL = None
+INDEX = None
 
-def init(filename = 'big.txt', modelName = 'big.bin'):
+def init(filename = 'big.txt', modelName = 'big.bin', indexFile = None):
     global WORDS
     global TOTAL_WORDS
     global LANG_MODEL
+    global INDEX
     WORDS = Counter(words(open(filename).read()))
     TOTAL_WORDS = sum(WORDS.values())
     LANG_MODEL = simple_lm.SimpleLangModel()
     LANG_MODEL.load(modelName)
+    INDEX = deletes_index.load(indexFile or filename + '.deletes', WORDS)
 
 WEIGHTS = {
     0: 1.0,
@@ -44,7 +54,7 @@ def correction(sentence, pos):
 
 def candidates(word, nearest=True):
     res = {}
-    cands = ((0, [word]), (1, edits1(word))) if nearest else ((2, edits2(word)),)
+    cands = ((0, [word]), (1, INDEX.known1(word))) if nearest else ((2, INDEX.known2(word)),)
     for lvl, wrds in cands:
         for w in wrds:
             if w in WORDS:
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import utils
+from utils import loadText, generateSentences
+from evaluate import generateTypos, evaluateCorrector, JamspellSentenceCorrector
+from benchmark import DATASETS, TEST_DATA, splitDataset
+
+
+def benchmarkMode(name, corrector, originalSentences, erroredSentences, maxWords):
+    import jamspell
+    lookupsBefore = jamspell.TLangModel.GetLookupsCount()
+    startTime = time.time()
+    errRate, fixRate, broken, _, _, _, _ = evaluateCorrector(name, corrector, originalSentences,
+                                                          erroredSentences, maxWords)
+    totalTime = time.time() - startTime
+    lookups = jamspell.TLangModel.GetLookupsCount() - lookupsBefore
+    words = min(maxWords, sum(len(s) for s in originalSentences))
+    print('[info] %16s  %10.1f %10.1f %8.2f%% %8.2f%% %8.2f%%' % (
+        name, float(lookups) / words, words / totalTime, 100.0 * errRate, 100.0 * fixRate, 100.0 * broken))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='greedy vs viterbi decoding of FixFragment')
+    parser.add_argument('-d', '--dataset', type=str, default='en', help=','.join(sorted(DATASETS)))
+    parser.add_argument('-jsp', '--jamspell', type=str, help='jamspell model, trained on test_data if missing')
+    parser.add_argument('-f', '--file', type=str, help='text file to evaluate on')
+    parser.add_argument('-a', '--alphabet', type=str, help='alphabet file')
+    parser.add_argument('-mx', '--max_words', type=int, default=20000, help='max words to evaluate')
+    parser.add_argument('-b', '--beams', type=str, default='4,8,32', help='comma separated viterbi beam sizes')
+    args = parser.parse_args()
+
+    import jamspell
+
+    workDir = tempfile.mkdtemp(prefix='jamspell_decode_')
+    try:
+        modelFile, testFile, alphabetFile = args.jamspell, args.file, args.alphabet
+        if not modelFile:
+            sourceFile, alphabetFile = DATASETS[args.dataset]
+            alphabetFile = os.path.join(TEST_DATA, alphabetFile)
+            trainFile, testFile = splitDataset(os.path.join(TEST_DATA, sourceFile), workDir)
+            modelFile = os.path.join(workDir, 'model.bin')
+            jamspell.TSpellCorrector().TrainLangModel(trainFile, alphabetFile, modelFile)
+
+        utils.loadAlphabet(alphabetFile)
+        random.seed(42)
+        originalText = loadText(testFile)
+        erroredText = generateTypos(originalText)
+        originalSentences = generateSentences(originalText)
+        erroredSentences = generateSentences(erroredText)
+
+        print('[info] %16s  %10s %10s %9s %9s %9s' % ('', 'lookups/w', 'words/s', 'errRate', 'fixRate', 'broken'))
+        corrector = JamspellSentenceCorrector(modelFile, jamspell.DECODE_GREEDY)
+        benchmarkMode('greedy', corrector, originalSentences, erroredSentences, args.max_words)
+        for beam in map(int, args.beams.split(',')):
+            corrector.model.SetDecodeMode(jamspell.DECODE_VITERBI, beam)
+            benchmarkMode('viterbi(%d)' % beam, corrector, originalSentences, erroredSentences, args.max_words)
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Deletion neighbourhood index of a vocabulary, used by python baseline
+# correctors (norvig_spell, context_spell, context_spell_prototype) instead of
+# testing every string of edits1 / edits2 against the vocabulary.
+#
+# Every word is stored under itself and under each of its one letter deletes.
+# A word one edit away from a string shares at least one of these keys with
+# it, so lookups give a small superset of known(edits1(s)) which is then
+# checked exactly. known(edits2(s)) is the union of known(edits1(e)) over
+# edits1(s), so candidate sets are the same as generated by edits.
+
+import hashlib
+import os
+import pickle
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+VERSION = 1
+
+
+def edits1(word, letters=LETTERS):
+    "All edits that are one edit away from `word`."
+    splits     = [(word[:i], word[i:])    for i in range(len(word) + 1)]
+    deletes    = [L + R[1:]               for L, R in splits if R]
+    transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R)>1]
+    replaces   = [L + c + R[1:]           for L, R in splits if R for c in letters]
+    inserts    = [L + c + R               for L, R in splits for c in letters]
+    return set(deletes + transposes + replaces + inserts)
+
+
+def deletes1(word):
+    return set(word[:i] + word[i + 1:] for i in range(len(word)))
+
+
+def isEdit1(word, cand, letters=LETTERS):
+    "cand in edits1(word, letters), without generating edits"
+    n, m = len(word), len(cand)
+    if m == n - 1:
+        i = 0
+        while i < m and word[i] == cand[i]:
+            i += 1
+        return word[i + 1:] == cand[i:]
+    if m == n + 1:
+        i = 0
+        while i < n and word[i] == cand[i]:
+            i += 1
+        return cand[i] in letters and cand[i + 1:] == word[i:]
+    if m != n:
+        return False
+    diff = [i for i in range(n) if word[i] != cand[i]]
+    if not diff:
+        # replace of a letter by itself or transpose of two equal letters
+        return any(c in letters for c in word) or any(word[i] == word[i + 1] for i in range(n - 1))
+    if len(diff) == 1:
+        return cand[diff[0]] in letters
+    if len(diff) == 2:
+        i, j = diff
+        return j == i + 1 and word[i] == cand[j] and word[j] == cand[i]
+    return False
+
+
+def vocabularyHash(vocabulary):
+    md5 = hashlib.md5()
+    for word in sorted(vocabulary):
+        md5.update(word.encode('utf-8'))
+        md5.update(b'\n')
+    return md5.hexdigest()
+
+
+class DeletesIndex(object):
+    def __init__(self, vocabulary, letters=LETTERS):
+        self.letters = letters
+        self.vocabHash = vocabularyHash(vocabulary)
+        self.index = {}
+        for word in vocabulary:
+            for key in deletes1(word) | {word}:
+                self.index.setdefault(key, []).append(word)
+
+    def known1(self, word):
+        "same as known(edits1(word))"
+        index, letters = self.index, self.letters
+        result = set()
+        for key in deletes1(word) | {word}:
+            for cand in index.get(key, ()):
+                if cand not in result and isEdit1(word, cand, letters):
+                    result.add(cand)
+        return result
+
+    def known2(self, word):
+        "same as known(edits2(word))"
+        result = set()
+        for e1 in edits1(word, self.letters):
+            result |= self.known1(e1)
+        return result
+
+    def save(self, fname):
+        with open(fname, 'wb') as f:
+            pickle.dump((VERSION, self.letters, self.vocabHash, self.index), f, pickle.HIGHEST_PROTOCOL)
+
+
+def load(fname, vocabulary, letters=LETTERS):
+    """Index saved in fname if it was built for the same vocabulary and
+    letters, otherwise it is built and saved there"""
+    vocabHash = vocabularyHash(vocabulary)
+    if os.path.exists(fname):
+        try:
+            with open(fname, 'rb') as f:
+                version, savedLetters, savedHash, index = pickle.load(f)
+            if (version, savedLetters, savedHash) == (VERSION, letters, vocabHash):
+                result = DeletesIndex([], letters)
+                result.vocabHash = vocabHash
+                result.index = index
+                return result
+        except Exception:
+            pass
+        print('[info] rebuilding outdated deletes index %s' % fname)
+    result = DeletesIndex(vocabulary, letters)
+    try:
+        result.save(fname)
+    except (IOError, OSError) as e:
+        print('[warning] failed to save deletes index %s: %s' % (fname, e))
+    return result
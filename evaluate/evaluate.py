@@ -4,11 +4,17 @@
 import codecs
 import random
 import argparse
-import typo_model
 import time
 import copy
-from utils import normalize, loadText, generateSentences
-import utils
+
+try:
+    from . import typo_model, utils
+    from .utils import normalize, loadText, generateSentences
+except ImportError:
+    # run as a script
+    import typo_model
+    import utils
+    from utils import normalize, loadText, generateSentences
 
 try:
     import readline
@@ -106,6 +112,29 @@ class JamspellCorrector(Corrector):
         return cands
 
 
+class JamspellSentenceCorrector(Corrector):
+    """Corrects whole sentence at once with FixFragmentNormalized, required
+    for decode modes that revise earlier words, e.g. DECODE_VITERBI"""
+    def __init__(self, modelFile, decodeMode=None):
+        super(JamspellSentenceCorrector, self).__init__()
+        import jamspell
+        self.model = jamspell.TSpellCorrector()
+        if not (self.model.LoadLangModel(modelFile)):
+            raise Exception('wrong model file: %s' % modelFile)
+        if decodeMode is not None:
+            self.model.SetDecodeMode(decodeMode)
+        self.__sentence = None
+        self.__fixed = None
+
+    def correct(self, sentence, position):
+        if position == 0 or self.__sentence is not sentence:
+            self.__sentence = sentence
+            self.__fixed = self.model.FixFragmentNormalized(' '.join(sentence)).rstrip('.').split()
+        if len(self.__fixed) != len(sentence):
+            return sentence[position]
+        return self.__fixed[position]
+
+
 def evaluateCorrector(correctorName, corrector, originalSentences, erroredSentences, maxWords=None):
     totalErrors = 0
     origErrors = 0
@@ -176,12 +205,14 @@ def evaluateCorrector(correctorName, corrector, originalSentences, erroredSenten
         # if fixedWord != originalWord:
         #    print originalWord, erroredWord, fixedWord
 
+    execTime = time.time() - startTime
     return float(totalErrors) / n, \
            float(fixedErrors) / origErrors, \
            float(broken) / totalNotTouched, \
            float(topNtotalErrors) / n, \
            float(topNfixed) / origErrors, \
-           time.time() - startTime
+           execTime, \
+           n / max(execTime, 1e-9)
 
 
 def testMode(corrector):
@@ -208,7 +239,7 @@ def evaluateJamspell(modelFile, testText, alphabetFile, maxWords=50000):
     assert len(originalText) == len(erroredText)
     originalSentences = generateSentences(originalText)
     erroredSentences = generateSentences(erroredText)
-    errorsRate, fixRate, broken, topNerr, topNfix, execTime = \
+    errorsRate, fixRate, broken, topNerr, topNfix, execTime, wordsPerSec = \
         evaluateCorrector('jamspell', corrector, originalSentences, erroredSentences, maxWords)
     return errorsRate, fixRate, broken, topNerr, topNfix
 
@@ -221,6 +252,7 @@ def main():
     parser.add_argument('-cs', '--context', type=str, help='path to context spell model')
     parser.add_argument('-csp', '--context_prototype', type=str, help='path to context spell prototype model')
     parser.add_argument('-jsp', '--jamspell', type=str, help='path to jamspell model file')
+    parser.add_argument('-jsv', '--jamspell_viterbi', type=str, help='path to jamspell model file, sentence level decoding')
     parser.add_argument('-t', '--test', action="store_true")
     parser.add_argument('-mx', '--max_words', type=int, help='max words to evaluate')
     parser.add_argument('-a', '--alphabet', type=str, help='alphabet file')
@@ -253,6 +285,11 @@ def main():
     if args.jamspell:
         corrector = correctors['jamspell'] = JamspellCorrector(args.jamspell)
 
+    if args.jamspell_viterbi:
+        import jamspell
+        corrector = correctors['jamspell_viterbi'] = JamspellSentenceCorrector(args.jamspell_viterbi,
+                                                                               jamspell.DECODE_VITERBI)
+
     if args.test:
         return testMode(corrector)
 
@@ -281,23 +318,24 @@ def main():
     results = {}
 
     for correctorName, corrector in correctors.items():
-        errorsRate, fixRate, broken, topNerr, topNfix, execTime = \
+        results[correctorName] = \
             evaluateCorrector(correctorName, corrector, originalSentences, erroredSentences, maxWords)
-        results[correctorName] = errorsRate, fixRate, broken, topNerr, topNfix, execTime
 
     print('')
 
     print(
-        '[info] %12s %8s  %8s  %8s  %8s  %8s  %8s' % ('', 'errRate', 'fixRate', 'broken', 'topNerr', 'topNfix', 'time'))
+        '[info] %12s %8s  %8s  %8s  %8s  %8s  %8s  %8s' % ('', 'errRate', 'fixRate', 'broken', 'topNerr', 'topNfix',
+                                                        'time', 'words/s'))
     for k, _ in sorted(results.items(), key=lambda x: x[1]):
-        print('[info] %10s  %8.2f%% %8.2f%% %8.2f%% %8.2f%% %8.2f%% %8.2fs' % \
+        print('[info] %10s  %8.2f%% %8.2f%% %8.2f%% %8.2f%% %8.2f%% %8.2fs %8.0f' % \
               (k,
                100.0 * results[k][0],
                100.0 * results[k][1],
                100.0 * results[k][2],
                100.0 * results[k][3],
                100.0 * results[k][4],
-               results[k][5]))
+               results[k][5],
+               results[k][6]))
 
 
 if __name__ == '__main__':
@@ -151,7 +151,7 @@ def generateDatasetTxt(inFile, outFile):
 def processSentences(sentences, outFile):
     print('[info] removing duplicates')
 
-    sentences = list(set(sentences))
+    sentences = sorted(set(sentences))
 
     print('[info] %d left' % len(sentences))
     print('[info] shuffling')
@@ -1,16 +1,25 @@
 import re
 from collections import Counter
 
+try:
+    from . import deletes_index
+except ImportError:
+    # run as a script
+    import deletes_index
+
 def words(text): return re.findall(r'\w+', text.lower())
 
 WORDS = Counter()
 TOTAL_WORDS = 0
+INDEX = None
 
-def init(filename = 'big.txt'):
+def init(filename = 'big.txt', indexFile = None):
     global WORDS
     global TOTAL_WORDS
+    global INDEX
     WORDS = Counter(words(open(filename).read()))
     TOTAL_WORDS=sum(WORDS.values())
+    INDEX = deletes_index.load(indexFile or filename + '.deletes', WORDS)
 
 def P(word, N=None):
     "Probability of `word`."
@@ -20,7 +29,7 @@ def P(word, N=None):
 def correction(word):
     if known([word]):
         return word
-    cands = known(edits1(word)) or known(edits2(word))
+    cands = INDEX.known1(word) or INDEX.known2(word)
     if not cands:
         return word
     cands = sorted(cands, key=P, reverse=True)
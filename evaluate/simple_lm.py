@@ -1,9 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from utils import loadText, normalize, generateSentences
+try:
+    from .utils import loadText, normalize, generateSentences
+except ImportError:
+    # run as a script
+    from utils import loadText, normalize, generateSentences
 from collections import defaultdict
-import cPickle, zlib
+import pickle, zlib
 import math
 import sys
 import time
@@ -68,12 +72,12 @@ class SimpleLangModel(object):
 
     def save(self, modelFile):
         with open(modelFile, 'wb') as f:
-            data = zlib.compress(cPickle.dumps(self.__dict__, -1))
+            data = zlib.compress(pickle.dumps(self.__dict__, -1))
             f.write(data)
 
     def load(self, modelFile):
         with open(modelFile, 'rb') as f:
-            data = cPickle.loads(zlib.decompress(f.read()))
+            data = pickle.loads(zlib.decompress(f.read()))
             self.__dict__.clear()
             self.__dict__.update(data)
             assert self.gram1 and self.gram2 and self.gram3
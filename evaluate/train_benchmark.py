@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import bisect
+import codecs
+import itertools
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark import TEST_DATA
+
+
+def generateCorpus(fname, words, vocabSize, seed=42):
+    # zipf distributed words, so n-gram counts look like natural text
+    rnd = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    vocab = set()
+    while len(vocab) < vocabSize:
+        vocab.add(''.join(rnd.choice(letters) for _ in range(rnd.randint(2, 10))))
+    vocab = sorted(vocab)
+    rnd.shuffle(vocab)
+    cumWeights = list(itertools.accumulate(1.0 / (i + 1) for i in range(vocabSize)))
+    total = cumWeights[-1]
+    with codecs.open(fname, 'w', 'utf-8') as f:
+        written = 0
+        while written < words:
+            sentenceLen = rnd.randint(5, 20)
+            sentence = [vocab[bisect.bisect_left(cumWeights, rnd.random() * total)] for _ in range(sentenceLen)]
+            f.write(' '.join(sentence) + '.\n')
+            written += sentenceLen
+
+
+def trainModel(mainBinary, corpusFile, modelFile):
+    alphabetFile = os.path.join(TEST_DATA, 'alphabet_en.txt')
+    startTime = time.time()
+    subprocess.check_call([mainBinary, 'train', alphabetFile, corpusFile, modelFile], stderr=subprocess.DEVNULL)
+    trainTime = time.time() - startTime
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform == 'darwin':
+        rss /= 1024.0
+    return trainTime, rss / 1024.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='training time and peak memory on a synthetic corpus')
+    parser.add_argument('main', type=str, help='path to jamspell main binary')
+    parser.add_argument('-w', '--words', type=int, default=5000000, help='corpus size in words')
+    parser.add_argument('-v', '--vocab', type=int, default=100000, help='vocabulary size')
+    parser.add_argument('-c', '--corpus', type=str, help='keep generated corpus in this file')
+    args = parser.parse_args()
+
+    workDir = tempfile.mkdtemp(prefix='jamspell_train_')
+    try:
+        corpusFile = args.corpus or os.path.join(workDir, 'corpus.txt')
+        if not os.path.exists(corpusFile):
+            print('[info] generating %d words corpus' % args.words)
+            generateCorpus(corpusFile, args.words, args.vocab)
+        modelFile = os.path.join(workDir, 'model.bin')
+        trainTime, peakRss = trainModel(args.main, corpusFile, modelFile)
+        print('[info] train time: %.1f sec, peak rss: %.0f mb, model: %.0f mb' % (
+            trainTime, peakRss, os.path.getsize(modelFile) / (1024.0 * 1024.0)))
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
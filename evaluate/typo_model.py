@@ -4,7 +4,12 @@
 import random
 import bisect
 from scipy.stats import binom
-import utils
+
+try:
+    from . import utils
+except ImportError:
+    # run as a script
+    import utils
 
 # todo: calculate correct typo probabilities
 
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Load test of web_server: one text per request (/fix, /candidates) against
+# /batch with json, length prefixed binary and MessagePack bodies.
+#
+#   ./web_server/web_server en.bin localhost 8080
+#   python evaluate/web_load_test.py test_data/sherlockholmes.txt -p 8080
+
+import argparse
+import codecs
+import gzip
+import http.client
+import json
+import struct
+import threading
+import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class Client(object):
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port)
+            try:
+                self.conn.request(method, path, body, headers or {})
+                resp = self.conn.getresponse()
+                data = resp.read()
+            except (http.client.HTTPException, OSError):
+                # server closed keep-alive connection
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+                continue
+            if resp.status != 200:
+                raise Exception('%s %s: %d %s' % (method, path, resp.status, data[:200]))
+            if resp.getheader('Connection') == 'close':
+                self.conn.close()
+                self.conn = None
+            return data, resp.getheader('Content-Encoding')
+
+
+def encodeJson(texts):
+    return json.dumps(texts).encode('utf-8'), 'application/json'
+
+
+def encodeBinary(texts):
+    parts = []
+    for text in texts:
+        data = text.encode('utf-8')
+        parts.append(struct.pack('<I', len(data)))
+        parts.append(data)
+    return b''.join(parts), 'application/octet-stream'
+
+
+def encodeMsgpack(texts):
+    return msgpack.packb(texts), 'application/msgpack'
+
+
+def makeSingleRequests(path, texts):
+    return [('POST', path, text.encode('utf-8'), {}) for text in texts]
+
+
+def makeBatchRequests(path, texts, batchSize, encoder, accept='application/json'):
+    requests = []
+    for i in range(0, len(texts), batchSize):
+        body, contentType = encoder(texts[i:i + batchSize])
+        requests.append(('POST', path, body, {'Content-Type': contentType, 'Accept': accept}))
+    return requests
+
+
+def runLoad(host, port, requests, concurrency, gzipped):
+    queue = list(reversed(requests))
+    lock = threading.Lock()
+    stats = {'sent': 0, 'received': 0, 'decoded': 0}
+    errors = []
+
+    def worker():
+        client = Client(host, port)
+        while True:
+            with lock:
+                if not queue:
+                    return
+                method, path, body, headers = queue.pop()
+            if gzipped:
+                headers = dict(headers, **{'Accept-Encoding': 'gzip'})
+            try:
+                data, encoding = client.request(method, path, body, headers)
+            except Exception as e:
+                errors.append(e)
+                return
+            decoded = len(gzip.decompress(data)) if encoding == 'gzip' else len(data)
+            with lock:
+                stats['sent'] += len(body)
+                stats['received'] += len(data)
+                stats['decoded'] += decoded
+
+    startTime = time.time()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    return time.time() - startTime, stats
+
+
+def loadTexts(fname, maxTexts):
+    with codecs.open(fname, 'r', 'utf-8') as f:
+        texts = [line.strip() for line in f if line.strip()]
+    return texts[:maxTexts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='web_server requests/sec and bytes/sec, single text vs /batch')
+    parser.add_argument('file', type=str, help='text file, one fragment per line')
+    parser.add_argument('--host', type=str, default='localhost')
+    parser.add_argument('-p', '--port', type=int, default=8080)
+    parser.add_argument('-mx', '--max_texts', type=int, default=2000, help='max fragments to send')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='client threads')
+    parser.add_argument('-b', '--batch_size', type=int, default=100, help='texts per /batch request')
+    args = parser.parse_args()
+
+    texts = loadTexts(args.file, args.max_texts)
+    bs = args.batch_size
+    variants = [
+        ('fix', makeSingleRequests('/fix', texts)),
+        ('candidates', makeSingleRequests('/candidates', texts)),
+        ('batch_json', makeBatchRequests('/batch', texts, bs, encodeJson)),
+        ('batch_bin', makeBatchRequests('/batch', texts, bs, encodeBinary)),
+        ('batch_cand', makeBatchRequests('/batch?mode=candidates', texts, bs, encodeJson)),
+    ]
+    if msgpack is not None:
+        variants.append(('batch_mpack', makeBatchRequests('/batch?mode=candidates', texts, bs, encodeMsgpack,
+                                                          'application/msgpack')))
+    else:
+        print('[warning] msgpack is not installed, skipping MessagePack variant')
+
+    print('[info] %d fragments, concurrency %d, batch size %d' % (len(texts), args.concurrency, bs))
+    print('[info] %12s %5s %10s %10s %12s %12s %12s' % (
+        '', 'gzip', 'req/s', 'texts/s', 'sent B/s', 'recv B/s', 'recv B/text'))
+    for name, requests in variants:
+        for gzipped in (False, True):
+            totalTime, stats = runLoad(args.host, args.port, requests, args.concurrency, gzipped)
+            print('[info] %12s %5s %10.1f %10.1f %12.0f %12.0f %12.1f' % (
+                name, 'yes' if gzipped else 'no', len(requests) / totalTime, len(texts) / totalTime,
+                stats['sent'] / totalTime, stats['received'] / totalTime, float(stats['received']) / len(texts)))
+
+
+if __name__ == '__main__':
+    main()
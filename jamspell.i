@@ -3,15 +3,236 @@
 %include "std_vector.i"
 %include <std_string.i>
 %include <std_wstring.i>
+%include <stdint.i>
 
 // Instantiate templates used by example
 namespace std {
    %template(StringVector) vector<wstring>;
    %template() pair<wstring,double>;
    %template(PairVector) vector<pair<wstring,double> >;
+   %template(UInt32Vector) vector<uint32_t>;
+   %template(FileNameVector) vector<string>;
 }
 
 %{
 #include "jamspell/spell_corrector.hpp"
+#include "jamspell/session.hpp"
 %}
+
+%include "jamspell/model_info.hpp"
+
+%extend NJamSpell::TModelInfo {
+%pythoncode %{
+    def toDict(self):
+        """sizes in bytes and statistics by field name, with TotalBytes"""
+        info = {name: getattr(self, name) for name in _MODEL_INFO_FIELDS}
+        info['TotalBytes'] = self.TotalBytes()
+        return info
+%}
+}
+
+// Only the part of the language model useful from scripting languages,
+// the full header relies on templates swig can't parse.
+namespace NJamSpell {
+class TLangModel {
+public:
+    double Score(const std::wstring& str) const;
+    uint64_t GetCheckSum() const;
+    static uint64_t GetLookupsCount();
+    NJamSpell::TModelInfo GetInfo() const;
+    static bool CountShard(const std::string& fileName, const std::string& alphabetFile, const std::string& shardFile);
+};
+}
+
+#ifdef SWIGPYTHON
+// Batch scoring takes and returns raw buffers and releases the GIL itself,
+// so numpy arrays are passed without per-item python objects.
+%feature("nothread") NJamSpell::TLangModel::_ScoreBatch;
+%feature("nothread") NJamSpell::TLangModel::_ScoreIdsBatch;
+%feature("nothread") NJamSpell::TLangModel::_GetWordIdsBuffer;
+%extend NJamSpell::TLangModel {
+    PyObject* _ScoreBatch(const std::vector<std::wstring>& sentences, size_t threads) const {
+        std::vector<double> scores;
+        Py_BEGIN_ALLOW_THREADS
+        scores = $self->ScoreBatch(sentences, threads);
+        Py_END_ALLOW_THREADS
+        return PyBytes_FromStringAndSize((const char*)scores.data(), scores.size() * sizeof(double));
+    }
+    PyObject* _ScoreIdsBatch(PyObject* ids, PyObject* offsets, size_t threads) const {
+        Py_buffer idsBuf, offsetsBuf;
+        if (PyObject_GetBuffer(ids, &idsBuf, PyBUF_C_CONTIGUOUS) != 0) {
+            return NULL;
+        }
+        if (PyObject_GetBuffer(offsets, &offsetsBuf, PyBUF_C_CONTIGUOUS) != 0) {
+            PyBuffer_Release(&idsBuf);
+            return NULL;
+        }
+        const uint32_t* idsData = (const uint32_t*)idsBuf.buf;
+        const uint32_t* offsetsData = (const uint32_t*)offsetsBuf.buf;
+        size_t idsCount = idsBuf.len / sizeof(uint32_t);
+        size_t offsetsCount = offsetsBuf.len / sizeof(uint32_t);
+        bool valid = offsetsCount > 0 && offsetsData[0] == 0 && offsetsData[offsetsCount - 1] == idsCount;
+        for (size_t i = 1; valid && i < offsetsCount; ++i) {
+            valid = offsetsData[i - 1] <= offsetsData[i];
+        }
+        PyObject* result = NULL;
+        if (!valid) {
+            PyErr_SetString(PyExc_ValueError, "offsets must grow from 0 to number of ids");
+        } else {
+            std::vector<double> scores;
+            Py_BEGIN_ALLOW_THREADS
+            scores = $self->ScoreBatch(idsData, offsetsData, offsetsCount - 1, threads);
+            Py_END_ALLOW_THREADS
+            result = PyBytes_FromStringAndSize((const char*)scores.data(), scores.size() * sizeof(double));
+        }
+        PyBuffer_Release(&idsBuf);
+        PyBuffer_Release(&offsetsBuf);
+        return result;
+    }
+    PyObject* _GetWordIdsBuffer(const std::wstring& text) const {
+        NJamSpell::TWordIds ids = $self->GetWordIds(text);
+        return PyBytes_FromStringAndSize((const char*)ids.data(), ids.size() * sizeof(NJamSpell::TWordId));
+    }
+%pythoncode %{
+    def ScoreBatch(self, sentences, threads=0):
+        """Score() of every sentence as float64 array, computed on threads (0 - all cores).
+        Sentences are str / utf-8 bytes, or sequences of word ids from GetWordIds()."""
+        sentences = list(sentences)
+        if sentences and not isinstance(sentences[0], (str, bytes)):
+            ids, offsets = _packWordIds(sentences)
+            return _float64Array(self._ScoreIdsBatch(ids, offsets, threads))
+        sentences = [s.decode('utf-8') if isinstance(s, bytes) else s for s in sentences]
+        return _float64Array(self._ScoreBatch(sentences, threads))
+
+    def GetWordIds(self, text):
+        """word ids of text as uint32 array, the way Score() tokenizes it"""
+        if isinstance(text, bytes):
+            text = text.decode('utf-8')
+        return _uint32Array(self._GetWordIdsBuffer(text))
+%}
+}
+#endif
+
+%rename(_GetCorrections) NJamSpell::TSpellCorrector::GetCorrections;
+%extend NJamSpell::TSpellCorrector {
+%pythoncode %{
+    def GetCorrections(self, text, maxCandidates=7):
+        """Misspelled words of utf-8 bytes or str text with their candidates, see TCorrections"""
+        if isinstance(text, bytes):
+            text = text.decode('utf-8')
+        return self._GetCorrections(text, maxCandidates)
+%}
+}
+
 %include "jamspell/spell_corrector.hpp"
+%include "jamspell/session.hpp"
+
+%extend NJamSpell::TDegradedWords {
+%pythoncode %{
+    def __len__(self):
+        return self.Size()
+
+    def toList(self):
+        """[(start, length, level), ...], level is one of DEGRADE_* constants"""
+        return list(zip(self.Starts, self.Lengths, self.Levels))
+%}
+}
+
+#ifdef SWIGPYTHON
+// Raw buffers of TCorrections arrays, exposed to python as numpy arrays
+// (or memoryviews if numpy is missing) without per-item python objects.
+%feature("nothread") NJamSpell::TCorrections;
+%extend NJamSpell::TCorrections {
+    PyObject* _StartsBuffer() const {
+        return PyBytes_FromStringAndSize((const char*)$self->Starts.data(), $self->Starts.size() * sizeof(uint32_t));
+    }
+    PyObject* _LengthsBuffer() const {
+        return PyBytes_FromStringAndSize((const char*)$self->Lengths.data(), $self->Lengths.size() * sizeof(uint32_t));
+    }
+    PyObject* _CandidatesBuffer() const {
+        return PyBytes_FromStringAndSize((const char*)$self->Candidates.data(), $self->Candidates.size() * sizeof(uint32_t));
+    }
+    PyObject* _CandidateOffsetsBuffer() const {
+        return PyBytes_FromStringAndSize((const char*)$self->CandidateOffsets.data(), $self->CandidateOffsets.size() * sizeof(uint32_t));
+    }
+    PyObject* _CandidateTextBuffer() const {
+        return PyBytes_FromStringAndSize($self->CandidateText.data(), $self->CandidateText.size());
+    }
+%pythoncode %{
+    @property
+    def starts(self):
+        return _uint32Array(self._StartsBuffer())
+
+    @property
+    def lengths(self):
+        return _uint32Array(self._LengthsBuffer())
+
+    @property
+    def candidates(self):
+        return _uint32Array(self._CandidatesBuffer())
+
+    @property
+    def candidate_offsets(self):
+        return _uint32Array(self._CandidateOffsetsBuffer())
+
+    @property
+    def candidate_text(self):
+        return self._CandidateTextBuffer()
+
+    def __len__(self):
+        return self.Size()
+
+    def toList(self):
+        """[(start, length, [candidates]), ...], same as web_server /candidates"""
+        starts, lengths, candidates = self.starts, self.lengths, self.candidates
+        offsets, text = self.candidate_offsets, self.candidate_text
+        results = []
+        for i in range(len(starts)):
+            cands = [text[offsets[k]:offsets[k + 1]].decode('utf-8')
+                     for k in range(candidates[i], candidates[i + 1])]
+            results.append((int(starts[i]), int(lengths[i]), cands))
+        return results
+%}
+}
+#endif
+
+%pythoncode %{
+_MODEL_INFO_FIELDS = ('WordToIdBytes', 'IdToWordBytes', 'BucketsBytes', 'PerfectHashBytes', 'AlphabetBytes',
+                      'Deletes1Bytes', 'Deletes2Bytes', 'VocabSize', 'Grams1', 'Grams2', 'Grams3', 'Ngrams',
+                      'BucketsNumber', 'BucketLoadFactor')
+
+def _uint32Array(data):
+    try:
+        import numpy
+        return numpy.frombuffer(data, dtype=numpy.uint32)
+    except ImportError:
+        return memoryview(data).cast('I')
+
+def _float64Array(data):
+    try:
+        import numpy
+        return numpy.frombuffer(data, dtype=numpy.float64)
+    except ImportError:
+        return memoryview(data).cast('d')
+
+def _packWordIds(sentences):
+    """flat uint32 ids and offsets buffers of word id sequences"""
+    try:
+        import numpy
+        lengths = numpy.fromiter((len(s) for s in sentences), dtype=numpy.uint32, count=len(sentences))
+        offsets = numpy.zeros(len(sentences) + 1, dtype=numpy.uint32)
+        numpy.cumsum(lengths, out=offsets[1:])
+        ids = numpy.concatenate([numpy.asarray(s, dtype=numpy.uint32) for s in sentences])
+        return ids, offsets
+    except ImportError:
+        import array
+        import itertools
+        ids = array.array('I', itertools.chain.from_iterable(sentences))
+        offsets = array.array('I', [0])
+        for s in sentences:
+            offsets.append(offsets[-1] + len(s))
+        return ids, offsets
+%}
+
+%pythoncode "jamspell/python/async_corrector.py"
+%pythoncode "jamspell/python/model_registry.py"
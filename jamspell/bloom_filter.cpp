@@ -12,6 +12,9 @@ struct TBloomFilter::Impl: public bloom_filter {
     Impl(const bloom_parameters& params): bloom_filter(params) {}
     Impl(const TBloomFilter::Impl& bloomFilter): bloom_filter(bloomFilter) {}
     ~Impl() {}
+    uint64_t MemoryUsage() const {
+        return sizeof(*this) + salt_.capacity() * sizeof(bloom_type) + bit_table_.capacity() * sizeof(cell_type);
+    }
     void Dump(std::ostream& out) const {
         NHandyPack::Dump(out, salt_, bit_table_, salt_count_, table_size_,
                         projected_element_count_, inserted_element_count_,
@@ -49,6 +52,10 @@ bool TBloomFilter::Contains(const std::string& element) const {
     return BloomFilter->contains(element);
 }
 
+uint64_t TBloomFilter::MemoryUsage() const {
+    return BloomFilter->MemoryUsage();
+}
+
 void TBloomFilter::Dump(std::ostream& out) const {
     BloomFilter->Dump(out);
 }
@@ -11,6 +11,7 @@ public:
     ~TBloomFilter();
     void Insert(const std::string& element);
     bool Contains(const std::string& element) const;
+    uint64_t MemoryUsage() const;
     void Dump(std::ostream& out) const;
     void Load(std::istream& in);
 private:
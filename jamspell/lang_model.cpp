@@ -6,6 +6,7 @@
 #include <ostream>
 #include <cstring>
 #include <algorithm>
+#include <thread>
 #include "lang_model.hpp"
 
 #include <contrib/cityhash/city.h>
@@ -16,49 +17,61 @@
 
 namespace NJamSpell {
 
-class MemStream: public std::basic_streambuf<char> {
-public:
-    MemStream(char* buff, long maxSize)
-        : Buff(buff)
-        , MaxSize(maxSize)
-        , Pos(0)
-    {
-    }
+// N-gram keys are hashed as fixed-width arrays of word ids, byte-identical
+// to their HandyPack serialization, so models stay compatible.
+template<typename T>
+struct TNgramKeyWords;
 
-	std::streamsize xsputn(const char* s, std::streamsize n) override {
-        if (n <= 0) {
-            return n;
-        }
-        long toCopy = std::min<long>(n, MaxSize - Pos);
-        memcpy(Buff + Pos, s, toCopy);
-        Pos += toCopy;
-        return n;
-    }
-    void Reset() {
-        Pos = 0;
-    }
-    long Size() const {
-        return Pos;
-    }
-private:
-    char* Buff;
-    long MaxSize;
-    long Pos;
+template<>
+struct TNgramKeyWords<TGram1Key> {
+    static constexpr size_t Value = 1;
 };
 
-template<typename T>
-std::string DumpKey(const T& key) {
-    std::stringbuf buf;
-    std::ostream out(&buf);
-    NHandyPack::Dump(out, key);
-    return buf.str();
+template<>
+struct TNgramKeyWords<TGram2Key> {
+    static constexpr size_t Value = 2;
+};
+
+template<>
+struct TNgramKeyWords<TGram3Key> {
+    static constexpr size_t Value = 3;
+};
+
+inline void PackKey(const TGram1Key& key, TWordId* out) {
+    out[0] = key;
+}
+
+inline void PackKey(const TGram2Key& key, TWordId* out) {
+    out[0] = key.first;
+    out[1] = key.second;
+}
+
+// HandyPack dumps tuple elements last to first
+inline void PackKey(const TGram3Key& key, TWordId* out) {
+    out[0] = std::get<2>(key);
+    out[1] = std::get<1>(key);
+    out[2] = std::get<0>(key);
 }
 
 template<typename T>
-void PrepareNgramKeys(const T& grams, std::vector<std::string>& keys) {
+std::vector<TWordId> PackNgramKeys(const T& grams) {
+    constexpr size_t keyWords = TNgramKeyWords<typename T::value_type::first_type>::Value;
+    std::vector<TWordId> packed(grams.size() * keyWords);
+    TWordId* out = packed.data();
     for (auto&& it: grams) {
-        keys.push_back(DumpKey(it.first));
+        PackKey(it.first, out);
+        out += keyWords;
     }
+    return packed;
+}
+
+template<typename T>
+TPackedKeys MakePackedKeys(const std::vector<TWordId>& packed) {
+    TPackedKeys keys;
+    keys.Data = (const char*)packed.data();
+    keys.KeySize = TNgramKeyWords<typename T::value_type::first_type>::Value * sizeof(TWordId);
+    keys.Count = packed.size() / TNgramKeyWords<typename T::value_type::first_type>::Value;
+    return keys;
 }
 
 static const uint32_t MAX_REAL_NUM = 268435456;
@@ -79,30 +92,175 @@ uint32_t UnpackInt32(uint16_t num) {
     return uint32_t(ceil(r));
 }
 
+// packed must come from PackNgramKeys(grams), keys are in the same order
 template<typename T>
-void InitializeBuckets(const T& grams, TPerfectHash& ph, std::vector<std::pair<uint16_t, uint16_t>>& buckets) {
+void InitializeBuckets(const T& grams,
+                       const std::vector<TWordId>& packed,
+                       TPerfectHash& ph,
+                       std::vector<std::pair<uint16_t, uint16_t>>& buckets)
+{
+    constexpr size_t keySize = TNgramKeyWords<typename T::value_type::first_type>::Value * sizeof(TWordId);
+    const char* key = (const char*)packed.data();
     for (auto&& it: grams) {
-        std::string key = DumpKey(it.first);
-        uint32_t bucket = ph.Hash(key);
+        uint32_t bucket = ph.Hash(key, keySize);
         if (bucket >= buckets.size()) {
             std::cerr << bucket << " " << buckets.size() << "\n";
         }
         assert(bucket < buckets.size());
         std::pair<uint16_t, uint16_t> data;
-        data.first = CityHash16(key);
+        data.first = CityHash16(key, keySize);
         data.second = PackInt32(it.second);
         buckets[bucket] = data;
+        key += keySize;
     }
 }
 
-bool TLangModel::Train(const std::string& fileName, const std::string& alphabetFile) {
+// moves counts out of hash map into vector sorted by key, so that model
+// does not depend on order in which n-grams were counted
+template<typename T>
+std::vector<std::pair<typename T::key_type, TCount>> SortGrams(T& grams) {
+    // range constructor would walk the hash map twice, to count and to copy
+    std::vector<std::pair<typename T::key_type, TCount>> sorted;
+    sorted.reserve(grams.size());
+    for (auto&& it: grams) {
+        sorted.push_back(it);
+    }
+    T().swap(grams);
+    std::sort(sorted.begin(), sorted.end());
+    return sorted;
+}
 
-    std::cerr << "[info] loading text" << std::endl;
+// sums counts of equal keys in a vector sorted by key
+template<typename T>
+void MergeSortedGrams(T& grams) {
+    size_t last = 0;
+    for (size_t i = 1; i < grams.size(); ++i) {
+        if (grams[i].first == grams[last].first) {
+            grams[last].second += grams[i].second;
+        } else {
+            grams[++last] = grams[i];
+        }
+    }
+    if (!grams.empty()) {
+        grams.resize(last + 1);
+    }
+}
+
+// adds sorted shard counts to sorted merged counts, merged stays sorted with
+// unique keys, so it never holds more than the distinct n-grams of all shards
+template<typename T>
+void MergeShardGrams(T& merged, T& shard) {
+    std::sort(shard.begin(), shard.end());
+    size_t middle = merged.size();
+    merged.insert(merged.end(), shard.begin(), shard.end());
+    T().swap(shard);
+    std::inplace_merge(merged.begin(), merged.begin() + middle, merged.end());
+    MergeSortedGrams(merged);
+    merged.shrink_to_fit();
+}
+
+bool TLangModel::Train(const std::string& fileName, const std::string& alphabetFile) {
     uint64_t trainStarTime = GetCurrentTimeMs();
+    Clear();
     if (!Tokenizer.LoadAlphabet(alphabetFile)) {
         std::cerr << "[error] failed to load alphabet" << std::endl;
         return false;
     }
+    TNgramCounts counts;
+    if (!CountNgrams(fileName, counts)) {
+        return false;
+    }
+    return BuildModel(counts, trainStarTime);
+}
+
+bool TLangModel::CountShard(const std::string& fileName, const std::string& alphabetFile, const std::string& shardFile) {
+    TLangModel model;
+    if (!model.Tokenizer.LoadAlphabet(alphabetFile)) {
+        std::cerr << "[error] failed to load alphabet" << std::endl;
+        return false;
+    }
+    TNgramCounts counts;
+    if (!model.CountNgrams(fileName, counts)) {
+        return false;
+    }
+    std::ofstream out(shardFile, std::ios::binary);
+    if (!out.is_open()) {
+        std::cerr << "[error] failed to open " << shardFile << std::endl;
+        return false;
+    }
+    NHandyPack::Dump(out, COUNT_SHARD_MAGIC_BYTE, COUNT_SHARD_VERSION);
+    NHandyPack::Dump(out, model.Tokenizer, model.WordToId, counts);
+    NHandyPack::Dump(out, COUNT_SHARD_MAGIC_BYTE);
+    return out.good();
+}
+
+bool TLangModel::TrainFromShards(const std::vector<std::string>& shardFiles) {
+    uint64_t trainStarTime = GetCurrentTimeMs();
+    Clear();
+    TNgramCounts merged;
+    for (size_t i = 0; i < shardFiles.size(); ++i) {
+        std::cerr << "[info] merging " << shardFiles[i] << std::endl;
+        std::ifstream in(shardFiles[i], std::ios::binary);
+        if (!in.is_open()) {
+            std::cerr << "[error] failed to open " << shardFiles[i] << std::endl;
+            return false;
+        }
+        uint64_t magicByte = 0;
+        uint16_t version = 0;
+        NHandyPack::Load(in, magicByte, version);
+        if (magicByte != COUNT_SHARD_MAGIC_BYTE || version != COUNT_SHARD_VERSION) {
+            std::cerr << "[error] not a count shard " << shardFiles[i] << std::endl;
+            return false;
+        }
+        TTokenizer tokenizer;
+        TVocabulary vocabulary;
+        TNgramCounts counts;
+        NHandyPack::Load(in, tokenizer, vocabulary, counts);
+        magicByte = 0;
+        NHandyPack::Load(in, magicByte);
+        if (magicByte != COUNT_SHARD_MAGIC_BYTE) {
+            std::cerr << "[error] broken count shard " << shardFiles[i] << std::endl;
+            return false;
+        }
+        if (i == 0) {
+            Tokenizer = tokenizer;
+        } else if (tokenizer.GetAlphabet() != Tokenizer.GetAlphabet()) {
+            std::cerr << "[error] alphabet of " << shardFiles[i] << " differs from " << shardFiles[0] << std::endl;
+            return false;
+        }
+
+        // words new to the model get ids in shard order, same as if
+        // texts were concatenated
+        TWordIds remap(vocabulary.Size(), UnknownWordId);
+        for (TWordId id = 0; id < vocabulary.Size(); ++id) {
+            TWord word = vocabulary.GetWord(id);
+            if (word.Len) {
+                remap[id] = GetWordId(word);
+            }
+        }
+        for (auto&& it: counts.Grams1) {
+            it.first = remap[it.first];
+        }
+        for (auto&& it: counts.Grams2) {
+            it.first = TGram2Key(remap[it.first.first], remap[it.first.second]);
+        }
+        for (auto&& it: counts.Grams3) {
+            it.first = TGram3Key(remap[std::get<0>(it.first)], remap[std::get<1>(it.first)], remap[std::get<2>(it.first)]);
+        }
+        MergeShardGrams(merged.Grams1, counts.Grams1);
+        MergeShardGrams(merged.Grams2, counts.Grams2);
+        MergeShardGrams(merged.Grams3, counts.Grams3);
+        merged.TotalWords += counts.TotalWords;
+    }
+    if (merged.Grams1.empty()) {
+        std::cerr << "[error] no sentences" << std::endl;
+        return false;
+    }
+    return BuildModel(merged, trainStarTime);
+}
+
+bool TLangModel::CountNgrams(const std::string& fileName, TNgramCounts& counts) {
+    std::cerr << "[info] loading text" << std::endl;
     std::wstring trainText = UTF8ToWide(LoadFile(fileName));
     ToLower(trainText);
     TSentences sentences = Tokenizer.Process(trainText);
@@ -135,7 +293,7 @@ bool TLangModel::Train(const std::string& fileName, const std::string& alphabetF
 
         for (auto w: words) {
             grams1[w] += 1;
-            TotalWords += 1;
+            counts.TotalWords += 1;
         }
 
         for (ssize_t j = 0; j < (ssize_t)words.size() - 1; ++j) {
@@ -153,41 +311,57 @@ bool TLangModel::Train(const std::string& fileName, const std::string& alphabetF
         }
     }
 
+    counts.Grams1 = SortGrams(grams1);
+    counts.Grams2 = SortGrams(grams2);
+    counts.Grams3 = SortGrams(grams3);
+    return true;
+}
+
+bool TLangModel::BuildModel(const TNgramCounts& counts, uint64_t trainStarTime) {
+    const auto& grams1 = counts.Grams1;
+    const auto& grams2 = counts.Grams2;
+    const auto& grams3 = counts.Grams3;
+
     VocabSize = grams1.size();
+    TotalWords = counts.TotalWords;
 
     std::cerr << "[info] generating keys" << std::endl;
 
-    {
-        std::vector<std::string> keys;
-        keys.reserve(grams1.size() + grams2.size() + grams3.size());
-
-        std::cerr << "[info] ngrams1: " << grams1.size() << "\n";
-        std::cerr << "[info] ngrams2: " << grams2.size() << "\n";
-        std::cerr << "[info] ngrams3: " << grams3.size() << "\n";
-        std::cerr << "[info] total: " << grams3.size() + grams2.size() + grams1.size() << "\n";
+    std::cerr << "[info] ngrams1: " << grams1.size() << "\n";
+    std::cerr << "[info] ngrams2: " << grams2.size() << "\n";
+    std::cerr << "[info] ngrams3: " << grams3.size() << "\n";
+    std::cerr << "[info] total: " << grams3.size() + grams2.size() + grams1.size() << "\n";
 
-        PrepareNgramKeys(grams1, keys);
-        PrepareNgramKeys(grams2, keys);
-        PrepareNgramKeys(grams3, keys);
+    std::vector<TWordId> keys1 = PackNgramKeys(grams1);
+    std::vector<TWordId> keys2 = PackNgramKeys(grams2);
+    std::vector<TWordId> keys3 = PackNgramKeys(grams3);
 
-        std::cerr << "[info] generating perf hash" << std::endl;
+    std::cerr << "[info] generating perf hash" << std::endl;
 
-        PerfectHash.Init(keys);
+    if (!PerfectHash.Init({MakePackedKeys<TNgramCounts::TGrams1>(keys1),
+                           MakePackedKeys<TNgramCounts::TGrams2>(keys2),
+                           MakePackedKeys<TNgramCounts::TGrams3>(keys3)}))
+    {
+        std::cerr << "[error] failed to build perfect hash" << std::endl;
+        return false;
     }
 
     std::cerr << "[info] finished, buckets: " << PerfectHash.BucketsNumber() << "\n";
 
-    Buckets.resize(PerfectHash.BucketsNumber());
-    InitializeBuckets(grams1, PerfectHash, Buckets);
-    InitializeBuckets(grams2, PerfectHash, Buckets);
-    InitializeBuckets(grams3, PerfectHash, Buckets);
+    Buckets.assign(PerfectHash.BucketsNumber(), std::pair<uint16_t, uint16_t>());
+    InitializeBuckets(grams1, keys1, PerfectHash, Buckets);
+    InitializeBuckets(grams2, keys2, PerfectHash, Buckets);
+    InitializeBuckets(grams3, keys3, PerfectHash, Buckets);
 
     std::cerr << "[info] buckets filled" << std::endl;
 
+    NgramCounts = {uint64_t(grams1.size()), uint64_t(grams2.size()), uint64_t(grams3.size())};
+    FilledBuckets = grams1.size() + grams2.size() + grams3.size();
+
     std::stringbuf checkSumBuf;
     std::ostream checkSumOut(&checkSumBuf);
     NHandyPack::Dump(checkSumOut, trainStarTime, grams1.size(), grams2.size(),
-                    grams3.size(), Buckets.size(), trainText.size(), sentences.size());
+                    grams3.size(), Buckets.size(), counts.TotalWords);
     std::string checkSumStr = checkSumBuf.str();
     CheckSum = CityHash64(&checkSumStr[0], checkSumStr.size());
     return true;
@@ -198,10 +372,19 @@ double TLangModel::Score(const TWords& words) const {
     for (auto&& w: words) {
         sentence.push_back(GetWordIdNoCreate(w));
     }
-    if (sentence.empty()) {
+    return Score(sentence);
+}
+
+double TLangModel::Score(const std::wstring& str) const {
+    return Score(GetWordIds(str));
+}
+
+double TLangModel::Score(const TWordIds& words) const {
+    if (words.empty()) {
         return std::numeric_limits<double>::min();
     }
 
+    TWordIds sentence(words);
     sentence.push_back(UnknownWordId);
     sentence.push_back(UnknownWordId);
 
@@ -214,15 +397,60 @@ double TLangModel::Score(const TWords& words) const {
     return result;
 }
 
-double TLangModel::Score(const std::wstring& str) const {
+template<typename TFunc>
+void ParallelFor(size_t count, size_t threads, TFunc func) {
+    // a thread should have enough work to pay for its start
+    constexpr size_t MIN_ITEMS_PER_THREAD = 16;
+    if (threads == 0) {
+        threads = std::max(1u, std::thread::hardware_concurrency());
+    }
+    threads = std::min(threads, std::max<size_t>(1, count / MIN_ITEMS_PER_THREAD));
+    if (threads <= 1) {
+        for (size_t i = 0; i < count; ++i) {
+            func(i);
+        }
+        return;
+    }
+    std::vector<std::thread> workers;
+    size_t chunk = (count + threads - 1) / threads;
+    for (size_t from = 0; from < count; from += chunk) {
+        size_t to = std::min(count, from + chunk);
+        workers.emplace_back([from, to, &func]() {
+            for (size_t i = from; i < to; ++i) {
+                func(i);
+            }
+        });
+    }
+    for (auto&& worker: workers) {
+        worker.join();
+    }
+}
+
+std::vector<double> TLangModel::ScoreBatch(const std::vector<std::wstring>& sentences, size_t threads) const {
+    std::vector<double> scores(sentences.size());
+    ParallelFor(sentences.size(), threads, [&](size_t i) {
+        scores[i] = Score(sentences[i]);
+    });
+    return scores;
+}
+
+std::vector<double> TLangModel::ScoreBatch(const TWordId* ids, const uint32_t* offsets, size_t count, size_t threads) const {
+    std::vector<double> scores(count);
+    ParallelFor(count, threads, [&](size_t i) {
+        scores[i] = Score(TWordIds(ids + offsets[i], ids + offsets[i + 1]));
+    });
+    return scores;
+}
+
+TWordIds TLangModel::GetWordIds(const std::wstring& str) const {
     TSentences sentences = Tokenizer.Process(str);
-    TWords words;
+    TWordIds words;
     for (auto&& s: sentences) {
         for (auto&& w: s) {
-            words.push_back(w);
+            words.push_back(GetWordIdNoCreate(w));
         }
     }
-    return Score(words);
+    return words;
 }
 
 bool TLangModel::Dump(const std::string& modelFileName) const {
@@ -233,6 +461,7 @@ bool TLangModel::Dump(const std::string& modelFileName) const {
     NHandyPack::Dump(out, LANG_MODEL_MAGIC_BYTE);
     NHandyPack::Dump(out, LANG_MODEL_VERSION);
     Dump(out);
+    NHandyPack::Dump(out, NgramCounts);
     NHandyPack::Dump(out, LANG_MODEL_MAGIC_BYTE);
     return true;
 }
@@ -249,33 +478,39 @@ bool TLangModel::Load(const std::string& modelFileName) {
         return false;
     }
     NHandyPack::Load(in, version);
-    if (version != LANG_MODEL_VERSION) {
+    if (version < LANG_MODEL_MIN_VERSION || version > LANG_MODEL_VERSION) {
         return false;
     }
     Load(in);
+    NgramCounts.clear();
+    if (version >= 10) {
+        NHandyPack::Load(in, NgramCounts);
+    }
     magicByte = 0;
     NHandyPack::Load(in, magicByte);
     if (magicByte != LANG_MODEL_MAGIC_BYTE) {
         Clear();
         return false;
     }
-    IdToWord.clear();
-    IdToWord.resize(WordToId.size() + 1, nullptr);
-    for (auto&& it: WordToId) {
-        IdToWord[it.second] = &it.first;
+    FilledBuckets = 0;
+    for (auto&& bucket: Buckets) {
+        // packed count of a stored n-gram is never zero
+        FilledBuckets += bucket.second != 0;
     }
     return true;
 }
 
 void TLangModel::Clear() {
     K = LANG_MODEL_DEFAULT_K;
-    WordToId.clear();
+    WordToId.Clear();
     LastWordID = 0;
     TotalWords = 0;
     Tokenizer.Clear();
+    NgramCounts.clear();
+    FilledBuckets = 0;
 }
 
-const TRobinHash& TLangModel::GetWordToId() {
+const TVocabulary& TLangModel::GetVocabulary() const {
     return WordToId;
 }
 
@@ -296,48 +531,60 @@ TIdSentences TLangModel::ConvertToIds(const TSentences& sentences) {
 TWordId TLangModel::GetWordId(const TWord& word) {
     assert(word.Ptr && word.Len);
     assert(word.Len < 10000);
-    std::wstring w(word.Ptr, word.Len);
-    auto it = WordToId.find(w);
-    if (it != WordToId.end()) {
-        return it->second;
-    }
-    TWordId wordId = LastWordID;
-    ++LastWordID;
-    it = WordToId.insert(std::make_pair(w, wordId)).first;
-    IdToWord.push_back(&(it->first));
+    TWordId wordId = WordToId.Insert(word.Ptr, word.Len);
+    LastWordID = WordToId.Size();
     return wordId;
 }
 
 TWordId TLangModel::GetWordIdNoCreate(const TWord& word) const {
-    std::wstring w(word.Ptr, word.Len);
-    auto it = WordToId.find(w);
-    if (it != WordToId.end()) {
-        return it->second;
-    }
-    return UnknownWordId;
+    TWordId wordId = WordToId.Find(word.Ptr, word.Len);
+    return wordId == TVocabulary::NO_ID ? UnknownWordId : wordId;
 }
 
 TWord TLangModel::GetWordById(TWordId wid) const {
-    if (wid >= IdToWord.size()) {
-        return TWord();
-    }
-    return TWord(*IdToWord[wid]);
+    return WordToId.GetWord(wid);
 }
 
 TCount TLangModel::GetWordCount(TWordId wid) const {
     return GetGram1HashCount(wid);
 }
 
+TModelInfo TLangModel::GetInfo() const {
+    TModelInfo info;
+    info.WordToIdBytes = WordToId.IndexMemoryUsage();
+    info.IdToWordBytes = WordToId.MemoryUsage() - info.WordToIdBytes;
+    info.BucketsBytes = Buckets.capacity() * sizeof(Buckets[0]);
+    info.PerfectHashBytes = PerfectHash.MemoryUsage();
+    // unordered_set node is next pointer and value
+    const std::unordered_set<wchar_t>& alphabet = Tokenizer.GetAlphabet();
+    info.AlphabetBytes = alphabet.bucket_count() * sizeof(void*) + alphabet.size() * 2 * sizeof(void*);
+
+    info.VocabSize = VocabSize;
+    info.Grams1 = NgramCounts.size() == 3 ? NgramCounts[0] : VocabSize;
+    info.Grams2 = NgramCounts.size() == 3 ? NgramCounts[1] : 0;
+    info.Grams3 = NgramCounts.size() == 3 ? NgramCounts[2] : 0;
+    info.Ngrams = FilledBuckets;
+    info.BucketsNumber = Buckets.size();
+    if (!Buckets.empty()) {
+        info.BucketLoadFactor = double(FilledBuckets) / double(Buckets.size());
+    }
+    return info;
+}
+
 uint64_t TLangModel::GetCheckSum() const {
     return CheckSum;
 }
 
+TWordId TLangModel::GetUnknownWordId() const {
+    return UnknownWordId;
+}
+
 TWord TLangModel::GetWord(const std::wstring& word) const {
-    auto it = WordToId.find(word);
-    if (it != WordToId.end()) {
-        return TWord(&it->first[0], it->first.size());
-    }
-    return TWord();
+    return WordToId.GetWord(WordToId.Find(word));
+}
+
+TWord TLangModel::GetWord(const TWord& word) const {
+    return WordToId.GetWord(WordToId.Find(word.Ptr, word.Len));
 }
 
 const std::unordered_set<wchar_t>& TLangModel::GetAlphabet() const {
@@ -366,7 +613,11 @@ double TLangModel::GetGram2Prob(TWordId word1, TWordId word2) const {
 }
 
 double TLangModel::GetGram3Prob(TWordId word1, TWordId word2, TWordId word3) const {
-    double countsGram2 = GetGram2HashCount(word1, word2);
+    return GetGram3Prob(word1, word2, word3, GetGram2HashCount(word1, word2));
+}
+
+double TLangModel::GetGram3Prob(TWordId word1, TWordId word2, TWordId word3, TCount gram2Count) const {
+    double countsGram2 = gram2Count;
     double countsGram3 = GetGram3HashCount(word1, word2, word3);
     if (countsGram3 > countsGram2) { // hash collision
         countsGram3 = 0;
@@ -376,27 +627,29 @@ double TLangModel::GetGram3Prob(TWordId word1, TWordId word2, TWordId word3) con
     return countsGram3 / countsGram2;
 }
 
+static thread_local uint64_t NgramLookups = 0;
+
+uint64_t TLangModel::GetLookupsCount() {
+    return NgramLookups;
+}
+
 template<typename T>
-TCount GetGramHashCount(T key,
+TCount GetGramHashCount(const T& key,
                         const TPerfectHash& ph,
                         const std::vector<std::pair<uint16_t, uint16_t>>& buckets)
 {
-    constexpr int TMP_BUF_SIZE = 128;
-    static char tmpBuff[TMP_BUF_SIZE];
-    static MemStream tmpBuffStream(tmpBuff, TMP_BUF_SIZE - 1);
-    static std::ostream out(&tmpBuffStream);
-
-    tmpBuffStream.Reset();
-
-    NHandyPack::Dump(out, key);
+    constexpr size_t keyWords = TNgramKeyWords<T>::Value;
+    TWordId packed[keyWords];
+    PackKey(key, packed);
+    ++NgramLookups;
 
-    uint32_t bucket = ph.Hash(tmpBuff, tmpBuffStream.Size());
+    uint32_t bucket = ph.Hash((const char*)packed, sizeof(packed));
 
     assert(bucket < ph.BucketsNumber());
     const std::pair<uint16_t, uint16_t>& data = buckets[bucket];
 
     TCount res = TCount();
-    if (data.first == CityHash16(tmpBuff, tmpBuffStream.Size())) {
+    if (data.first == CityHash16((const char*)packed, sizeof(packed))) {
         res = UnpackInt32(data.second);
     }
     return res;
@@ -7,18 +7,24 @@
 #include <limits>
 
 #include <contrib/handypack/handypack.hpp>
-#include <contrib/tsl/robin_map.h>
 #include "utils.hpp"
 #include "perfect_hash.hpp"
+#include "model_info.hpp"
+#include "vocabulary.hpp"
 
 
 namespace NJamSpell {
 
 
 constexpr uint64_t LANG_MODEL_MAGIC_BYTE = 8559322735408079685L;
-constexpr uint16_t LANG_MODEL_VERSION = 9;
+constexpr uint16_t LANG_MODEL_VERSION = 10;
+// previous version without n-gram counts per order, still loaded
+constexpr uint16_t LANG_MODEL_MIN_VERSION = 9;
 constexpr double LANG_MODEL_DEFAULT_K = 0.05;
 
+constexpr uint64_t COUNT_SHARD_MAGIC_BYTE = 7726859358251820621L;
+constexpr uint16_t COUNT_SHARD_VERSION = 1;
+
 using TWordId = uint32_t;
 using TCount = uint32_t;
 
@@ -44,23 +50,41 @@ public:
   }
 };
 
-class TRobinSerializer: public NHandyPack::TUnorderedMapSerializer<tsl::robin_map<std::wstring, TWordId>, std::wstring, TWordId> {};
-class TRobinHash: public tsl::robin_map<std::wstring, TWordId> {
-public:
-    inline virtual void Dump(std::ostream& out) const {
-        TRobinSerializer::Dump(out, *this);
-    }
-    inline virtual void Load(std::istream& in) {
-        TRobinSerializer::Load(in, *this);
-    }
+// N-gram counts sorted by key, in word ids of the vocabulary they were counted with
+struct TNgramCounts {
+    using TGrams1 = std::vector<std::pair<TGram1Key, TCount>>;
+    using TGrams2 = std::vector<std::pair<TGram2Key, TCount>>;
+    using TGrams3 = std::vector<std::pair<TGram3Key, TCount>>;
+
+    TGrams1 Grams1;
+    TGrams2 Grams2;
+    TGrams3 Grams3;
+    uint64_t TotalWords = 0;
+
+    HANDYPACK(Grams1, Grams2, Grams3, TotalWords)
 };
 
 class TLangModel {
 public:
     bool Train(const std::string& fileName, const std::string& alphabetFile);
+    // Counts n-grams of one part of corpus into a shard with its own vocabulary.
+    // Shards are merged by TrainFromShards(), the model is the same as trained
+    // on their texts concatenated in the same order (except checksum), as long
+    // as every text ends with a complete sentence.
+    static bool CountShard(const std::string& fileName, const std::string& alphabetFile, const std::string& shardFile);
+    bool TrainFromShards(const std::vector<std::string>& shardFiles);
     double Score(const TWords& words) const;
     double Score(const std::wstring& str) const;
+    double Score(const TWordIds& sentence) const;
+    // same as Score() of each sentence, threads = 0 means all cores
+    std::vector<double> ScoreBatch(const std::vector<std::wstring>& sentences, size_t threads = 0) const;
+    // count sentences of word ids, i-th one is ids[offsets[i]]..ids[offsets[i + 1]]
+    std::vector<double> ScoreBatch(const TWordId* ids, const uint32_t* offsets, size_t count, size_t threads = 0) const;
+    // ids of words the way Score(str) sees them, UnknownWordId for missing
+    TWordIds GetWordIds(const std::wstring& str) const;
     TWord GetWord(const std::wstring& word) const;
+    // model's own copy of the word, empty if unknown
+    TWord GetWord(const TWord& word) const;
     const std::unordered_set<wchar_t>& GetAlphabet() const;
     TSentences Tokenize(const std::wstring& text) const;
 
@@ -68,7 +92,7 @@ public:
     bool Load(const std::string& modelFileName);
     void Clear();
 
-    const TRobinHash& GetWordToId();
+    const TVocabulary& GetVocabulary() const;
 
     TWordId GetWordId(const TWord& word);
     TWordId GetWordIdNoCreate(const TWord& word) const;
@@ -76,25 +100,34 @@ public:
     TCount GetWordCount(TWordId wid) const;
 
     uint64_t GetCheckSum() const;
+    TWordId GetUnknownWordId() const;
+
+    double GetGram1Prob(TWordId word) const;
+    double GetGram2Prob(TWordId word1, TWordId word2) const;
+    double GetGram3Prob(TWordId word1, TWordId word2, TWordId word3) const;
+    double GetGram3Prob(TWordId word1, TWordId word2, TWordId word3, TCount gram2Count) const;
+    TCount GetGram2HashCount(TWordId word1, TWordId word2) const;
+
+    // number of n-gram hash lookups done by the calling thread
+    static uint64_t GetLookupsCount();
+    // memory footprint and statistics, Deletes are filled by TSpellCorrector
+    TModelInfo GetInfo() const;
 
     HANDYPACK(WordToId, LastWordID, TotalWords, VocabSize,
               PerfectHash, Buckets, Tokenizer, CheckSum)
 private:
     TIdSentences ConvertToIds(const TSentences& sentences);
-
-    double GetGram1Prob(TWordId word) const;
-    double GetGram2Prob(TWordId word1, TWordId word2) const;
-    double GetGram3Prob(TWordId word1, TWordId word2, TWordId word3) const;
+    // tokenizer alphabet must be loaded
+    bool CountNgrams(const std::string& fileName, TNgramCounts& counts);
+    bool BuildModel(const TNgramCounts& counts, uint64_t trainStartTime);
 
     TCount GetGram1HashCount(TWordId word) const;
-    TCount GetGram2HashCount(TWordId word1, TWordId word2) const;
     TCount GetGram3HashCount(TWordId word1, TWordId word2, TWordId word3) const;
 
 private:
     const TWordId UnknownWordId = std::numeric_limits<TWordId>::max();
     double K = LANG_MODEL_DEFAULT_K;
-    TRobinHash WordToId;
-    std::vector<const std::wstring*> IdToWord;
+    TVocabulary WordToId;
     TWordId LastWordID = 0;
     TWordId TotalWords = 0;
     TWordId VocabSize = 0;
@@ -102,6 +135,9 @@ private:
     std::vector<std::pair<uint16_t, uint16_t>> Buckets;
     TPerfectHash PerfectHash;
     uint64_t CheckSum;
+    // 1, 2 and 3 grams, saved after HANDYPACK fields since version 10
+    std::vector<uint64_t> NgramCounts;
+    uint64_t FilledBuckets = 0;
 };
 
 
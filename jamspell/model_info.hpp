@@ -0,0 +1,36 @@
+#pragma once
+
+#include <cstdint>
+
+namespace NJamSpell {
+
+// Where memory of a loaded model goes. Sizes are bytes allocated by each
+// component including container overhead (estimated for hash tables).
+struct TModelInfo {
+    // vocabulary index by word and words arena with offsets by id
+    uint64_t WordToIdBytes = 0;
+    uint64_t IdToWordBytes = 0;
+    uint64_t BucketsBytes = 0;
+    uint64_t PerfectHashBytes = 0;
+    uint64_t AlphabetBytes = 0;
+    // zero until .spell cache is ready
+    uint64_t Deletes1Bytes = 0;
+    uint64_t Deletes2Bytes = 0;
+
+    uint64_t VocabSize = 0;
+    // 2 and 3 grams are zero for models saved before counts per order were kept
+    uint64_t Grams1 = 0;
+    uint64_t Grams2 = 0;
+    uint64_t Grams3 = 0;
+    // all orders, same as number of filled buckets
+    uint64_t Ngrams = 0;
+    uint64_t BucketsNumber = 0;
+    double BucketLoadFactor = 0.0;
+
+    uint64_t TotalBytes() const {
+        return WordToIdBytes + IdToWordBytes + BucketsBytes + PerfectHashBytes +
+               AlphabetBytes + Deletes1Bytes + Deletes2Bytes;
+    }
+};
+
+} // NJamSpell
@@ -32,22 +32,50 @@ void TPerfectHash::Load(std::istream& in) {
     in.read((char*)perfHash.g, perfHash.r * sizeof(uint32_t));
 }
 
+static phf* InitPhf(const std::vector<phf_string_t>& keysForPhf) {
+    phf* tempPhf = new phf();
+    phf_error_t res = PHF::init<phf_string_t, false>(tempPhf, &keysForPhf[0], keysForPhf.size(), 4, 80, 42);
+    if (res != 0) {
+        PHF::destroy(tempPhf);
+        delete tempPhf;
+        return nullptr;
+    }
+    return tempPhf;
+}
+
 bool TPerfectHash::Init(const std::vector<std::string>& keys) {
     std::vector<phf_string_t> keysForPhf;
     keysForPhf.reserve(keys.size());
     for (const std::string& s: keys) {
         keysForPhf.push_back({&s[0], s.size()});
     }
+    phf* newPhf = InitPhf(keysForPhf);
+    if (!newPhf) {
+        return false;
+    }
+    Clear();
+    Phf = newPhf;
+    return true;
+}
 
-    phf* tempPhf = new phf();
-    phf_error_t res = PHF::init<phf_string_t, false>(tempPhf, &keysForPhf[0], keysForPhf.size(), 4, 80, 42);
-    if (res != 0) {
-        PHF::destroy(tempPhf);
-        delete tempPhf;
+bool TPerfectHash::Init(const std::vector<TPackedKeys>& keys) {
+    size_t total = 0;
+    for (const TPackedKeys& k: keys) {
+        total += k.Count;
+    }
+    std::vector<phf_string_t> keysForPhf;
+    keysForPhf.reserve(total);
+    for (const TPackedKeys& k: keys) {
+        for (size_t i = 0; i < k.Count; ++i) {
+            keysForPhf.push_back({(void*)(k.Data + i * k.KeySize), k.KeySize});
+        }
+    }
+    phf* newPhf = InitPhf(keysForPhf);
+    if (!newPhf) {
         return false;
     }
     Clear();
-    Phf = tempPhf;
+    Phf = newPhf;
     return true;
 }
 
@@ -70,6 +98,14 @@ uint32_t TPerfectHash::Hash(const char* value, size_t size) const {
     return PHF::hash<phf_string_t>((phf*)Phf, phfValue);
 }
 
+uint64_t TPerfectHash::MemoryUsage() const {
+    if (!Phf) {
+        return 0;
+    }
+    const phf& perfHash = *(const phf*)Phf;
+    return sizeof(phf) + perfHash.r * sizeof(uint32_t);
+}
+
 uint32_t TPerfectHash::BucketsNumber() const {
     const phf* p = (phf*)Phf;
     return p->m;
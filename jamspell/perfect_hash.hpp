@@ -1,9 +1,18 @@
 #pragma once
 
 #include <ostream>
+#include <string>
+#include <vector>
 
 namespace NJamSpell {
 
+// Count keys of KeySize bytes each, stored one after another
+struct TPackedKeys {
+    const char* Data = nullptr;
+    size_t KeySize = 0;
+    size_t Count = 0;
+};
+
 class TPerfectHash {
 public:
     TPerfectHash();
@@ -12,10 +21,12 @@ public:
     void Dump(std::ostream& out) const;
     void Load(std::istream& in);
     bool Init(const std::vector<std::string>& keys);
+    bool Init(const std::vector<TPackedKeys>& keys);
     void Clear();
     uint32_t Hash(const std::string& value) const;
     uint32_t Hash(const char* value, size_t size) const;
     uint32_t BucketsNumber() const;
+    uint64_t MemoryUsage() const;
 private:
     void* Phf; // sort of forward declaration
 };
@@ -0,0 +1,132 @@
+# Inserted into the generated jamspell module by jamspell.i (%pythoncode),
+# so TSpellCorrector and friends are available here as module globals.
+
+import asyncio
+import concurrent.futures
+
+
+class _AsyncCall(object):
+    __slots__ = ('method', 'args', 'future', 'cancelled')
+
+    def __init__(self, method, args, future):
+        self.method = method
+        self.args = args
+        self.future = future
+        self.cancelled = False
+
+
+class AsyncSpellCorrector(object):
+    """asyncio front-end for a loaded TSpellCorrector.
+
+    Calls are coalesced into batches, each batch is split between the
+    workers of a bounded thread pool. The native methods release the GIL,
+    so the event loop keeps running while words are being corrected. A call cancelled before its batch
+    reaches the pool is skipped; a call already running completes and its
+    result is dropped.
+    """
+
+    def __init__(self, corrector, maxWorkers=4, maxConcurrency=256,
+                 maxBatchSize=32, batchDelay=0.001):
+        if maxWorkers < 1 or maxConcurrency < 1 or maxBatchSize < 1:
+            raise ValueError('maxWorkers, maxConcurrency and maxBatchSize must be positive')
+        self.corrector = corrector
+        self.maxBatchSize = maxBatchSize
+        self.batchDelay = batchDelay
+        self.__maxWorkers = maxWorkers
+        self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=maxWorkers)
+        self.__maxConcurrency = maxConcurrency
+        self.__semaphore = None
+        self.__pending = []
+        self.__flushHandle = None
+        self.__closed = False
+
+    async def fix(self, text):
+        return await self.__submit(self.corrector.FixFragment, (text,))
+
+    async def candidates(self, sentence, position):
+        return await self.__submit(self.corrector.GetCandidates, (list(sentence), position))
+
+    async def candidates_with_scores(self, sentence, position):
+        return await self.__submit(self.corrector.GetCandidatesWithScores, (list(sentence), position))
+
+    async def fix_many(self, texts):
+        return await asyncio.gather(*[self.fix(text) for text in texts])
+
+    def close(self):
+        self.__closed = True
+        self.__flush()
+        self.__executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, excType, exc, tb):
+        self.__closed = True
+        self.__flush()
+        await asyncio.get_running_loop().run_in_executor(None, self.__executor.shutdown, True)
+
+    async def __submit(self, method, args):
+        if self.__closed:
+            raise RuntimeError('AsyncSpellCorrector is closed')
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.__maxConcurrency)
+        async with self.__semaphore:
+            loop = asyncio.get_running_loop()
+            call = _AsyncCall(method, args, loop.create_future())
+            self.__pending.append(call)
+            if len(self.__pending) >= self.maxBatchSize:
+                self.__flush()
+            elif self.__flushHandle is None:
+                self.__flushHandle = loop.call_later(self.batchDelay, self.__flush)
+            try:
+                return await call.future
+            except asyncio.CancelledError:
+                call.cancelled = True
+                raise
+
+    def __flush(self):
+        if self.__flushHandle is not None:
+            self.__flushHandle.cancel()
+            self.__flushHandle = None
+        if not self.__pending:
+            return
+        batch, self.__pending = self.__pending, []
+        # close() may be called outside of the loop the calls are waiting in
+        loop = batch[0].future.get_loop()
+        parts = min(self.__maxWorkers, len(batch))
+        for i in range(parts):
+            part = batch[len(batch) * i // parts:len(batch) * (i + 1) // parts]
+            done = loop.run_in_executor(self.__executor, _runAsyncBatch, part)
+            done.add_done_callback(lambda f, part=part: _finishAsyncBatch(part, f))
+
+
+def _runAsyncBatch(batch):
+    results = []
+    for call in batch:
+        if call.cancelled:
+            results.append((None, None))
+            continue
+        try:
+            result = call.method(*call.args)
+            if isinstance(result, tuple):
+                result = list(result)
+            results.append((result, None))
+        except Exception as e:
+            results.append((None, e))
+    return results
+
+
+def _finishAsyncBatch(batch, batchFuture):
+    if batchFuture.cancelled():
+        results = [(None, asyncio.CancelledError())] * len(batch)
+    elif batchFuture.exception() is not None:
+        results = [(None, batchFuture.exception())] * len(batch)
+    else:
+        results = batchFuture.result()
+    for call, (result, error) in zip(batch, results):
+        if call.future.done():
+            continue
+        if error is not None:
+            call.future.set_exception(error)
+        else:
+            call.future.set_result(result)
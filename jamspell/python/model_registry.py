@@ -0,0 +1,84 @@
+# Inserted into the generated jamspell module by jamspell.i (%pythoncode),
+# so TSpellCorrector is available here as module global.
+
+import collections
+import threading
+
+
+class ModelRegistry(object):
+    """Loads correctors by model id on first use and shares them across callers.
+
+    Each model is accounted by its in-memory size from GetInfo().
+    When the total exceeds memoryBudget (bytes, 0 - no limit) least recently
+    used models are dropped from the registry; a corrector still held by a
+    caller is freed when the caller releases it.
+    """
+
+    def __init__(self, memoryBudget=0, cacheDir=None):
+        self.memoryBudget = memoryBudget
+        self.cacheDir = cacheDir
+        self.__files = {}
+        self.__models = collections.OrderedDict()
+        self.__memory = {}
+        self.__lock = threading.Lock()
+        # one per model: concurrent callers wait for a single load, other
+        # models load in parallel
+        self.__loadLocks = {}
+
+    def add(self, modelId, modelFile):
+        with self.__lock:
+            self.__files[modelId] = modelFile
+            self.__loadLocks.setdefault(modelId, threading.Lock())
+
+    def get(self, modelId):
+        with self.__lock:
+            if modelId not in self.__files:
+                raise KeyError(modelId)
+            if modelId in self.__models:
+                self.__models.move_to_end(modelId)
+                return self.__models[modelId]
+            loadLock = self.__loadLocks[modelId]
+        with loadLock:
+            with self.__lock:
+                if modelId in self.__models:
+                    self.__models.move_to_end(modelId)
+                    return self.__models[modelId]
+                modelFile = self.__files[modelId]
+            corrector = TSpellCorrector()
+            if self.cacheDir:
+                corrector.SetCacheDir(self.cacheDir)
+            if not corrector.LoadLangModel(modelFile):
+                raise Exception('failed to load model %s' % modelFile)
+            memory = corrector.GetInfo().TotalBytes()
+            with self.__lock:
+                self.__models[modelId] = corrector
+                self.__memory[modelId] = memory
+                self.__evict()
+            return corrector
+
+    def unload(self, modelId):
+        with self.__lock:
+            self.__models.pop(modelId, None)
+            self.__memory.pop(modelId, None)
+
+    def loaded(self):
+        with self.__lock:
+            return list(self.__models)
+
+    def memoryUsage(self, modelId=None):
+        with self.__lock:
+            if modelId is not None:
+                return self.__memory.get(modelId, 0)
+            return sum(self.__memory.values())
+
+    def __contains__(self, modelId):
+        with self.__lock:
+            return modelId in self.__files
+
+    def __evict(self):
+        if not self.memoryBudget:
+            return
+        # the last one is just loaded and always stays
+        while len(self.__models) > 1 and sum(self.__memory.values()) > self.memoryBudget:
+            modelId, _ = self.__models.popitem(last=False)
+            del self.__memory[modelId]
@@ -0,0 +1,160 @@
+#include <algorithm>
+
+#include "session.hpp"
+
+namespace NJamSpell {
+
+void TCorrectionSession::SetText(const std::wstring& text) {
+    Text = text;
+}
+
+bool TCorrectionSession::ApplyEdit(size_t start, size_t len, const std::wstring& replacement) {
+    if (start > Text.size() || len > Text.size() - start) {
+        return false;
+    }
+    Text.replace(start, len, replacement);
+    return true;
+}
+
+const std::wstring& TCorrectionSession::GetText() const {
+    return Text;
+}
+
+std::wstring TCorrectionSession::FixFragment(const TSpellCorrector& corrector) {
+    CheckCorrector(corrector);
+    const TLangModel& langModel = corrector.GetLangModel();
+    TSentences origSentences = langModel.Tokenize(Text);
+    std::wstring lowered = Text;
+    ToLower(lowered);
+    TSentences sentences = langModel.Tokenize(lowered);
+    TCache cache;
+    std::wstring result;
+    size_t origPos = 0;
+    for (size_t i = 0; i < sentences.size(); ++i) {
+        std::wstring key = SentenceKey(sentences[i]);
+        auto it = cache.find(key);
+        if (it == cache.end()) {
+            auto prev = FixCache.find(key);
+            if (prev != FixCache.end()) {
+                Reused += 1;
+                it = cache.insert(std::make_pair(key, std::move(prev->second))).first;
+            } else {
+                Recomputed += 1;
+                TSentenceResult sentenceResult;
+                for (auto&& w: corrector.FixSentence(sentences[i])) {
+                    sentenceResult.Words.push_back(std::wstring(w.Ptr, w.Len));
+                }
+                it = cache.insert(std::make_pair(key, std::move(sentenceResult))).first;
+            }
+        } else {
+            Reused += 1;
+        }
+        const std::vector<std::wstring>& words = it->second.Words;
+        for (size_t j = 0; j < words.size(); ++j) {
+            TWord fixed(words[j].data(), words[j].size());
+            AppendFixedWord(Text, origSentences[i][j], sentences[i][j], fixed, origPos, result);
+        }
+    }
+    result.append(Text, origPos, std::wstring::npos);
+    FixCache.swap(cache);
+    return result;
+}
+
+TCorrections TCorrectionSession::GetCorrections(const TSpellCorrector& corrector, size_t maxCandidates) {
+    CheckCorrector(corrector);
+    std::wstring lowered = Text;
+    ToLower(lowered);
+    TSentences sentences = corrector.GetLangModel().Tokenize(lowered);
+    TCache cache;
+    TCorrections corrections;
+    for (const TWords& sentence: sentences) {
+        std::wstring key = SentenceKey(sentence);
+        auto it = cache.find(key);
+        if (it == cache.end()) {
+            auto prev = CorrectionsCache.find(key);
+            if (prev != CorrectionsCache.end()) {
+                Reused += 1;
+                it = cache.insert(std::make_pair(key, std::move(prev->second))).first;
+            } else {
+                Recomputed += 1;
+                // all candidates are kept, maxCandidates may differ next time
+                TSentenceResult sentenceResult;
+                for (size_t j = 0; j < sentence.size(); ++j) {
+                    TWords candidates = corrector.GetCandidatesRaw(sentence, j);
+                    if (candidates.empty()) {
+                        continue;
+                    }
+                    const TWord& word = sentence[j];
+                    if (std::wstring(word.Ptr, word.Len) == std::wstring(candidates[0].Ptr, candidates[0].Len)) {
+                        continue;
+                    }
+                    sentenceResult.Positions.push_back(j);
+                    sentenceResult.Candidates.emplace_back();
+                    for (auto&& c: candidates) {
+                        sentenceResult.Candidates.back().push_back(std::wstring(c.Ptr, c.Len));
+                    }
+                }
+                it = cache.insert(std::make_pair(key, std::move(sentenceResult))).first;
+            }
+        } else {
+            Reused += 1;
+        }
+        const TSentenceResult& sentenceResult = it->second;
+        for (size_t k = 0; k < sentenceResult.Positions.size(); ++k) {
+            const TWord& word = sentence[sentenceResult.Positions[k]];
+            corrections.Starts.push_back(word.Ptr - &lowered[0]);
+            corrections.Lengths.push_back(word.Len);
+            const std::vector<std::wstring>& candidates = sentenceResult.Candidates[k];
+            size_t candidatesSize = std::min(candidates.size(), maxCandidates);
+            for (size_t c = 0; c < candidatesSize; ++c) {
+                corrections.CandidateText += WideToUTF8(candidates[c]);
+                corrections.CandidateOffsets.push_back(corrections.CandidateText.size());
+            }
+            corrections.Candidates.push_back(corrections.CandidateOffsets.size() - 1);
+        }
+    }
+    CorrectionsCache.swap(cache);
+    return corrections;
+}
+
+size_t TCorrectionSession::GetRecomputed() const {
+    return Recomputed;
+}
+
+size_t TCorrectionSession::GetReused() const {
+    return Reused;
+}
+
+void TCorrectionSession::Clear() {
+    Text.clear();
+    FixCache.clear();
+    CorrectionsCache.clear();
+    Corrector = nullptr;
+    CheckSum = 0;
+    Recomputed = 0;
+    Reused = 0;
+}
+
+void TCorrectionSession::CheckCorrector(const TSpellCorrector& corrector) {
+    uint64_t checkSum = corrector.GetLangModel().GetCheckSum();
+    if (Corrector != &corrector || CheckSum != checkSum) {
+        FixCache.clear();
+        CorrectionsCache.clear();
+        Corrector = &corrector;
+        CheckSum = checkSum;
+    }
+    Recomputed = 0;
+    Reused = 0;
+}
+
+std::wstring TCorrectionSession::SentenceKey(const TWords& sentence) {
+    // words are made of alphabet letters only, space can't be a part of them
+    std::wstring key;
+    for (auto&& w: sentence) {
+        key.append(w.Ptr, w.Len);
+        key.push_back(L' ');
+    }
+    return key;
+}
+
+} // NJamSpell
@@ -0,0 +1,53 @@
+#pragma once
+
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+#include "spell_corrector.hpp"
+
+namespace NJamSpell {
+
+// Correction of a text edited over time (editor, chat input). Results of
+// every sentence are cached by its lowercased words, so after an edit only
+// sentences whose words changed are corrected again. Sentences are corrected
+// independently, so results are the same as of a full pass. The cache keeps
+// sentences of the last corrected text only and is dropped when another
+// corrector or model is used. Not thread safe.
+class TCorrectionSession {
+public:
+    void SetText(const std::wstring& text);
+    // replaces len characters at start of current text, false if out of range
+    bool ApplyEdit(size_t start, size_t len, const std::wstring& replacement);
+    const std::wstring& GetText() const;
+
+    // same as corrector.FixFragment(GetText())
+    std::wstring FixFragment(const NJamSpell::TSpellCorrector& corrector);
+    // same as corrector.GetCorrections(GetText(), maxCandidates)
+    NJamSpell::TCorrections GetCorrections(const NJamSpell::TSpellCorrector& corrector, size_t maxCandidates = 7);
+
+    // sentences corrected and taken from cache by the last call
+    size_t GetRecomputed() const;
+    size_t GetReused() const;
+    void Clear();
+private:
+    struct TSentenceResult {
+        std::vector<std::wstring> Words;                // fixed words
+        std::vector<uint32_t> Positions;                // misspelled words
+        std::vector<std::vector<std::wstring>> Candidates;
+    };
+    using TCache = std::unordered_map<std::wstring, TSentenceResult>;
+
+    void CheckCorrector(const NJamSpell::TSpellCorrector& corrector);
+    static std::wstring SentenceKey(const NJamSpell::TWords& sentence);
+private:
+    std::wstring Text;
+    TCache FixCache;
+    TCache CorrectionsCache;
+    const NJamSpell::TSpellCorrector* Corrector = nullptr;
+    uint64_t CheckSum = 0;
+    size_t Recomputed = 0;
+    size_t Reused = 0;
+};
+
+} // NJamSpell
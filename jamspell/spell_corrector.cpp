@@ -1,8 +1,15 @@
 #include <algorithm>
+#include <climits>
+#include <cmath>
+#include <cstdio>
+#include <cstdlib>
 #include <fstream>
+#include <iostream>
 
 #include "spell_corrector.hpp"
 
+#include <contrib/cityhash/city.h>
+
 namespace NJamSpell {
 
 
@@ -30,68 +37,159 @@ static std::vector<std::vector<std::wstring>> GetDeletes2(const std::wstring& w)
     return results;
 }
 
-bool TSpellCorrector::LoadLangModel(const std::string& modelFile) {
+TSpellCorrector::TSpellCorrector()
+    : CacheReady(false)
+{
+}
+
+TSpellCorrector::~TSpellCorrector() {
+    WaitCacheReady();
+}
+
+bool TSpellCorrector::LoadLangModel(const std::string& modelFile, bool backgroundCache) {
+    WaitCacheReady();
+    CacheReady = false;
     if (!LangModel.Load(modelFile)) {
         return false;
     }
-    std::string cacheFile = modelFile + ".spell";
-    if (!LoadCache(cacheFile)) {
+    std::string cacheFile = GetCacheFile(modelFile);
+    if (LoadCache(cacheFile)) {
+        CacheReady = true;
+    } else if (backgroundCache) {
+        std::cerr << "[info] no cache at " << cacheFile << ", building it in background" << std::endl;
+        CacheThread = std::thread(&TSpellCorrector::PrepareCacheInBackground, this, cacheFile);
+    } else {
         PrepareCache();
-        SaveCache(cacheFile);
+        CacheReady = true;
+        if (!SaveCache(cacheFile)) {
+            std::cerr << "[warning] failed to save cache " << cacheFile << std::endl;
+        }
     }
     return true;
 }
 
 bool TSpellCorrector::TrainLangModel(const std::string& textFile, const std::string& alphabetFile, const std::string& modelFile) {
+    WaitCacheReady();
+    CacheReady = false;
     if (!LangModel.Train(textFile, alphabetFile)) {
         return false;
     }
+    return SaveTrainedModel(modelFile);
+}
+
+bool TSpellCorrector::TrainLangModelFromShards(const std::vector<std::string>& shardFiles, const std::string& modelFile) {
+    WaitCacheReady();
+    CacheReady = false;
+    if (!LangModel.TrainFromShards(shardFiles)) {
+        return false;
+    }
+    return SaveTrainedModel(modelFile);
+}
+
+bool TSpellCorrector::SaveTrainedModel(const std::string& modelFile) {
     PrepareCache();
+    CacheReady = true;
     if (!LangModel.Dump(modelFile)) {
         return false;
     }
-    std::string cacheFile = modelFile + ".spell";
+    std::string cacheFile = GetCacheFile(modelFile);
     if (!SaveCache(cacheFile)) {
         return false;
     }
     return true;
 }
 
-TScoredWords TSpellCorrector::GetCandidatesRawWithScores(const TWords& sentence, size_t position) const {
-    TScoredWords scoredCandidates;
-
-    if (position >= sentence.size()) {
-        return scoredCandidates;
+bool TSpellCorrector::GenerateCandidates(const TWord& word, TCandidates& result, TWordTrace* trace,
+                                         const TTimeBudget* budget) const
+{
+    result.FirstLevel = true;
+    result.KnownWord = false;
+    // level allowed by the budget, while result.Degradation reports only
+    // steps which changed the work done for this word
+    EDegradeLevel level = budget ? budget->GetLevel() : DEGRADE_NONE;
+    result.Degradation = level == DEGRADE_SKIPPED ? DEGRADE_SKIPPED : DEGRADE_NONE;
+    if (trace) {
+        trace->Degradation = result.Degradation;
+    }
+    if (result.Degradation == DEGRADE_SKIPPED) {
+        return false;
     }
 
-    TWord w = sentence[position];
+    TWord w = word;
     TWords candidates = Edits2(w);
 
-    bool firstLevel = true;
-    bool knownWord = false;
-    if (candidates.empty()) {
-        candidates = Edits(w);
-        firstLevel = false;
+    if (candidates.empty() && CacheReady.load(std::memory_order_acquire)) {
+        if (budget) {
+            level = std::max(level, budget->GetLevel());
+        }
+        if (level < DEGRADE_NO_EDITS) {
+            candidates = Edits(w);
+            result.FirstLevel = false;
+        } else {
+            // distance 1 candidates are already generated, only edits are skipped
+            result.Degradation = DEGRADE_NO_EDITS;
+        }
+        if (trace) {
+            trace->Degradation = result.Degradation;
+        }
+    }
+
+    if (trace) {
+        trace->Generated = candidates.size();
     }
 
     if (candidates.empty()) {
-        return scoredCandidates;
+        return false;
     }
 
     {
-        TWord c = LangModel.GetWord(std::wstring(w.Ptr, w.Len));
+        TWord c = LangModel.GetWord(w);
         if (c.Ptr && c.Len) {
             w = c;
             candidates.push_back(c);
-            knownWord = true;
+            result.KnownWord = true;
         } else {
             candidates.push_back(w);
         }
     }
+    result.Original = w;
+    result.Words = std::unordered_set<TWord, TWordHashPtr>(candidates.begin(), candidates.end());
+
+    size_t maxCandidates = MaxCandiatesToCheck;
+    if (level >= DEGRADE_FEWER_CANDIDATES) {
+        maxCandidates = std::max(size_t(1), maxCandidates / 2);
+        // degraded only if the smaller limit drops candidates
+        if (result.Words.size() > maxCandidates) {
+            result.Degradation = std::max(result.Degradation, DEGRADE_FEWER_CANDIDATES);
+            if (trace) {
+                trace->Degradation = result.Degradation;
+            }
+        }
+    }
+    FilterCandidatesByFrequency(result.Words, w, maxCandidates);
+    if (trace) {
+        trace->Scored = result.Words.size();
+    }
+    return true;
+}
 
-    std::unordered_set<TWord, TWordHashPtr> uniqueCandidates(candidates.begin(), candidates.end());
+TScoredWords TSpellCorrector::GetCandidatesRawWithScores(const TWords& sentence, size_t position, TWordTrace* trace,
+                                                         const TTimeBudget* budget) const
+{
+    TScoredWords scoredCandidates;
 
-    FilterCandidatesByFrequency(uniqueCandidates, w);
+    if (position >= sentence.size()) {
+        return scoredCandidates;
+    }
+
+    TCandidates candidates;
+    if (!GenerateCandidates(sentence[position], candidates, trace, budget)) {
+        return scoredCandidates;
+    }
+    const TWord& w = candidates.Original;
+    const bool knownWord = candidates.KnownWord;
+    const bool firstLevel = candidates.FirstLevel;
+    const std::unordered_set<TWord, TWordHashPtr>& uniqueCandidates = candidates.Words;
     scoredCandidates.reserve(uniqueCandidates.size());
 
     for (TWord cand: uniqueCandidates) {
@@ -129,9 +227,11 @@ TScoredWords TSpellCorrector::GetCandidatesRawWithScores(const TWords& sentence,
     return scoredCandidates;
 }
 
-TWords TSpellCorrector::GetCandidatesRaw(const TWords& sentence, size_t position) const {
+TWords TSpellCorrector::GetCandidatesRaw(const TWords& sentence, size_t position, TWordTrace* trace,
+                                         const TTimeBudget* budget) const
+{
     TWords candidates;
-    TScoredWords scoredCandidates = GetCandidatesRawWithScores(sentence, position);
+    TScoredWords scoredCandidates = GetCandidatesRawWithScores(sentence, position, trace, budget);
 
     for (auto s: scoredCandidates) {
         candidates.push_back(s.Word);
@@ -139,8 +239,10 @@ TWords TSpellCorrector::GetCandidatesRaw(const TWords& sentence, size_t position
     return candidates;
 }
 
-void TSpellCorrector::FilterCandidatesByFrequency(std::unordered_set<TWord, TWordHashPtr>& uniqueCandidates, TWord origWord) const {
-    if (uniqueCandidates.size() <= MaxCandiatesToCheck) {
+void TSpellCorrector::FilterCandidatesByFrequency(std::unordered_set<TWord, TWordHashPtr>& uniqueCandidates,
+                                                  TWord origWord, size_t maxCandidates) const
+{
+    if (uniqueCandidates.size() <= maxCandidates) {
         return;
     }
 
@@ -155,7 +257,7 @@ void TSpellCorrector::FilterCandidatesByFrequency(std::unordered_set<TWord, TWor
         return a.first > b.first;
     });
 
-    for (size_t i = 0; i < MaxCandiatesToCheck; ++ i) {
+    for (size_t i = 0; i < maxCandidates; ++ i) {
         uniqueCandidates.insert(candidateCounts[i].second);
     }
     uniqueCandidates.insert(origWord);
@@ -190,7 +292,203 @@ std::vector<std::wstring> TSpellCorrector::GetCandidates(const std::vector<std::
     return results;
 }
 
-std::wstring TSpellCorrector::FixFragment(const std::wstring& text) const {
+TWords TSpellCorrector::DecodeSentence(const TWords& sentence, TTrace* trace, const TTimeBudget* budget,
+                                       std::vector<EDegradeLevel>& degradation) const
+{
+    // Lattice of candidates for every position, two unknown words are
+    // appended at the end the same way TLangModel::Score pads a sentence.
+    const size_t n = sentence.size();
+    degradation.assign(n, DEGRADE_NONE);
+    if (n == 0) {
+        return TWords();
+    }
+    const TWordId unknownId = LangModel.GetUnknownWordId();
+    std::vector<TWords> words(n + 2);
+    std::vector<std::vector<TWordId>> ids(n + 2);
+    std::vector<std::vector<double>> penalties(n + 2);
+    std::vector<std::vector<double>> gram1LogProbs(n + 2);
+
+    for (size_t i = 0; i < n; ++i) {
+        TWordTrace wordTrace;
+        uint64_t startTime = trace ? GetCurrentTimeUs() : 0;
+        TCandidates candidates;
+        bool generated = GenerateCandidates(sentence[i], candidates, trace ? &wordTrace : nullptr, budget);
+        degradation[i] = candidates.Degradation;
+        if (!generated) {
+            words[i].push_back(sentence[i]);
+            penalties[i].push_back(0.0);
+        } else {
+            for (auto&& cand: candidates.Words) {
+                double penalty = 0.0;
+                if (!(cand == candidates.Original)) {
+                    if (candidates.KnownWord && !candidates.FirstLevel) {
+                        // greedy path multiplies score by 50, never wins
+                        continue;
+                    }
+                    penalty = candidates.KnownWord ? KnownWordsPenalty : UnknownWordsPenalty;
+                }
+                words[i].push_back(cand);
+                penalties[i].push_back(penalty);
+            }
+        }
+        if (trace) {
+            wordTrace.Word = sentence[i];
+            wordTrace.TimeUs = GetCurrentTimeUs() - startTime;
+            trace->push_back(wordTrace);
+        }
+    }
+    for (size_t i = n; i < n + 2; ++i) {
+        words[i].push_back(TWord());
+        penalties[i].push_back(0.0);
+    }
+    for (size_t i = 0; i < n + 2; ++i) {
+        for (auto&& w: words[i]) {
+            TWordId wid = i < n ? LangModel.GetWordIdNoCreate(w) : unknownId;
+            ids[i].push_back(wid);
+            gram1LogProbs[i].push_back(log(LangModel.GetGram1Prob(wid)));
+        }
+    }
+
+    // Second order viterbi with beam: state is a pair of candidate indexes
+    // for positions (j - 1, j), trigram (j - 1, j, j + 1) is added on transition.
+    struct TState {
+        uint32_t Prev;
+        uint32_t Curr;
+        size_t Back;
+        double Score;
+    };
+    std::vector<std::vector<TState>> steps(n + 2);
+    for (uint32_t a = 0; a < words[0].size(); ++a) {
+        for (uint32_t b = 0; b < words[1].size(); ++b) {
+            steps[1].push_back({a, b, 0, -penalties[0][a] - penalties[1][b]});
+        }
+    }
+
+    // bigram probability and count are shared by all transitions from a state
+    struct TGram2 {
+        double LogProb;
+        TCount Count;
+    };
+    std::unordered_map<uint64_t, TGram2> grams2;
+    auto getGram2 = [&](TWordId w1, TWordId w2) -> const TGram2& {
+        uint64_t key = (uint64_t(w1) << 32) | w2;
+        auto it = grams2.find(key);
+        if (it == grams2.end()) {
+            TGram2 gram2 = {log(LangModel.GetGram2Prob(w1, w2)), LangModel.GetGram2HashCount(w1, w2)};
+            it = grams2.insert(std::make_pair(key, gram2)).first;
+        }
+        return it->second;
+    };
+    auto byScore = [](const TState& s1, const TState& s2) {
+        return s1.Score > s2.Score;
+    };
+
+    for (size_t j = 1; j <= n; ++j) {
+        std::vector<TState>& curr = steps[j];
+        if (curr.size() > BeamSize) {
+            std::partial_sort(curr.begin(), curr.begin() + BeamSize, curr.end(), byScore);
+            curr.resize(BeamSize);
+        }
+        std::vector<TState>& next = steps[j + 1];
+        std::unordered_map<uint64_t, size_t> nextIndex;
+        for (size_t s = 0; s < curr.size(); ++s) {
+            const TState& state = curr[s];
+            TWordId w1 = ids[j - 1][state.Prev];
+            TWordId w2 = ids[j][state.Curr];
+            const TGram2& gram2 = getGram2(w1, w2);
+            double base = state.Score + gram1LogProbs[j - 1][state.Prev] + gram2.LogProb;
+            for (uint32_t c = 0; c < ids[j + 1].size(); ++c) {
+                TWordId w3 = ids[j + 1][c];
+                double score = base + log(LangModel.GetGram3Prob(w1, w2, w3, gram2.Count)) - penalties[j + 1][c];
+                uint64_t key = (uint64_t(state.Curr) << 32) | c;
+                auto it = nextIndex.find(key);
+                if (it == nextIndex.end()) {
+                    nextIndex[key] = next.size();
+                    next.push_back({state.Curr, c, s, score});
+                } else if (next[it->second].Score < score) {
+                    next[it->second].Back = s;
+                    next[it->second].Score = score;
+                }
+            }
+        }
+    }
+
+    const std::vector<TState>& last = steps[n + 1];
+    size_t best = std::max_element(last.begin(), last.end(), [](const TState& s1, const TState& s2) {
+        return s1.Score < s2.Score;
+    }) - last.begin();
+    TWords result(n);
+    for (size_t j = n + 1; j >= 1; --j) {
+        const TState& state = steps[j][best];
+        if (j < n) {
+            result[j] = words[j][state.Curr];
+        }
+        if (j == 1) {
+            result[0] = words[0][state.Prev];
+        }
+        best = state.Back;
+    }
+    return result;
+}
+
+std::wstring TSpellCorrector::FixFragment(const std::wstring& text, TTrace* trace) const {
+    return FixFragment(text, trace, nullptr, nullptr);
+}
+
+std::wstring TSpellCorrector::FixFragmentWithBudget(const std::wstring& text, uint64_t budgetUs,
+                                                    TDegradedWords* degraded, TTrace* trace) const
+{
+    TTimeBudget budget(budgetUs);
+    return FixFragment(text, trace, &budget, degraded);
+}
+
+static void AddDegraded(TDegradedWords* degraded, size_t start, size_t length, EDegradeLevel level) {
+    if (!degraded || level == DEGRADE_NONE) {
+        return;
+    }
+    degraded->Starts.push_back(start);
+    degraded->Lengths.push_back(length);
+    degraded->Levels.push_back(level);
+}
+
+TWords TSpellCorrector::FixSentence(const TWords& sentence) const {
+    std::vector<EDegradeLevel> degradation;
+    return FixSentence(sentence, sentence, nullptr, nullptr, degradation);
+}
+
+TWords TSpellCorrector::FixSentence(const TWords& sentence, const TWords& origWords, TTrace* trace,
+                                    const TTimeBudget* budget, std::vector<EDegradeLevel>& degradation) const
+{
+    if (DecodeMode == DECODE_VITERBI) {
+        size_t traceStart = trace ? trace->size() : 0;
+        TWords words = DecodeSentence(sentence, trace, budget, degradation);
+        for (size_t j = 0; trace && j < origWords.size(); ++j) {
+            (*trace)[traceStart + j].Word = origWords[j];
+        }
+        return words;
+    }
+    TWords words = sentence;
+    degradation.assign(words.size(), DEGRADE_NONE);
+    for (size_t j = 0; j < words.size(); ++j) {
+        TWordTrace wordTrace;
+        uint64_t startTime = trace ? GetCurrentTimeUs() : 0;
+        TWords candidates = GetCandidatesRaw(words, j, &wordTrace, budget);
+        if (candidates.size() > 0) {
+            words[j] = candidates[0];
+        }
+        degradation[j] = wordTrace.Degradation;
+        if (trace) {
+            wordTrace.Word = origWords[j];
+            wordTrace.TimeUs = GetCurrentTimeUs() - startTime;
+            trace->push_back(wordTrace);
+        }
+    }
+    return words;
+}
+
+std::wstring TSpellCorrector::FixFragment(const std::wstring& text, TTrace* trace,
+                                          const TTimeBudget* budget, TDegradedWords* degraded) const
+{
     TSentences origSentences = LangModel.Tokenize(text);
     std::wstring lowered = text;
     ToLower(lowered);
@@ -198,40 +496,16 @@ std::wstring TSpellCorrector::FixFragment(const std::wstring& text) const {
     std::wstring result;
     size_t origPos = 0;
     for (size_t i = 0; i < sentences.size(); ++i) {
-        TWords words = sentences[i];
         const TWords& origWords = origSentences[i];
+        std::vector<EDegradeLevel> degradation;
+        TWords words = FixSentence(sentences[i], origWords, trace, budget, degradation);
         for (size_t j = 0; j < words.size(); ++j) {
-            TWord orig = origWords[j];
-            TWord lowered = words[j];
-            TWords candidates = GetCandidatesRaw(words, j);
-            if (candidates.size() > 0) {
-                words[j] = candidates[0];
-            }
-            size_t currOrigPos = orig.Ptr - &text[0];
-            while (origPos < currOrigPos) {
-                result.push_back(text[origPos]);
-                origPos += 1;
-            }
-            std::wstring newWord = std::wstring(words[j].Ptr, words[j].Len);
-            std::wstring origWord = std::wstring(orig.Ptr, orig.Len);
-            std::wstring origLowered = std::wstring(lowered.Ptr, lowered.Len);
-            if (newWord != origLowered) {
-                for (size_t k = 0; k < newWord.size(); ++k) {
-                    size_t n = k < origWord.size() ? k : origWord.size() - 1;
-                    wchar_t newChar = newWord[k];
-                    wchar_t origChar = origWord[n];
-                    result.push_back(MakeUpperIfRequired(newChar, origChar));
-                }
-            } else {
-                result += origWord;
-            }
-            origPos += orig.Len;
+            const TWord& orig = origWords[j];
+            AddDegraded(degraded, orig.Ptr - &text[0], orig.Len, degradation[j]);
+            AppendFixedWord(text, orig, sentences[i][j], words[j], origPos, result);
         }
     }
-    while (origPos < text.size()) {
-        result.push_back(text[origPos]);
-        origPos += 1;
-    }
+    result.append(text, origPos, std::wstring::npos);
     return result;
 }
 
@@ -242,10 +516,16 @@ std::wstring TSpellCorrector::FixFragmentNormalized(const std::wstring& text) co
     std::wstring result;
     for (size_t i = 0; i < sentences.size(); ++i) {
         TWords words = sentences[i];
+        if (DecodeMode == DECODE_VITERBI) {
+            std::vector<EDegradeLevel> degradation;
+            words = DecodeSentence(words, nullptr, nullptr, degradation);
+        }
         for (size_t i = 0; i < words.size(); ++i) {
-            TWords candidates = GetCandidatesRaw(words, i);
-            if (candidates.size() > 0) {
-                words[i] = candidates[0];
+            if (DecodeMode == DECODE_GREEDY) {
+                TWords candidates = GetCandidatesRaw(words, i);
+                if (candidates.size() > 0) {
+                    words[i] = candidates[0];
+                }
             }
             result += std::wstring(words[i].Ptr, words[i].Len) + L" ";
         }
@@ -260,6 +540,113 @@ std::wstring TSpellCorrector::FixFragmentNormalized(const std::wstring& text) co
     return result;
 }
 
+TCorrections TSpellCorrector::GetCorrections(const std::wstring& text, size_t maxCandidates, TTrace* trace) const {
+    return GetCorrections(text, maxCandidates, trace, nullptr, nullptr);
+}
+
+TCorrections TSpellCorrector::GetCorrectionsWithBudget(const std::wstring& text, size_t maxCandidates, uint64_t budgetUs,
+                                                       TDegradedWords* degraded, TTrace* trace) const
+{
+    TTimeBudget budget(budgetUs);
+    return GetCorrections(text, maxCandidates, trace, &budget, degraded);
+}
+
+TCorrections TSpellCorrector::GetCorrections(const std::wstring& text, size_t maxCandidates, TTrace* trace,
+                                             const TTimeBudget* budget, TDegradedWords* degraded) const
+{
+    std::wstring lowered = text;
+    ToLower(lowered);
+    TSentences sentences = LangModel.Tokenize(lowered);
+    TCorrections corrections;
+    for (size_t i = 0; i < sentences.size(); ++i) {
+        const TWords& sentence = sentences[i];
+        for (size_t j = 0; j < sentence.size(); ++j) {
+            TWord word = sentence[j];
+            TWordTrace wordTrace;
+            uint64_t startTime = trace ? GetCurrentTimeUs() : 0;
+            TWords candidates = GetCandidatesRaw(sentence, j, &wordTrace, budget);
+            AddDegraded(degraded, word.Ptr - &lowered[0], word.Len, wordTrace.Degradation);
+            if (trace) {
+                wordTrace.Word = TWord(&text[0] + (word.Ptr - &lowered[0]), word.Len);
+                wordTrace.TimeUs = GetCurrentTimeUs() - startTime;
+                trace->push_back(wordTrace);
+            }
+            if (candidates.empty()) {
+                continue;
+            }
+            if (std::wstring(word.Ptr, word.Len) == std::wstring(candidates[0].Ptr, candidates[0].Len)) {
+                continue;
+            }
+            corrections.Starts.push_back(word.Ptr - &lowered[0]);
+            corrections.Lengths.push_back(word.Len);
+            size_t candidatesSize = std::min(candidates.size(), maxCandidates);
+            for (size_t k = 0; k < candidatesSize; ++k) {
+                corrections.CandidateText += WideToUTF8(std::wstring(candidates[k].Ptr, candidates[k].Len));
+                corrections.CandidateOffsets.push_back(corrections.CandidateText.size());
+            }
+            corrections.Candidates.push_back(corrections.CandidateOffsets.size() - 1);
+        }
+    }
+    return corrections;
+}
+
+std::vector<std::wstring> TSpellCorrector::GetCandidatesWithBudget(const std::vector<std::wstring>& sentence,
+                                                                   size_t position, uint64_t budgetUs,
+                                                                   TDegradedWords* degraded) const
+{
+    TTimeBudget budget(budgetUs);
+    TWords words(sentence.begin(), sentence.end());
+    TWordTrace wordTrace;
+    TWords candidates = GetCandidatesRaw(words, position, &wordTrace, &budget);
+    if (position < words.size()) {
+        AddDegraded(degraded, position, words[position].Len, wordTrace.Degradation);
+    }
+    std::vector<std::wstring> results;
+    for (auto&& c: candidates) {
+        results.push_back(std::wstring(c.Ptr, c.Len));
+    }
+    return results;
+}
+
+TTimeBudget::TTimeBudget(uint64_t budgetUs)
+    : StartUs(GetCurrentTimeUs())
+    , BudgetUs(budgetUs)
+{
+}
+
+EDegradeLevel TTimeBudget::GetLevel() const {
+    if (BudgetUs == 0) {
+        return DEGRADE_NONE;
+    }
+    uint64_t elapsed = GetCurrentTimeUs() - StartUs;
+    if (elapsed >= BudgetUs) {
+        return DEGRADE_SKIPPED;
+    }
+    uint64_t left = BudgetUs - elapsed;
+    if (left * 4 < BudgetUs) {
+        return DEGRADE_NO_EDITS;
+    }
+    if (left * 2 < BudgetUs) {
+        return DEGRADE_FEWER_CANDIDATES;
+    }
+    return DEGRADE_NONE;
+}
+
+size_t TDegradedWords::Size() const {
+    return Starts.size();
+}
+
+size_t TCorrections::Size() const {
+    return Starts.size();
+}
+
+std::string TCorrections::GetCandidate(size_t index) const {
+    if (index + 1 >= CandidateOffsets.size()) {
+        return std::string();
+    }
+    return CandidateText.substr(CandidateOffsets[index], CandidateOffsets[index + 1] - CandidateOffsets[index]);
+}
+
 void TSpellCorrector::SetPenalty(double knownWordsPenalty, double unknownWordsPenalty) {
     KnownWordsPenalty = knownWordsPenalty;
     UnknownWordsPenalty = unknownWordsPenalty;
@@ -269,6 +656,55 @@ void TSpellCorrector::SetMaxCandiatesToCheck(size_t maxCandidatesToCheck) {
     MaxCandiatesToCheck = maxCandidatesToCheck;
 }
 
+void TSpellCorrector::SetDecodeMode(EDecodeMode mode, size_t beamSize) {
+    DecodeMode = mode;
+    BeamSize = std::max(size_t(1), beamSize);
+}
+
+void TSpellCorrector::SetCacheDir(const std::string& cacheDir) {
+    CacheDir = cacheDir;
+}
+
+std::string TSpellCorrector::GetCacheFile(const std::string& modelFile) const {
+    if (CacheDir.empty()) {
+        return modelFile + ".spell";
+    }
+    // models with the same name from different directories (en/model.bin,
+    // ru/model.bin) must not share the cache, so name has full path hash
+    std::string modelPath = modelFile;
+    char resolved[PATH_MAX];
+    if (realpath(modelFile.c_str(), resolved)) {
+        modelPath = resolved;
+    }
+    char pathHash[17];
+    snprintf(pathHash, sizeof(pathHash), "%016llx", (unsigned long long)CityHash64(modelPath.data(), modelPath.size()));
+    std::string modelName = modelFile.substr(modelFile.find_last_of("/\\") + 1);
+    std::string cacheDir = CacheDir;
+    if (cacheDir.back() != '/' && cacheDir.back() != '\\') {
+        cacheDir += '/';
+    }
+    return cacheDir + modelName + "." + pathHash + ".spell";
+}
+
+TModelInfo TSpellCorrector::GetInfo() const {
+    TModelInfo info = LangModel.GetInfo();
+    if (IsCacheReady()) {
+        info.Deletes1Bytes = Deletes1->MemoryUsage();
+        info.Deletes2Bytes = Deletes2->MemoryUsage();
+    }
+    return info;
+}
+
+bool TSpellCorrector::IsCacheReady() const {
+    return CacheReady.load(std::memory_order_acquire);
+}
+
+void TSpellCorrector::WaitCacheReady() {
+    if (CacheThread.joinable()) {
+        CacheThread.join();
+    }
+}
+
 const TLangModel& TSpellCorrector::GetLangModel() const {
     return LangModel;
 }
@@ -394,12 +830,12 @@ void TSpellCorrector::Inserts2(const std::wstring& w, TWords& result) const {
 }
 
 void TSpellCorrector::PrepareCache() {
-    auto&& wordToId = LangModel.GetWordToId();
+    const TVocabulary& vocabulary = LangModel.GetVocabulary();
     size_t n = 0;
     size_t s = 0;
-    for (auto&& it: wordToId) {
+    for (TWordId id = 0; id < vocabulary.Size(); ++id) {
         n += 1;
-        s += it.first.size();
+        s += vocabulary.GetWord(id).Len;
         if (n > 3000) {
             break;
         }
@@ -407,29 +843,46 @@ void TSpellCorrector::PrepareCache() {
     size_t avgWordLen = std::max(int(double(s) / n) + 1, 1);
     size_t avgWordLenMinusOne = std::max(size_t(1), avgWordLen - 1);
 
-    uint64_t deletes1size = wordToId.size() * avgWordLen;
-    uint64_t deletes2size = wordToId.size() * avgWordLen * avgWordLenMinusOne;
+    uint64_t deletes1size = vocabulary.Size() * avgWordLen;
+    uint64_t deletes2size = vocabulary.Size() * avgWordLen * avgWordLenMinusOne;
     deletes1size = std::max(uint64_t(1000), deletes1size);
     deletes1size = std::max(uint64_t(1000), deletes1size);
 
     double falsePositiveProb = 0.001;
-    Deletes1.reset(new TBloomFilter(deletes1size, falsePositiveProb));
-    Deletes2.reset(new TBloomFilter(deletes2size, falsePositiveProb));
+    std::unique_ptr<TBloomFilter> deletes1(new TBloomFilter(deletes1size, falsePositiveProb));
+    std::unique_ptr<TBloomFilter> deletes2(new TBloomFilter(deletes2size, falsePositiveProb));
 
     uint64_t deletes1real = 0;
     uint64_t deletes2real = 0;
 
-    for (auto&& it: wordToId) {
-        auto deletes = GetDeletes2(it.first);
+    for (TWordId id = 0; id < vocabulary.Size(); ++id) {
+        TWord word = vocabulary.GetWord(id);
+        if (!word.Len) {
+            continue;
+        }
+        auto deletes = GetDeletes2(std::wstring(word.Ptr, word.Len));
         for (auto&& w1: deletes) {
-            Deletes1->Insert(WideToUTF8(w1.back()));
+            deletes1->Insert(WideToUTF8(w1.back()));
             deletes1real += 1;
             for (size_t i = 0; i < w1.size() - 1; ++i) {
-                Deletes2->Insert(WideToUTF8(w1[i]));
+                deletes2->Insert(WideToUTF8(w1[i]));
                 deletes2real += 1;
             }
         }
     }
+    // readers don't touch filters until CacheReady is set
+    Deletes1 = std::move(deletes1);
+    Deletes2 = std::move(deletes2);
+}
+
+void TSpellCorrector::PrepareCacheInBackground(const std::string& cacheFile) {
+    uint64_t startTime = GetCurrentTimeMs();
+    PrepareCache();
+    CacheReady.store(true, std::memory_order_release);
+    std::cerr << "[info] cache built in " << GetCurrentTimeMs() - startTime << "ms" << std::endl;
+    if (!SaveCache(cacheFile)) {
+        std::cerr << "[warning] failed to save cache " << cacheFile << std::endl;
+    }
 }
 
 constexpr uint64_t SPELL_CHECKER_CACHE_MAGIC_BYTE = 3811558393781437494L;
@@ -1,6 +1,8 @@
 #pragma once
 
+#include <atomic>
 #include <memory>
+#include <thread>
 
 #include "lang_model.hpp"
 #include "bloom_filter.hpp"
@@ -8,35 +10,154 @@
 namespace NJamSpell {
 
 
+// Steps taken when time budget runs low, each one includes previous
+enum EDegradeLevel {
+    DEGRADE_NONE = 0,
+    DEGRADE_FEWER_CANDIDATES = 1,   // half of max candidates are scored (less than 1/2 of budget left)
+    DEGRADE_NO_EDITS = 2,           // no distance 2 edits through bloom filters (less than 1/4 left)
+    DEGRADE_SKIPPED = 3,            // word left untouched (budget is over)
+};
+
+struct TTimeBudget {
+    explicit TTimeBudget(uint64_t budgetUs = 0);   // 0 - unlimited
+    NJamSpell::EDegradeLevel GetLevel() const;
+
+    uint64_t StartUs = 0;
+    uint64_t BudgetUs = 0;
+};
+
+struct TWordTrace {
+    NJamSpell::TWord Word;
+    size_t Generated = 0;   // candidates produced by edits, with duplicates
+    size_t Scored = 0;      // candidates scored by language model
+    uint64_t TimeUs = 0;
+    NJamSpell::EDegradeLevel Degradation = NJamSpell::DEGRADE_NONE;
+};
+
+using TTrace = std::vector<NJamSpell::TWordTrace>;
+
+// Misspelled words of a text with their candidates, packed into flat arrays:
+// i-th correction is word at Starts[i] of length Lengths[i] (in characters),
+// its candidates are [Candidates[i], Candidates[i + 1]) entries of candidate
+// table, j-th candidate is utf-8 CandidateText[CandidateOffsets[j], CandidateOffsets[j + 1])
+struct TCorrections {
+    std::vector<uint32_t> Starts;
+    std::vector<uint32_t> Lengths;
+    std::vector<uint32_t> Candidates = {0};
+    std::vector<uint32_t> CandidateOffsets = {0};
+    std::string CandidateText;
+
+    size_t Size() const;
+    std::string GetCandidate(size_t index) const;
+};
+
+// Words processed with reduced effort because of time budget: word at
+// Starts[i] of length Lengths[i] (in characters) degraded by Levels[i] (EDegradeLevel)
+struct TDegradedWords {
+    std::vector<uint32_t> Starts;
+    std::vector<uint32_t> Lengths;
+    std::vector<uint32_t> Levels;
+
+    size_t Size() const;
+};
+
+enum EDecodeMode {
+    DECODE_GREEDY = 0,      // correct words one by one, left to right
+    DECODE_VITERBI = 1,     // best path over candidates of whole sentence
+};
+
 class TSpellCorrector {
 public:
-    bool LoadLangModel(const std::string& modelFile);
+    TSpellCorrector();
+    ~TSpellCorrector();
+    // backgroundCache - if .spell cache is missing start serving at once
+    // without distance 2 edits, and build cache in background thread
+    bool LoadLangModel(const std::string& modelFile, bool backgroundCache = false);
     bool TrainLangModel(const std::string& textFile, const std::string& alphabetFile, const std::string& modelFile);
-    NJamSpell::TScoredWords GetCandidatesRawWithScores(const NJamSpell::TWords& sentence, size_t position) const;
-    NJamSpell::TWords GetCandidatesRaw(const NJamSpell::TWords& sentence, size_t position) const;
+    // shards are made by TLangModel::CountShard()
+    bool TrainLangModelFromShards(const std::vector<std::string>& shardFiles, const std::string& modelFile);
+    // trace->Degradation reports how the word was degraded by budget
+    NJamSpell::TScoredWords GetCandidatesRawWithScores(const NJamSpell::TWords& sentence, size_t position,
+                                                       NJamSpell::TWordTrace* trace = nullptr,
+                                                       const NJamSpell::TTimeBudget* budget = nullptr) const;
+    NJamSpell::TWords GetCandidatesRaw(const NJamSpell::TWords& sentence, size_t position,
+                                       NJamSpell::TWordTrace* trace = nullptr,
+                                       const NJamSpell::TTimeBudget* budget = nullptr) const;
     std::vector<std::wstring> GetCandidates(const std::vector<std::wstring>& sentence, size_t position) const;
     std::vector<std::pair<std::wstring,double> > GetCandidatesWithScores(const std::vector<std::wstring>& sentence, size_t position) const;
-    std::wstring FixFragment(const std::wstring& text) const;
+    std::wstring FixFragment(const std::wstring& text, NJamSpell::TTrace* trace = nullptr) const;
     std::wstring FixFragmentNormalized(const std::wstring& text) const;
+    // Fixed words of one sentence of lowercased and tokenized text, the way
+    // FixFragment corrects it. Sentences are corrected independently.
+    NJamSpell::TWords FixSentence(const NJamSpell::TWords& sentence) const;
+    NJamSpell::TCorrections GetCorrections(const std::wstring& text, size_t maxCandidates = 7,
+                                           NJamSpell::TTrace* trace = nullptr) const;
+
+    // Same as above, but within budgetUs microseconds: when budget runs low
+    // words are processed with less effort (see EDegradeLevel) and reported
+    // to degraded. For GetCandidatesWithBudget Starts holds word position.
+    std::wstring FixFragmentWithBudget(const std::wstring& text, uint64_t budgetUs,
+                                       NJamSpell::TDegradedWords* degraded = nullptr,
+                                       NJamSpell::TTrace* trace = nullptr) const;
+    std::vector<std::wstring> GetCandidatesWithBudget(const std::vector<std::wstring>& sentence, size_t position,
+                                                      uint64_t budgetUs,
+                                                      NJamSpell::TDegradedWords* degraded = nullptr) const;
+    NJamSpell::TCorrections GetCorrectionsWithBudget(const std::wstring& text, size_t maxCandidates, uint64_t budgetUs,
+                                                     NJamSpell::TDegradedWords* degraded = nullptr,
+                                                     NJamSpell::TTrace* trace = nullptr) const;
     void SetPenalty(double knownWordsPenalty, double unknownWordsPenalty);
     void SetMaxCandiatesToCheck(size_t maxCandidatesToCheck);
+    void SetDecodeMode(NJamSpell::EDecodeMode mode, size_t beamSize = 16);
+    void SetCacheDir(const std::string& cacheDir);
+    std::string GetCacheFile(const std::string& modelFile) const;
+    bool IsCacheReady() const;
+    void WaitCacheReady();
     const NJamSpell::TLangModel& GetLangModel() const;
+    // language model info with deletes filters once cache is ready
+    NJamSpell::TModelInfo GetInfo() const;
 private:
-    void FilterCandidatesByFrequency(std::unordered_set<NJamSpell::TWord, NJamSpell::TWordHashPtr>& uniqueCandidates, NJamSpell::TWord origWord) const;
+    struct TCandidates {
+        std::unordered_set<NJamSpell::TWord, NJamSpell::TWordHashPtr> Words;
+        NJamSpell::TWord Original;
+        bool FirstLevel = true;
+        bool KnownWord = false;
+        NJamSpell::EDegradeLevel Degradation = NJamSpell::DEGRADE_NONE;
+    };
+    bool GenerateCandidates(const NJamSpell::TWord& word, TCandidates& result, NJamSpell::TWordTrace* trace,
+                            const NJamSpell::TTimeBudget* budget) const;
+    NJamSpell::TWords DecodeSentence(const NJamSpell::TWords& sentence, NJamSpell::TTrace* trace,
+                                     const NJamSpell::TTimeBudget* budget,
+                                     std::vector<NJamSpell::EDegradeLevel>& degradation) const;
+    NJamSpell::TWords FixSentence(const NJamSpell::TWords& sentence, const NJamSpell::TWords& origWords,
+                                  NJamSpell::TTrace* trace, const NJamSpell::TTimeBudget* budget,
+                                  std::vector<NJamSpell::EDegradeLevel>& degradation) const;
+    std::wstring FixFragment(const std::wstring& text, NJamSpell::TTrace* trace,
+                             const NJamSpell::TTimeBudget* budget, NJamSpell::TDegradedWords* degraded) const;
+    NJamSpell::TCorrections GetCorrections(const std::wstring& text, size_t maxCandidates, NJamSpell::TTrace* trace,
+                                           const NJamSpell::TTimeBudget* budget, NJamSpell::TDegradedWords* degraded) const;
+    void FilterCandidatesByFrequency(std::unordered_set<NJamSpell::TWord, NJamSpell::TWordHashPtr>& uniqueCandidates,
+                                     NJamSpell::TWord origWord, size_t maxCandidates) const;
     NJamSpell::TWords Edits(const NJamSpell::TWord& word) const;
     NJamSpell::TWords Edits2(const NJamSpell::TWord& word, bool lastLevel = true) const;
     void Inserts(const std::wstring& w, NJamSpell::TWords& result) const;
     void Inserts2(const std::wstring& w, NJamSpell::TWords& result) const;
     void PrepareCache();
+    bool SaveTrainedModel(const std::string& modelFile);
+    void PrepareCacheInBackground(const std::string& cacheFile);
     bool LoadCache(const std::string& cacheFile);
     bool SaveCache(const std::string& cacheFile);
 private:
     TLangModel LangModel;
     std::unique_ptr<TBloomFilter> Deletes1;
     std::unique_ptr<TBloomFilter> Deletes2;
+    std::atomic<bool> CacheReady;
+    std::thread CacheThread;
+    std::string CacheDir;
     double KnownWordsPenalty = 20.0;
     double UnknownWordsPenalty = 5.0;
     size_t MaxCandiatesToCheck = 14;
+    EDecodeMode DecodeMode = DECODE_GREEDY;
+    size_t BeamSize = 16;
 };
 
 
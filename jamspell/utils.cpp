@@ -5,6 +5,7 @@
 #include <iostream>
 #include <cassert>
 #include <algorithm>
+#include <cwchar>
 
 #ifdef USE_BOOST_CONVERT
     #include <boost/locale/encoding_utf.hpp>
@@ -100,6 +101,18 @@ TSentences TTokenizer::Process(const std::wstring& originalText) const {
     return sentences;
 }
 
+void TTokenizer::Dump(std::ostream& out) const {
+    std::vector<wchar_t> letters(Alphabet.begin(), Alphabet.end());
+    std::sort(letters.begin(), letters.end());
+    NHandyPack::Dump(out, letters);
+}
+
+void TTokenizer::Load(std::istream& in) {
+    std::vector<wchar_t> letters;
+    NHandyPack::Load(in, letters);
+    Alphabet = std::unordered_set<wchar_t>(letters.begin(), letters.end());
+}
+
 void TTokenizer::Clear() {
     Alphabet.clear();
 }
@@ -135,6 +148,12 @@ uint64_t GetCurrentTimeMs() {
     return ms.count();
 }
 
+uint64_t GetCurrentTimeUs() {
+    using namespace std::chrono;
+    microseconds us = duration_cast<microseconds>(steady_clock::now().time_since_epoch());
+    return us.count();
+}
+
 static const std::locale GLocale("en_US.UTF-8");
 static const std::ctype<wchar_t>& GWctype = std::use_facet<std::ctype<wchar_t>>(GLocale);
 
@@ -151,6 +170,24 @@ wchar_t MakeUpperIfRequired(wchar_t orig, wchar_t sample) {
     return orig;
 }
 
+void AppendFixedWord(const std::wstring& text, const TWord& orig, const TWord& lowered, const TWord& fixed,
+                     size_t& pos, std::wstring& result)
+{
+    size_t origPos = orig.Ptr - &text[0];
+    if (pos < origPos) {
+        result.append(text, pos, origPos - pos);
+    }
+    if (fixed.Len != lowered.Len || std::wmemcmp(fixed.Ptr, lowered.Ptr, fixed.Len) != 0) {
+        for (size_t k = 0; k < fixed.Len; ++k) {
+            size_t n = k < orig.Len ? k : orig.Len - 1;
+            result.push_back(MakeUpperIfRequired(fixed.Ptr[k], orig.Ptr[n]));
+        }
+    } else {
+        result.append(orig.Ptr, orig.Len);
+    }
+    pos = origPos + orig.Len;
+}
+
 uint16_t CityHash16(const std::string& str) {
     uint32_t hash = CityHash32(&str[0], str.size());
     return hash % std::numeric_limits<uint16_t>::max();
@@ -53,7 +53,9 @@ public:
 
     const std::unordered_set<wchar_t>& GetAlphabet() const;
 
-    HANDYPACK(Alphabet)
+    // letters are saved sorted, so saved alphabet doesn't depend on set order
+    void Dump(std::ostream& out) const;
+    void Load(std::istream& in);
 private:
     std::unordered_set<wchar_t> Alphabet;
     std::locale Locale;
@@ -64,8 +66,14 @@ void SaveFile(const std::string& fileName, const std::string& data);
 std::wstring UTF8ToWide(const std::string& text);
 std::string WideToUTF8(const std::wstring& text);
 uint64_t GetCurrentTimeMs();
+uint64_t GetCurrentTimeUs();
 void ToLower(std::wstring& text);
 wchar_t MakeUpperIfRequired(wchar_t orig, wchar_t sample);
+// Appends text from pos up to orig word (a word of text) and fixed word in
+// place of it with case of orig, lowered is orig in lower case; moves pos
+// past orig
+void AppendFixedWord(const std::wstring& text, const TWord& orig, const TWord& lowered, const TWord& fixed,
+                     size_t& pos, std::wstring& result);
 uint16_t CityHash16(const std::string& str);
 uint16_t CityHash16(const char* str, size_t size);
 
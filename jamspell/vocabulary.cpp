@@ -0,0 +1,168 @@
+#include <algorithm>
+#include <cassert>
+#include <cstring>
+
+#include <contrib/cityhash/city.h>
+
+#include "vocabulary.hpp"
+
+namespace NJamSpell {
+
+constexpr TVocabulary::TId TVocabulary::NO_ID;
+
+static const size_t MIN_INDEX_SIZE = 16;
+
+TVocabulary::TId TVocabulary::Find(const wchar_t* ptr, size_t len) const {
+    if (Index.empty()) {
+        return NO_ID;
+    }
+    return Index[FindSlot(ptr, len, Hash(ptr, len))];
+}
+
+TVocabulary::TId TVocabulary::Find(const std::wstring& word) const {
+    return Find(word.data(), word.size());
+}
+
+TVocabulary::TId TVocabulary::Insert(const wchar_t* ptr, size_t len) {
+    assert(len > 0);
+    if (2 * (Size() + 1) > Index.size()) {
+        Rehash(std::max(MIN_INDEX_SIZE, 2 * Index.size()));
+    }
+    size_t slot = FindSlot(ptr, len, Hash(ptr, len));
+    if (Index[slot] != NO_ID) {
+        return Index[slot];
+    }
+    assert(Arena.size() + len < std::numeric_limits<uint32_t>::max());
+    TId id = Size();
+    Arena.insert(Arena.end(), ptr, ptr + len);
+    Offsets.push_back(Arena.size());
+    Index[slot] = id;
+    return id;
+}
+
+TWord TVocabulary::GetWord(TId id) const {
+    if (id >= Size()) {
+        return TWord();
+    }
+    return TWord(Arena.data() + Offsets[id], Offsets[id + 1] - Offsets[id]);
+}
+
+size_t TVocabulary::Size() const {
+    return Offsets.size() - 1;
+}
+
+void TVocabulary::Clear() {
+    Arena.clear();
+    Offsets.assign(1, 0);
+    Index.clear();
+}
+
+uint64_t TVocabulary::MemoryUsage() const {
+    return Arena.capacity() * sizeof(wchar_t) +
+           Offsets.capacity() * sizeof(uint32_t) +
+           Index.capacity() * sizeof(TId);
+}
+
+uint64_t TVocabulary::IndexMemoryUsage() const {
+    return Index.capacity() * sizeof(TId);
+}
+
+void TVocabulary::Dump(std::ostream& out) const {
+    // empty words are gaps left by Load, they are not saved
+    uint32_t size = 0;
+    for (TId id = 0; id < Size(); ++id) {
+        size += Offsets[id + 1] != Offsets[id];
+    }
+    out.write((const char*)&size, sizeof(size));
+    for (TId id = 0; id < Size(); ++id) {
+        uint32_t len = Offsets[id + 1] - Offsets[id];
+        if (len == 0) {
+            continue;
+        }
+        out.write((const char*)&len, sizeof(len));
+        out.write((const char*)(Arena.data() + Offsets[id]), len * sizeof(wchar_t));
+        out.write((const char*)&id, sizeof(id));
+    }
+}
+
+void TVocabulary::Load(std::istream& in) {
+    Clear();
+    uint32_t size = 0;
+    in.read((char*)&size, sizeof(size));
+    // words come in any order (older models dumped a hash map), so they
+    // are read as is and then laid out by id
+    struct TEntry {
+        TId Id;
+        uint32_t Offset;
+        uint32_t Len;
+    };
+    std::vector<TEntry> entries(size);
+    std::vector<wchar_t> words;
+    for (TEntry& entry: entries) {
+        in.read((char*)&entry.Len, sizeof(entry.Len));
+        entry.Offset = words.size();
+        words.resize(words.size() + entry.Len);
+        in.read((char*)(words.data() + entry.Offset), entry.Len * sizeof(wchar_t));
+        in.read((char*)&entry.Id, sizeof(entry.Id));
+    }
+    std::sort(entries.begin(), entries.end(), [](const TEntry& a, const TEntry& b) {
+        return a.Id < b.Id;
+    });
+    Arena.reserve(words.size());
+    Offsets.reserve(size + 1);
+    size_t indexSize = MIN_INDEX_SIZE;
+    while (indexSize < 2 * (size_t(size) + 1)) {
+        indexSize *= 2;
+    }
+    Rehash(indexSize);
+    for (const TEntry& entry: entries) {
+        // missing ids are kept as empty words, so ids stay the same
+        while (Size() < entry.Id) {
+            Offsets.push_back(Arena.size());
+        }
+        if (Size() > entry.Id || entry.Len == 0) {
+            continue;
+        }
+        Insert(words.data() + entry.Offset, entry.Len);
+    }
+}
+
+uint64_t TVocabulary::Hash(const wchar_t* ptr, size_t len) const {
+    return CityHash64((const char*)ptr, len * sizeof(wchar_t));
+}
+
+size_t TVocabulary::FindSlot(const wchar_t* ptr, size_t len, uint64_t hash) const {
+    size_t mask = Index.size() - 1;
+    size_t slot = hash & mask;
+    while (true) {
+        TId id = Index[slot];
+        if (id == NO_ID) {
+            return slot;
+        }
+        uint32_t offset = Offsets[id];
+        if (Offsets[id + 1] - offset == len &&
+            memcmp(Arena.data() + offset, ptr, len * sizeof(wchar_t)) == 0)
+        {
+            return slot;
+        }
+        slot = (slot + 1) & mask;
+    }
+}
+
+void TVocabulary::Rehash(size_t indexSize) {
+    Index.assign(indexSize, NO_ID);
+    size_t mask = indexSize - 1;
+    for (TId id = 0; id < Size(); ++id) {
+        uint32_t len = Offsets[id + 1] - Offsets[id];
+        if (len == 0) {
+            continue;
+        }
+        size_t slot = Hash(Arena.data() + Offsets[id], len) & mask;
+        while (Index[slot] != NO_ID) {
+            slot = (slot + 1) & mask;
+        }
+        Index[slot] = id;
+    }
+}
+
+} // NJamSpell
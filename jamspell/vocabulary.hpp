@@ -0,0 +1,49 @@
+#pragma once
+
+#include <cstdint>
+#include <iostream>
+#include <limits>
+#include <string>
+#include <vector>
+
+#include "utils.hpp"
+
+namespace NJamSpell {
+
+// Word <=> id map. Words are kept one after another in a single arena
+// (id order), the index is an open addressed table of ids, so lookup by
+// pointer + length needs no temporary string and words take no per-word
+// allocation. Ids are dense and given in insertion order.
+class TVocabulary {
+public:
+    using TId = uint32_t;
+    static constexpr TId NO_ID = std::numeric_limits<TId>::max();
+
+    TId Find(const wchar_t* ptr, size_t len) const;
+    TId Find(const std::wstring& word) const;
+    // id of existing word or of a new one, word must not be empty
+    TId Insert(const wchar_t* ptr, size_t len);
+    // pointers stay valid until the next Insert
+    TWord GetWord(TId id) const;
+    size_t Size() const;
+    void Clear();
+    uint64_t MemoryUsage() const;
+    // part of MemoryUsage() taken by the index, the rest is words arena
+    uint64_t IndexMemoryUsage() const;
+
+    // same layout as serialized map of wstring => id
+    void Dump(std::ostream& out) const;
+    void Load(std::istream& in);
+private:
+    uint64_t Hash(const wchar_t* ptr, size_t len) const;
+    size_t FindSlot(const wchar_t* ptr, size_t len, uint64_t hash) const;
+    void Rehash(size_t indexSize);
+private:
+    std::vector<wchar_t> Arena;
+    // word i is Arena[Offsets[i]] .. Arena[Offsets[i + 1]]
+    std::vector<uint32_t> Offsets = {0};
+    // power of two, NO_ID marks empty slot, at most half full
+    std::vector<TId> Index;
+};
+
+} // NJamSpell
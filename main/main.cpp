@@ -8,9 +8,12 @@ using namespace NJamSpell;
 void PrintUsage(const char** argv) {
     std::cerr << "Usage: " << argv[0] << " mode args" << std::endl;
     std::cerr << "    train alphabet.txt dataset.txt resultModel.bin  - train model" << std::endl;
+    std::cerr << "    count alphabet.txt dataset_part.txt shard.bin - count n-grams of a part of dataset" << std::endl;
+    std::cerr << "    build resultModel.bin shard1.bin shard2.bin ... - merge shards into model, same as train on concatenated parts" << std::endl;
     std::cerr << "    score model.bin - input sentences and get score" << std::endl;
     std::cerr << "    correct model.bin - input sentences and get corrected one" << std::endl;
     std::cerr << "    fix model.bin input.txt output.txt - automatically fix txt file" << std::endl;
+    std::cerr << "    info model.bin - memory footprint and statistics of model" << std::endl;
 }
 
 int Train(const std::string& alphabetFile,
@@ -23,6 +26,28 @@ int Train(const std::string& alphabetFile,
     return 0;
 }
 
+int Count(const std::string& alphabetFile,
+          const std::string& datasetFile,
+          const std::string& shardFile)
+{
+    if (!TLangModel::CountShard(datasetFile, alphabetFile, shardFile)) {
+        std::cerr << "[error] failed to count " << datasetFile << std::endl;
+        return 42;
+    }
+    return 0;
+}
+
+int Build(const std::string& resultModelFile,
+          const std::vector<std::string>& shardFiles)
+{
+    TSpellCorrector corrector;
+    if (!corrector.TrainLangModelFromShards(shardFiles, resultModelFile)) {
+        std::cerr << "[error] failed to build model" << std::endl;
+        return 42;
+    }
+    return 0;
+}
+
 int Score(const std::string& modelFile) {
     TLangModel model;
     std::cerr << "[info] loading model" << std::endl;
@@ -78,6 +103,33 @@ int Correct(const std::string& modelFile) {
     return 0;
 }
 
+int Info(const std::string& modelFile) {
+    TSpellCorrector corrector;
+    std::cerr << "[info] loading model" << std::endl;
+    if (!corrector.LoadLangModel(modelFile)) {
+        std::cerr << "[error] failed to load model" << std::endl;
+        return 42;
+    }
+    std::cerr << "[info] loaded" << std::endl;
+    TModelInfo info = corrector.GetInfo();
+    std::cout << "word_to_id_bytes    " << info.WordToIdBytes << "\n";
+    std::cout << "id_to_word_bytes    " << info.IdToWordBytes << "\n";
+    std::cout << "buckets_bytes       " << info.BucketsBytes << "\n";
+    std::cout << "perfect_hash_bytes  " << info.PerfectHashBytes << "\n";
+    std::cout << "alphabet_bytes      " << info.AlphabetBytes << "\n";
+    std::cout << "deletes1_bytes      " << info.Deletes1Bytes << "\n";
+    std::cout << "deletes2_bytes      " << info.Deletes2Bytes << "\n";
+    std::cout << "total_bytes         " << info.TotalBytes() << "\n";
+    std::cout << "vocab_size          " << info.VocabSize << "\n";
+    std::cout << "ngrams1             " << info.Grams1 << "\n";
+    std::cout << "ngrams2             " << info.Grams2 << "\n";
+    std::cout << "ngrams3             " << info.Grams3 << "\n";
+    std::cout << "ngrams_total        " << info.Ngrams << "\n";
+    std::cout << "buckets             " << info.BucketsNumber << "\n";
+    std::cout << "bucket_load_factor  " << info.BucketLoadFactor << "\n";
+    return 0;
+}
+
 int main(int argc, const char** argv) {
     if (argc < 2) {
         PrintUsage(argv);
@@ -93,6 +145,23 @@ int main(int argc, const char** argv) {
         std::string datasetFile = argv[3];
         std::string resultModelFile = argv[4];
         return Train(alphabetFile, datasetFile, resultModelFile);
+    } else if (mode == "count") {
+        if (argc < 5) {
+            PrintUsage(argv);
+            return 42;
+        }
+        std::string alphabetFile = argv[2];
+        std::string datasetFile = argv[3];
+        std::string shardFile = argv[4];
+        return Count(alphabetFile, datasetFile, shardFile);
+    } else if (mode == "build") {
+        if (argc < 4) {
+            PrintUsage(argv);
+            return 42;
+        }
+        std::string resultModelFile = argv[2];
+        std::vector<std::string> shardFiles(argv + 3, argv + argc);
+        return Build(resultModelFile, shardFiles);
     } else if (mode == "score") {
         if (argc < 3) {
             PrintUsage(argv);
@@ -116,6 +185,13 @@ int main(int argc, const char** argv) {
         std::string inFile = argv[3];
         std::string outFile = argv[4];
         return Fix(modelFile, inFile, outFile);
+    } else if (mode == "info") {
+        if (argc < 3) {
+            PrintUsage(argv);
+            return 42;
+        }
+        std::string modelFile = argv[2];
+        return Info(modelFile);
     }
 
     PrintUsage(argv);
@@ -21,12 +21,14 @@ jamspell = Extension(
         os.path.join('jamspell', 'utils.cpp'),
         os.path.join('jamspell', 'perfect_hash.cpp'),
         os.path.join('jamspell', 'bloom_filter.cpp'),
+        os.path.join('jamspell', 'vocabulary.cpp'),
+        os.path.join('jamspell', 'session.cpp'),
         os.path.join('contrib', 'cityhash', 'city.cc'),
         os.path.join('contrib', 'phf', 'phf.cc'),
         os.path.join('jamspell.i'),
     ],
     extra_compile_args=['-std=c++11', '-O2'],
-    swig_opts=['-c++'],
+    swig_opts=['-c++', '-threads'],
 )
 
 if sys.platform == 'darwin':
@@ -63,7 +65,7 @@ setup(
     long_description='context-based spell checker',
     keywords=['nlp', 'spell', 'spell-checker', 'jamspell'],
     classifiers=[
-        'Programming Language :: Python :: 2.7',
+        'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',
     ],
     py_modules=['jamspell'],
@@ -1,6 +1,8 @@
+import codecs
 import os
 import pytest
 import jamspell
+from evaluate import deletes_index
 from evaluate import generate_dataset
 from evaluate.evaluate import evaluateJamspell
 
@@ -28,15 +30,340 @@ def trainLangModel(trainText, alphabetFile, modelFile):
     corrector = jamspell.TSpellCorrector()
     corrector.TrainLangModel(trainText, alphabetFile, modelFile)
 
+
+# models are trained once per module, every test gets its own corrector
+@pytest.fixture(scope='module')
+def enModelFile(tmpdir_factory):
+    modelFile = str(tmpdir_factory.mktemp('en').join('model.bin'))
+    trainLangModel(TEST_DATA + 'sherlockholmes.txt', TEST_DATA + 'alphabet_en.txt', modelFile)
+    return modelFile
+
+
+@pytest.fixture(scope='module')
+def ruModelFile(tmpdir_factory):
+    modelFile = str(tmpdir_factory.mktemp('ru').join('model.bin'))
+    trainLangModel(TEST_DATA + 'kapitanskaya_dochka.txt', TEST_DATA + 'alphabet_ru.txt', modelFile)
+    return modelFile
+
+
+@pytest.fixture
+def corrector(enModelFile):
+    corrector = jamspell.TSpellCorrector()
+    assert corrector.LoadLangModel(enModelFile)
+    return corrector
+
+
 @pytest.mark.parametrize('sourceFile,alphabetFile,expected', [
-    ('sherlockholmes.txt', 'alphabet_en.txt', (0.04538662682106836, 0.6987951807228916, 0.014246804944479363,
-                                               0.013821441912588718, 0.76592082616179)),
-    ('kapitanskaya_dochka.txt', 'alphabet_ru.txt', (0.12330535829567463, 0.391304347826087, 0.03866565579984837,
-                                                    0.05358295674628793, 0.4391304347826087)),
+    ('sherlockholmes.txt', 'alphabet_en.txt', (0.04770848985725019, 0.6575809199318569, 0.01118851593835761,
+                                               0.015965439519158527, 0.7308347529812607)),
+    ('kapitanskaya_dochka.txt', 'alphabet_ru.txt', (0.10640066500415628, 0.44785276073619634, 0.03653846153846154,
+                                                    0.04239401496259352, 0.4723926380368098)),
 ])
 def test_evaluation(sourceFile, alphabetFile, expected):
     alphabetFile = TEST_DATA + alphabetFile
     generate_dataset.generateDatasetTxt(TEST_DATA + sourceFile, TEMP)
     trainLangModel(TEMP_TRAIN, alphabetFile, TEMP_MODEL)
     results = evaluateJamspell(TEMP_MODEL, TEMP_TEST, alphabetFile)
-    assert results == expected
\ No newline at end of file
+    assert results == expected
+
+def test_async_corrector(corrector):
+    import asyncio
+    texts = ['I am the begt spell cherken', 'the adventure of sherlok holmes'] * 20
+
+    async def run():
+        async with jamspell.AsyncSpellCorrector(corrector, maxWorkers=2, maxBatchSize=8) as asyncCorrector:
+            fixed = await asyncCorrector.fix_many(texts)
+            single = await asyncCorrector.fix(texts[0])
+            candidates = await asyncCorrector.candidates(['i', 'am', 'the', 'begt'], 3)
+            cancelled = asyncio.ensure_future(asyncCorrector.fix(texts[1]))
+            cancelled.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+            return fixed, single, candidates
+
+    fixed, single, candidates = asyncio.run(run())
+    assert fixed == [corrector.FixFragment(t) for t in texts]
+    assert single == corrector.FixFragment(texts[0])
+    assert candidates == list(corrector.GetCandidates(['i', 'am', 'the', 'begt'], 3))
+
+    class SlowCorrector(object):
+        def __init__(self):
+            self.threads = set()
+
+        def FixFragment(self, text):
+            import threading
+            import time
+            self.threads.add(threading.current_thread().ident)
+            time.sleep(0.01)
+            return text
+
+    async def runSlow(slowCorrector):
+        async with jamspell.AsyncSpellCorrector(slowCorrector, maxWorkers=4, maxBatchSize=8) as asyncCorrector:
+            return await asyncCorrector.fix_many(texts[:8])
+
+    slowCorrector = SlowCorrector()
+    assert asyncio.run(runSlow(slowCorrector)) == texts[:8]
+    # a single batch is split between all workers
+    assert len(slowCorrector.threads) == 4
+
+
+def test_viterbi_decoding(corrector):
+    text = 'I am the begt spell cherken! Sherlok Holmes was a detectve.'
+    greedy = corrector.FixFragment(text)
+    corrector.SetDecodeMode(jamspell.DECODE_VITERBI)
+    assert corrector.FixFragment(text) == 'I am the best spell cherken! Sherlock Holmes was a detective.'
+    assert corrector.FixFragment('') == ''
+    corrector.SetDecodeMode(jamspell.DECODE_GREEDY)
+    assert corrector.FixFragment(text) == greedy
+
+
+def test_get_corrections(corrector):
+    text = u'I am the begt spell cherken'
+    corrections = corrector.GetCorrections(text)
+    assert len(corrections) == 1
+    start, length, candidates = corrections.toList()[0]
+    assert text[start:start + length] == u'begt'
+    assert candidates == list(corrector.GetCandidates(['i', 'am', 'the', 'begt', 'spell', 'cherken'], 3))[:7]
+    assert list(corrections.starts) == [start]
+    assert list(corrections.lengths) == [length]
+    assert list(corrections.candidates) == [0, len(candidates)]
+    assert corrector.GetCorrections(text.encode('utf-8'), 3).toList() == [(start, length, candidates[:3])]
+    assert len(corrector.GetCorrections(u'')) == 0
+
+
+def test_get_corrections_non_ascii_case(ruModelFile):
+    corrector = jamspell.TSpellCorrector()
+    assert corrector.LoadLangModel(ruModelFile)
+    expected = corrector.GetCorrections(u'капитанскя дочка').toList()
+    assert expected[0][:2] == (0, 10)
+    assert u'капитанская' in expected[0][2]
+    assert corrector.GetCorrections(u'Капитанскя дочка').toList() == expected
+    assert corrector.GetCorrections(u'КАПИТАНСКЯ ДОЧКА').toList() == expected
+
+
+def test_background_cache(tmpdir, enModelFile, corrector):
+    assert corrector.IsCacheReady()
+    text = 'I am the begt spell cherken! Sherlok Holmes was a detectve.'
+
+    lazyCorrector = jamspell.TSpellCorrector()
+    lazyCorrector.SetCacheDir(str(tmpdir))
+    assert lazyCorrector.LoadLangModel(enModelFile, True)
+    lazyCorrector.FixFragment(text)
+    lazyCorrector.WaitCacheReady()
+    assert lazyCorrector.IsCacheReady()
+    cacheFile = lazyCorrector.GetCacheFile(enModelFile)
+    assert os.path.dirname(cacheFile) == str(tmpdir)
+    modelName = os.path.basename(enModelFile)
+    assert os.path.basename(cacheFile).startswith(modelName + '.')
+    assert os.path.exists(cacheFile)
+    # same model name in another directory has its own cache
+    assert lazyCorrector.GetCacheFile(os.path.join('en', modelName)) != cacheFile
+    assert lazyCorrector.FixFragment(text) == corrector.FixFragment(text)
+
+
+def test_model_registry(enModelFile):
+    registry = jamspell.ModelRegistry()
+    registry.add('en', enModelFile)
+    registry.add('en2', enModelFile)
+    assert 'en' in registry and 'ru' not in registry
+    with pytest.raises(KeyError):
+        registry.get('ru')
+    assert registry.loaded() == []
+    en = registry.get('en')
+    assert registry.get('en') is en
+    assert en.FixFragment('I am the begt spell cherken') == 'I am the best spell cherken'
+    memory = registry.memoryUsage('en')
+    assert memory >= os.path.getsize(enModelFile)
+
+    registry.memoryBudget = memory
+    registry.get('en2')
+    assert registry.loaded() == ['en2']
+    assert registry.memoryUsage() == memory
+    assert registry.get('en') is not en
+    assert registry.loaded() == ['en']
+
+
+def test_score_batch(corrector):
+    langModel = corrector.GetLangModel()
+    sentences = ['i am the best spell checker', 'i am the begt spell cherken', 'sherlock holmes', ''] * 50
+    expected = [langModel.Score(s) for s in sentences]
+    assert list(langModel.ScoreBatch(sentences)) == expected
+    assert list(langModel.ScoreBatch(sentences, 1)) == expected
+    assert list(langModel.ScoreBatch([s.encode('utf-8') for s in sentences], 3)) == expected
+    wordIds = [langModel.GetWordIds(s) for s in sentences]
+    assert list(langModel.ScoreBatch(wordIds)) == expected
+    assert list(langModel.ScoreBatch([list(ids) for ids in wordIds], 2)) == expected
+    assert len(langModel.ScoreBatch([])) == 0
+
+
+def test_time_budget(corrector):
+    text = 'I am the begt spell cherken. ' * 20
+    degraded = jamspell.TDegradedWords()
+    assert corrector.FixFragmentWithBudget(text, 10 ** 9, degraded) == corrector.FixFragment(text)
+    assert len(degraded) == 0
+
+    degraded = jamspell.TDegradedWords()
+    fixed = corrector.FixFragmentWithBudget(text, 1, degraded)
+    assert len(fixed) == len(text)
+    assert 'cherken' in fixed
+    levels = [level for _, _, level in degraded.toList()]
+    assert jamspell.DEGRADE_SKIPPED in levels
+    assert levels == sorted(levels)
+
+    sentence = ['i', 'am', 'the', 'begt', 'spell', 'cherken']
+    degraded = jamspell.TDegradedWords()
+    candidates = corrector.GetCandidatesWithBudget(sentence, 3, 10 ** 9, degraded)
+    assert list(candidates) == list(corrector.GetCandidates(sentence, 3))
+    assert len(degraded) == 0
+
+
+def test_model_info(corrector):
+    info = corrector.GetInfo()
+    assert info.VocabSize == info.Grams1 > 0
+    assert info.Grams2 > 0 and info.Grams3 > 0
+    assert info.Ngrams == info.Grams1 + info.Grams2 + info.Grams3
+    assert 0.0 < info.BucketLoadFactor <= 1.0
+    assert info.Ngrams == int(round(info.BucketLoadFactor * info.BucketsNumber))
+    assert info.BucketsBytes == 4 * info.BucketsNumber
+    assert info.Deletes1Bytes > 0 and info.Deletes2Bytes > 0
+    langInfo = corrector.GetLangModel().GetInfo()
+    assert langInfo.Deletes1Bytes == 0
+    assert info.TotalBytes() == langInfo.TotalBytes() + info.Deletes1Bytes + info.Deletes2Bytes
+    infoDict = info.toDict()
+    assert infoDict['TotalBytes'] == info.TotalBytes()
+    assert infoDict['WordToIdBytes'] == info.WordToIdBytes
+
+
+def test_train_from_shards(tmpdir):
+    with codecs.open(TEST_DATA + 'sherlockholmes.txt', 'r', 'utf-8') as f:
+        text = f.read()
+    # parts must end with a complete sentence
+    cuts = [0] + [text.index('.', len(text) * k // 3) + 1 for k in (1, 2)] + [len(text)]
+    shards = []
+    for i in range(3):
+        part = str(tmpdir.join('part%d.txt' % i))
+        with codecs.open(part, 'w', 'utf-8') as f:
+            f.write(text[cuts[i]:cuts[i + 1]])
+        shard = str(tmpdir.join('part%d.shard' % i))
+        assert jamspell.TLangModel.CountShard(part, TEST_DATA + 'alphabet_en.txt', shard)
+        shards.append(shard)
+
+    trainFile = str(tmpdir.join('all.txt'))
+    with codecs.open(trainFile, 'w', 'utf-8') as f:
+        f.write(text)
+    trainModel = str(tmpdir.join('train.bin'))
+    buildModel = str(tmpdir.join('build.bin'))
+    assert jamspell.TSpellCorrector().TrainLangModel(trainFile, TEST_DATA + 'alphabet_en.txt', trainModel)
+    corrector = jamspell.TSpellCorrector()
+    assert corrector.TrainLangModelFromShards(shards, buildModel)
+    assert not jamspell.TSpellCorrector().TrainLangModelFromShards(shards + [trainFile], buildModel)
+
+    with open(trainModel, 'rb') as f:
+        trained = f.read()
+    with open(buildModel, 'rb') as f:
+        built = f.read()
+    # only checksum differs, it is followed by 3 n-gram counts and magic byte
+    checkSumPos = len(trained) - 8 - (4 + 3 * 8) - 8
+    assert len(trained) == len(built)
+    assert trained[:checkSumPos] == built[:checkSumPos]
+    assert trained[checkSumPos + 8:] == built[checkSumPos + 8:]
+    with open(trainModel + '.spell', 'rb') as f:
+        trainedCache = f.read()
+    with open(buildModel + '.spell', 'rb') as f:
+        builtCache = f.read()
+    assert len(trainedCache) == len(builtCache)
+    trainedCorrector = jamspell.TSpellCorrector()
+    assert trainedCorrector.LoadLangModel(trainModel)
+    text = 'I am the begt spell cherken. Sherlock Holmse was sittng in his armchar'
+    assert corrector.FixFragment(text) == trainedCorrector.FixFragment(text)
+
+
+def test_correction_session(corrector):
+    session = jamspell.TCorrectionSession()
+    session.SetText('I am the begt spell cherken. Sherlok Holmes was a detectve. It was a nice day.')
+    assert session.FixFragment(corrector) == corrector.FixFragment(session.GetText())
+    assert (session.GetRecomputed(), session.GetReused()) == (3, 0)
+    assert session.GetCorrections(corrector).toList() == corrector.GetCorrections(session.GetText()).toList()
+
+    start = session.GetText().index('detectve')
+    assert session.ApplyEdit(start, len('detectve'), 'detective')
+    assert session.FixFragment(corrector) == corrector.FixFragment(session.GetText())
+    assert (session.GetRecomputed(), session.GetReused()) == (1, 2)
+    assert session.GetCorrections(corrector, 3).toList() == corrector.GetCorrections(session.GetText(), 3).toList()
+    assert (session.GetRecomputed(), session.GetReused()) == (1, 2)
+
+    # new sentence boundary
+    assert session.ApplyEdit(start - 1, 1, '. Then a ')
+    assert session.FixFragment(corrector) == corrector.FixFragment(session.GetText())
+    assert not session.ApplyEdit(len(session.GetText()) + 1, 0, 'x')
+    assert not session.ApplyEdit(len(session.GetText()) - 1, 2, 'x')
+
+    corrector.SetDecodeMode(jamspell.DECODE_VITERBI)
+    session.Clear()
+    session.SetText('Sherlok Holmes was a detectve. I am the begt spell cherken.')
+    assert session.FixFragment(corrector) == corrector.FixFragment(session.GetText())
+
+
+def test_deletes_index(tmpdir):
+    from collections import Counter
+    from evaluate.norvig_spell import words
+    with codecs.open(TEST_DATA + 'sherlockholmes.txt', 'r', 'utf-8') as f:
+        vocabulary = Counter(words(f.read()))
+    indexFile = str(tmpdir.join('index.deletes'))
+    index = deletes_index.load(indexFile, vocabulary)
+    assert os.path.exists(indexFile)
+    assert deletes_index.load(indexFile, vocabulary).index == index.index
+
+    def known(candidates):
+        return set(w for w in candidates if w in vocabulary)
+
+    for word in ['begt', 'cherken', 'holmes', 'sherlok', 'a', 'aa', '', 'xqzv', 'detectve', u'\u0451\u0436']:
+        edits1 = deletes_index.edits1(word)
+        assert index.known1(word) == known(edits1)
+        assert index.known2(word) == known(e2 for e1 in edits1 for e2 in deletes_index.edits1(e1))
+
+
+def test_web_server_reload(enModelFile, tmpdir):
+    import http.client
+    import socket
+    import subprocess
+    import time
+    webServer = os.environ.get('JAMSPELL_WEB_SERVER', 'build/web_server/web_server')
+    if not os.path.exists(webServer):
+        pytest.skip('web_server is not built')
+    sock = socket.socket()
+    sock.bind(('localhost', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    otherModel = str(tmpdir.join('other.bin'))
+    with open(enModelFile, 'rb') as src, open(otherModel, 'wb') as dst:
+        dst.write(src.read())
+    server = subprocess.Popen([webServer, enModelFile, 'localhost', str(port), '--cache-dir=' + str(tmpdir)],
+                              stderr=subprocess.DEVNULL)
+
+    def request(method, path, body=None):
+        conn = http.client.HTTPConnection('localhost', port, timeout=10)
+        conn.request(method, path, body)
+        resp = conn.getresponse()
+        result = resp.status, resp.reason, resp.read()
+        conn.close()
+        return result
+
+    try:
+        for _ in range(100):
+            try:
+                request('GET', '/status')
+                break
+            except OSError:
+                time.sleep(0.1)
+        # empty body: current model file again
+        status, _, body = request('POST', '/reload', b'')
+        assert status == 200 and b'"ok":true' in body
+        status, _, body = request('POST', '/reload?model=', b'')
+        assert status == 200 and b'"ok":true' in body
+        assert request('POST', '/fix', b'')[0] == 200
+        assert request('POST', '/reload', otherModel.encode('utf-8'))[:2] == (403, 'Forbidden')
+        assert request('GET', '/fix?lang=ru&text=x')[:2] == (404, 'Not Found')
+    finally:
+        server.kill()
+        server.wait()
@@ -44,3 +44,36 @@ TEST(PerfetHashTest, basicFlow) {
     }
     ASSERT_EQ(keys.size(), backetsUsed.size());
 }
+
+TEST(PerfetHashTest, packedKeys) {
+    std::vector<uint32_t> keys2 = {1, 2, 3, 4, 5, 6, 7, 8};
+    std::vector<uint32_t> keys3 = {1, 2, 3, 3, 2, 1};
+    std::vector<std::string> keys;
+    for (size_t i = 0; i < keys2.size(); i += 2) {
+        keys.push_back(std::string((const char*)&keys2[i], 2 * sizeof(uint32_t)));
+    }
+    for (size_t i = 0; i < keys3.size(); i += 3) {
+        keys.push_back(std::string((const char*)&keys3[i], 3 * sizeof(uint32_t)));
+    }
+
+    std::vector<NJamSpell::TPackedKeys> packedKeys(2);
+    packedKeys[0].Data = (const char*)keys2.data();
+    packedKeys[0].KeySize = 2 * sizeof(uint32_t);
+    packedKeys[0].Count = keys2.size() / 2;
+    packedKeys[1].Data = (const char*)keys3.data();
+    packedKeys[1].KeySize = 3 * sizeof(uint32_t);
+    packedKeys[1].Count = keys3.size() / 3;
+
+    NJamSpell::TPerfectHash ph;
+    ASSERT_TRUE(ph.Init(packedKeys));
+    NJamSpell::TPerfectHash phStrings;
+    ASSERT_TRUE(phStrings.Init(keys));
+
+    ASSERT_EQ(phStrings.BucketsNumber(), ph.BucketsNumber());
+    std::set<size_t> backetsUsed;
+    for (auto&& s: keys) {
+        ASSERT_EQ(phStrings.Hash(s), ph.Hash(s));
+        backetsUsed.insert(ph.Hash(s));
+    }
+    ASSERT_EQ(keys.size(), backetsUsed.size());
+}
@@ -0,0 +1,78 @@
+#include <gtest/gtest.h>
+
+#include <cstdio>
+#include <fstream>
+
+#include <jamspell/spell_corrector.hpp>
+
+namespace {
+
+std::vector<std::wstring> ToStrings(const NJamSpell::TWords& words) {
+    std::vector<std::wstring> result;
+    for (auto&& w: words) {
+        result.push_back(std::wstring(w.Ptr, w.Len));
+    }
+    return result;
+}
+
+// budget of 1000s with given part of it already spent
+NJamSpell::TTimeBudget SpentBudget(double spent) {
+    NJamSpell::TTimeBudget budget(1000000000);
+    budget.StartUs -= uint64_t(spent * budget.BudgetUs);
+    return budget;
+}
+
+} // namespace
+
+TEST(SpellCorrectorTest, reportsOnlyActualDegradation) {
+    const std::string alphabetFile = "jamspell_test_alphabet.txt";
+    const std::string textFile = "jamspell_test_text.txt";
+    const std::string modelFile = "jamspell_test_model.bin";
+    {
+        std::ofstream alphabet(alphabetFile);
+        alphabet << "abcdefghijklmnopqrstuvwxyz";
+        std::ofstream text(textFile);
+        for (size_t i = 0; i < 20; ++i) {
+            text << "the cat sat on the mat. the bat and the rat ate a hat. a fat vat of oat and a pat.\n";
+            text << "the dog walked home. hello world.\n";
+        }
+    }
+    NJamSpell::TSpellCorrector corrector;
+    ASSERT_TRUE(corrector.TrainLangModel(textFile, alphabetFile, modelFile));
+
+    std::wstring text = L"the dgo walked home zat";
+    NJamSpell::TSentences sentences = corrector.GetLangModel().Tokenize(text);
+    ASSERT_EQ(1u, sentences.size());
+    const NJamSpell::TWords& sentence = sentences[0];
+
+    // dgo is found by distance 1 edits, with few candidates: low budget
+    // changes nothing and nothing is reported
+    std::vector<std::wstring> expected = ToStrings(corrector.GetCandidatesRaw(sentence, 1));
+    ASSERT_EQ(L"dog", expected[0]);
+    for (double spent: {0.6, 0.8}) {
+        NJamSpell::TTimeBudget budget = SpentBudget(spent);
+        NJamSpell::TWordTrace trace;
+        ASSERT_EQ(expected, ToStrings(corrector.GetCandidatesRaw(sentence, 1, &trace, &budget)));
+        ASSERT_EQ(NJamSpell::DEGRADE_NONE, trace.Degradation);
+    }
+
+    // zat has more candidates than half of max candidates to check
+    NJamSpell::TTimeBudget budget = SpentBudget(0.6);
+    NJamSpell::TWordTrace trace;
+    corrector.GetCandidatesRaw(sentence, 4, &trace, &budget);
+    ASSERT_EQ(NJamSpell::DEGRADE_FEWER_CANDIDATES, trace.Degradation);
+
+    // wlkd is two edits away from walked, distance 2 edits are skipped
+    std::wstring text2 = L"the dog wlkd home";
+    NJamSpell::TSentences sentences2 = corrector.GetLangModel().Tokenize(text2);
+    ASSERT_EQ(L"walked", ToStrings(corrector.GetCandidatesRaw(sentences2[0], 2))[0]);
+    budget = SpentBudget(0.8);
+    trace = NJamSpell::TWordTrace();
+    corrector.GetCandidatesRaw(sentences2[0], 2, &trace, &budget);
+    ASSERT_EQ(NJamSpell::DEGRADE_NO_EDITS, trace.Degradation);
+
+    std::remove(alphabetFile.c_str());
+    std::remove(textFile.c_str());
+    std::remove(modelFile.c_str());
+    std::remove((modelFile + ".spell").c_str());
+}
@@ -0,0 +1,67 @@
+#include <gtest/gtest.h>
+
+#include <jamspell/vocabulary.hpp>
+#include <contrib/handypack/handypack.hpp>
+#include <contrib/tsl/robin_map.h>
+
+TEST(VocabularyTest, basicFlow) {
+    NJamSpell::TVocabulary vocabulary;
+    std::vector<std::wstring> words;
+    for (size_t i = 0; i < 1000; ++i) {
+        words.push_back(L"word" + std::to_wstring(i));
+    }
+    for (size_t i = 0; i < words.size(); ++i) {
+        ASSERT_EQ(i, vocabulary.Insert(words[i].data(), words[i].size()));
+    }
+    ASSERT_EQ(words.size(), vocabulary.Size());
+    ASSERT_EQ(7u, vocabulary.Insert(words[7].data(), words[7].size()));
+    ASSERT_EQ(words.size(), vocabulary.Size());
+
+    std::wstring text = L"xxword42yy";
+    ASSERT_EQ(42u, vocabulary.Find(text.data() + 2, 6));
+    ASSERT_EQ(NJamSpell::TVocabulary::NO_ID, vocabulary.Find(text.data() + 2, 5 + 3));
+    ASSERT_EQ(NJamSpell::TVocabulary::NO_ID, vocabulary.Find(L"missing"));
+
+    NJamSpell::TWord word = vocabulary.GetWord(999);
+    ASSERT_EQ(words[999], std::wstring(word.Ptr, word.Len));
+    ASSERT_EQ(nullptr, vocabulary.GetWord(1000).Ptr);
+
+    std::string serialized;
+    {
+        std::stringbuf buf;
+        std::ostream out(&buf);
+        vocabulary.Dump(out);
+        serialized = buf.str();
+    }
+    NJamSpell::TVocabulary vocabulary2;
+    {
+        NHandyPack::imemstream in(&serialized[0], serialized.size());
+        vocabulary2.Load(in);
+    }
+    ASSERT_EQ(words.size(), vocabulary2.Size());
+    for (size_t i = 0; i < words.size(); ++i) {
+        ASSERT_EQ(i, vocabulary2.Find(words[i]));
+    }
+}
+
+TEST(VocabularyTest, loadsSerializedMap) {
+    // models before arena vocabulary kept words in a hash map
+    tsl::robin_map<std::wstring, uint32_t> map = {{L"one", 1}, {L"zero", 0}, {L"three", 3}};
+    std::string serialized;
+    {
+        std::stringbuf buf;
+        std::ostream out(&buf);
+        NHandyPack::TUnorderedMapSerializer<decltype(map), std::wstring, uint32_t>::Dump(out, map);
+        serialized = buf.str();
+    }
+    NJamSpell::TVocabulary vocabulary;
+    NHandyPack::imemstream in(&serialized[0], serialized.size());
+    vocabulary.Load(in);
+
+    ASSERT_EQ(4u, vocabulary.Size());
+    ASSERT_EQ(0u, vocabulary.Find(L"zero"));
+    ASSERT_EQ(1u, vocabulary.Find(L"one"));
+    ASSERT_EQ(3u, vocabulary.Find(L"three"));
+    ASSERT_EQ(0u, vocabulary.GetWord(2).Len);
+    ASSERT_EQ(NJamSpell::TVocabulary::NO_ID, vocabulary.Find(L""));
+}
@@ -0,0 +1,143 @@
+// RSS and lookup throughput of arena vocabulary against the hash map of
+// std::wstring it replaced. Each variant runs in its own process, so RSS
+// growth is not hidden by memory freed by the previous one.
+//
+//   jamspell_vocabulary_benchmark model.bin
+//   jamspell_vocabulary_benchmark 3000000      - random words
+
+#include <cstdio>
+#include <cstdlib>
+#include <iostream>
+#include <memory>
+#include <random>
+#include <sys/wait.h>
+#include <unistd.h>
+
+#include <jamspell/lang_model.hpp>
+#include <contrib/tsl/robin_map.h>
+
+using namespace NJamSpell;
+
+static const size_t LOOKUPS = 10000000;
+
+static uint64_t CurrentRssKb() {
+    long pages = 0;
+    FILE* f = fopen("/proc/self/statm", "r");
+    if (f) {
+        if (fscanf(f, "%*s %ld", &pages) != 1) {
+            pages = 0;
+        }
+        fclose(f);
+    }
+    return pages * (sysconf(_SC_PAGESIZE) / 1024);
+}
+
+static std::vector<std::wstring> LoadWords(const std::string& source) {
+    std::vector<std::wstring> words;
+    char* end = nullptr;
+    size_t count = strtoul(source.c_str(), &end, 10);
+    if (*end == 0) {
+        std::mt19937 rnd(42);
+        std::uniform_int_distribution<int> letter(L'a', L'z');
+        std::uniform_int_distribution<int> length(2, 12);
+        for (size_t i = 0; i < count; ++i) {
+            std::wstring w(length(rnd), L'a');
+            for (auto&& c: w) {
+                c = letter(rnd);
+            }
+            words.push_back(w + std::to_wstring(i));
+        }
+        return words;
+    }
+    TLangModel model;
+    if (!model.Load(source)) {
+        std::cerr << "[error] failed to load model " << source << std::endl;
+        exit(42);
+    }
+    const TVocabulary& vocabulary = model.GetVocabulary();
+    for (TWordId id = 0; id < vocabulary.Size(); ++id) {
+        TWord w = vocabulary.GetWord(id);
+        words.push_back(std::wstring(w.Ptr, w.Len));
+    }
+    return words;
+}
+
+// half are known words, half are unknown ones, all inside one text buffer
+static TWords MakeQueries(const std::vector<std::wstring>& words, std::wstring& text) {
+    std::mt19937 rnd(43);
+    std::uniform_int_distribution<size_t> pick(0, words.size() - 1);
+    std::vector<std::pair<size_t, size_t>> spans;
+    for (size_t i = 0; i < 100000; ++i) {
+        std::wstring w = words[pick(rnd)];
+        if (i % 2) {
+            w[w.size() / 2] = L'#';
+        }
+        spans.push_back({text.size(), w.size()});
+        text += w;
+    }
+    TWords queries;
+    for (auto&& s: spans) {
+        queries.push_back(TWord(&text[s.first], s.second));
+    }
+    return queries;
+}
+
+template<class TBuild, class TLookup>
+static void Run(const char* name, const std::vector<std::wstring>& words, TBuild build, TLookup lookup) {
+    std::cout.flush();
+    pid_t pid = fork();
+    if (pid != 0) {
+        waitpid(pid, nullptr, 0);
+        return;
+    }
+    std::wstring text;
+    TWords queries = MakeQueries(words, text);
+    uint64_t rssBefore = CurrentRssKb();
+    uint64_t startTime = GetCurrentTimeMs();
+    auto&& vocabulary = build(words);
+    uint64_t buildTime = GetCurrentTimeMs() - startTime;
+    uint64_t rss = CurrentRssKb() - rssBefore;
+
+    startTime = GetCurrentTimeMs();
+    size_t found = 0;
+    for (size_t i = 0; i < LOOKUPS; ++i) {
+        found += lookup(vocabulary, queries[i % queries.size()]);
+    }
+    uint64_t lookupTime = std::max(uint64_t(1), GetCurrentTimeMs() - startTime);
+    printf("%8s %12.1f %12lu %16.0f %10lu\n", name, rss / 1024.0, (unsigned long)buildTime,
+           1000.0 * LOOKUPS / lookupTime, (unsigned long)found);
+    exit(0);
+}
+
+int main(int argc, const char** argv) {
+    if (argc < 2) {
+        std::cerr << "Usage: " << argv[0] << " model.bin|words_count" << std::endl;
+        return 42;
+    }
+    std::vector<std::wstring> words = LoadWords(argv[1]);
+    printf("[info] %lu words, %lu lookups\n", (unsigned long)words.size(), (unsigned long)LOOKUPS);
+    printf("%8s %12s %12s %16s %10s\n", "", "rss_mb", "build_ms", "lookups/s", "found");
+
+    using TMap = tsl::robin_map<std::wstring, TWordId>;
+    Run("map", words, [](const std::vector<std::wstring>& words) {
+        std::unique_ptr<TMap> map(new TMap());
+        for (auto&& w: words) {
+            map->insert(std::make_pair(w, TWordId(map->size())));
+        }
+        return map;
+    }, [](const std::unique_ptr<TMap>& map, const TWord& w) {
+        // the way the map was probed, through a temporary string
+        return map->find(std::wstring(w.Ptr, w.Len)) != map->end();
+    });
+
+    Run("arena", words, [](const std::vector<std::wstring>& words) {
+        std::unique_ptr<TVocabulary> vocabulary(new TVocabulary());
+        for (auto&& w: words) {
+            vocabulary->Insert(w.data(), w.size());
+        }
+        return vocabulary;
+    }, [](const std::unique_ptr<TVocabulary>& vocabulary, const TWord& w) {
+        return vocabulary->Find(w.Ptr, w.Len) != TVocabulary::NO_ID;
+    });
+    return 0;
+}
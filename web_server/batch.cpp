@@ -0,0 +1,113 @@
+#include "batch.hpp"
+
+#ifdef WITH_ZLIB
+#include <zlib.h>
+#endif
+
+namespace NJamSpell {
+
+static bool HasToken(const std::string& header, const std::string& token) {
+    return header.find(token) != std::string::npos;
+}
+
+static bool ParseLengthPrefixed(const std::string& body, std::vector<std::string>& texts) {
+    size_t pos = 0;
+    while (pos < body.size()) {
+        if (body.size() - pos < 4) {
+            return false;
+        }
+        const unsigned char* p = (const unsigned char*)body.data() + pos;
+        uint32_t len = uint32_t(p[0]) | uint32_t(p[1]) << 8 | uint32_t(p[2]) << 16 | uint32_t(p[3]) << 24;
+        pos += 4;
+        if (body.size() - pos < len) {
+            return false;
+        }
+        texts.push_back(body.substr(pos, len));
+        pos += len;
+    }
+    return true;
+}
+
+static bool JsonToTexts(const nlohmann::json& body, std::vector<std::string>& texts) {
+    const nlohmann::json* array = &body;
+    if (body.is_object() && body.count("texts")) {
+        array = &body["texts"];
+    }
+    if (!array->is_array()) {
+        return false;
+    }
+    for (auto&& text: *array) {
+        if (!text.is_string()) {
+            return false;
+        }
+        texts.push_back(text.get<std::string>());
+    }
+    return true;
+}
+
+bool ParseBatch(const httplib::Request& req, std::vector<std::string>& texts, std::string& error) {
+    const std::string& contentType = req.get_header_value("Content-Type");
+    texts.clear();
+    if (HasToken(contentType, "application/octet-stream")) {
+        if (!ParseLengthPrefixed(req.body, texts)) {
+            error = "truncated length prefixed body";
+            return false;
+        }
+        return true;
+    }
+    nlohmann::json body;
+    try {
+        if (HasToken(contentType, "msgpack")) {
+            body = nlohmann::json::from_msgpack(req.body);
+        } else {
+            body = nlohmann::json::parse(req.body);
+        }
+    } catch (const std::exception& e) {
+        error = e.what();
+        return false;
+    }
+    if (!JsonToTexts(body, texts)) {
+        error = "expected array of strings or {\"texts\": [...]}";
+        return false;
+    }
+    return true;
+}
+
+void SetBatchContent(const httplib::Request& req, const nlohmann::json& result, httplib::Response& resp) {
+    if (HasToken(req.get_header_value("Accept"), "application/msgpack")) {
+        std::vector<uint8_t> packed = nlohmann::json::to_msgpack(result);
+        resp.set_content(std::string(packed.begin(), packed.end()), "application/msgpack");
+        return;
+    }
+    resp.set_content(result.dump() + "\n", "application/json");
+}
+
+void CompressResponse(const httplib::Request& req, size_t minBytes, httplib::Response& resp) {
+#ifdef WITH_ZLIB
+    if (minBytes == 0 || resp.body.size() < minBytes ||
+        !HasToken(req.get_header_value("Accept-Encoding"), "gzip"))
+    {
+        return;
+    }
+    z_stream strm = {};
+    // 15 + 16: gzip wrapper instead of zlib one
+    if (deflateInit2(&strm, Z_DEFAULT_COMPRESSION, Z_DEFLATED, 15 + 16, 8, Z_DEFAULT_STRATEGY) != Z_OK) {
+        return;
+    }
+    std::string compressed(deflateBound(&strm, resp.body.size()), '\0');
+    strm.next_in = (Bytef*)resp.body.data();
+    strm.avail_in = resp.body.size();
+    strm.next_out = (Bytef*)&compressed[0];
+    strm.avail_out = compressed.size();
+    int ret = deflate(&strm, Z_FINISH);
+    compressed.resize(strm.total_out);
+    deflateEnd(&strm);
+    if (ret != Z_STREAM_END) {
+        return;
+    }
+    resp.body.swap(compressed);
+    resp.set_header("Content-Encoding", "gzip");
+#endif
+}
+
+} // NJamSpell
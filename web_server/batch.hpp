@@ -0,0 +1,25 @@
+#pragma once
+
+#include <string>
+#include <vector>
+
+#include "contrib/httplib/httplib.h"
+#include "contrib/nlohmann/json.hpp"
+
+namespace NJamSpell {
+
+// Texts of /batch request body, by Content-Type:
+//   application/json          - ["text", ...] or {"texts": ["text", ...]}
+//   application/msgpack       - same as json, MessagePack encoded
+//   application/octet-stream  - texts one after another, each is uint32
+//                               little endian byte length and utf-8 bytes
+bool ParseBatch(const httplib::Request& req, std::vector<std::string>& texts, std::string& error);
+
+// Compact json, or MessagePack if client accepts application/msgpack
+void SetBatchContent(const httplib::Request& req, const nlohmann::json& result, httplib::Response& resp);
+
+// Gzip response body of at least minBytes if client accepts gzip,
+// minBytes = 0 disables compression (and so does build without zlib)
+void CompressResponse(const httplib::Request& req, size_t minBytes, httplib::Response& resp);
+
+} // NJamSpell
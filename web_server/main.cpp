@@ -1,60 +1,482 @@
 #include "jamspell/spell_corrector.hpp"
 #include "contrib/httplib/httplib.h"
 #include "contrib/nlohmann/json.hpp"
-#include <cwctype>
+#include "batch.hpp"
+#include "model_registry.hpp"
+#include "session_store.hpp"
+#include "slow_log.hpp"
+#include <cctype>
+#include <cerrno>
+#include <climits>
+#include <csignal>
+#include <cstdlib>
+#include <functional>
+#include <limits>
+#include <map>
+#include <sstream>
+#include <thread>
 
-std::string GetCandidates(const NJamSpell::TSpellCorrector& corrector,
-                          const std::string& text)
+// budgetUs = 0 means no time budget; with session text is taken from it
+// and budget is not applied
+using THandler = std::function<std::string(const NJamSpell::TSpellCorrector&, NJamSpell::TCorrectionSession*,
+                                           std::wstring&, uint64_t budgetUs, NJamSpell::TTrace*,
+                                           httplib::Response&)>;
+
+static const std::string DEFAULT_MODEL = "default";
+static volatile std::sig_atomic_t ReloadRequested = 0;
+
+void OnReloadSignal(int) {
+    ReloadRequested = 1;
+}
+
+nlohmann::json DegradedToJson(const NJamSpell::TDegradedWords& degraded) {
+    nlohmann::json words = nlohmann::json::array();
+    for (size_t i = 0; i < degraded.Size(); ++i) {
+        nlohmann::json word;
+        word["pos_from"] = degraded.Starts[i];
+        word["len"] = degraded.Lengths[i];
+        word["level"] = degraded.Levels[i];
+        words.push_back(word);
+    }
+    return words;
+}
+
+nlohmann::json CorrectionsToJson(const NJamSpell::TCorrections& corrections) {
+    nlohmann::json results = nlohmann::json::array();
+    for (size_t i = 0; i < corrections.Size(); ++i) {
+        nlohmann::json currentResult;
+        currentResult["pos_from"] = corrections.Starts[i];
+        currentResult["len"] = corrections.Lengths[i];
+        currentResult["candidates"] = nlohmann::json::array();
+        for (size_t k = corrections.Candidates[i]; k < corrections.Candidates[i + 1]; ++k) {
+            currentResult["candidates"].push_back(corrections.GetCandidate(k));
+        }
+        results.push_back(currentResult);
+    }
+    return results;
+}
+
+nlohmann::json CandidatesToJson(const NJamSpell::TSpellCorrector& corrector,
+                                std::wstring& input,
+                                uint64_t budgetUs,
+                                NJamSpell::TTrace* trace)
 {
-    std::wstring input = NJamSpell::UTF8ToWide(text);
-    std::transform(input.begin(), input.end(), input.begin(), std::towlower);
-    NJamSpell::TSentences sentences = corrector.GetLangModel().Tokenize(input);
+    NJamSpell::TDegradedWords degraded;
+    NJamSpell::TCorrections corrections = budgetUs ?
+        corrector.GetCorrectionsWithBudget(input, 7, budgetUs, &degraded, trace) :
+        corrector.GetCorrections(input, 7, trace);
 
     nlohmann::json results;
-    results["results"] = nlohmann::json::array();
-
-    for (size_t i = 0; i < sentences.size(); ++i) {
-        const NJamSpell::TWords& sentence = sentences[i];
-        for (size_t j = 0; j < sentence.size(); ++j) {
-            NJamSpell::TWord currWord = sentence[j];
-            std::wstring wCurrWord(currWord.Ptr, currWord.Len);
-            NJamSpell::TWords candidates = corrector.GetCandidatesRaw(sentence, j);
-            if (candidates.empty()) {
-                continue;
-            }
-            std::wstring firstCandidate(candidates[0].Ptr, candidates[0].Len);
-            if (wCurrWord == firstCandidate) {
-                continue;
+    results["results"] = CorrectionsToJson(corrections);
+
+    if (budgetUs) {
+        results["degraded"] = DegradedToJson(degraded);
+    }
+    return results;
+}
+
+void SetSessionHeaders(const NJamSpell::TCorrectionSession& session, httplib::Response& resp) {
+    resp.set_header("X-Session-Recomputed", std::to_string(session.GetRecomputed()).c_str());
+    resp.set_header("X-Session-Reused", std::to_string(session.GetReused()).c_str());
+}
+
+std::string GetCandidates(const NJamSpell::TSpellCorrector& corrector,
+                          NJamSpell::TCorrectionSession* session,
+                          std::wstring& input,
+                          uint64_t budgetUs,
+                          NJamSpell::TTrace* trace,
+                          httplib::Response& resp)
+{
+    if (session) {
+        nlohmann::json results;
+        results["results"] = CorrectionsToJson(session->GetCorrections(corrector, 7));
+        SetSessionHeaders(*session, resp);
+        return results.dump();
+    }
+    return CandidatesToJson(corrector, input, budgetUs, trace).dump();
+}
+
+std::string FixText(const NJamSpell::TSpellCorrector& corrector,
+                    NJamSpell::TCorrectionSession* session,
+                    std::wstring& input,
+                    uint64_t budgetUs,
+                    NJamSpell::TTrace* trace,
+                    httplib::Response& resp)
+{
+    if (session) {
+        std::string result = NJamSpell::WideToUTF8(session->FixFragment(corrector));
+        SetSessionHeaders(*session, resp);
+        return result;
+    }
+    if (!budgetUs) {
+        return NJamSpell::WideToUTF8(corrector.FixFragment(input, trace));
+    }
+    NJamSpell::TDegradedWords degraded;
+    std::string result = NJamSpell::WideToUTF8(corrector.FixFragmentWithBudget(input, budgetUs, &degraded, trace));
+    // skipped words are always the tail of the text, report where it starts
+    std::string degradedWords;
+    for (size_t i = 0; i < degraded.Size(); ++i) {
+        if (degraded.Levels[i] == NJamSpell::DEGRADE_SKIPPED) {
+            resp.set_header("X-Skipped-From", std::to_string(degraded.Starts[i]).c_str());
+            break;
+        }
+        degradedWords += (degradedWords.empty() ? "" : ",") + std::to_string(degraded.Starts[i]) + ":" +
+                         std::to_string(degraded.Lengths[i]) + ":" + std::to_string(degraded.Levels[i]);
+    }
+    resp.set_header("X-Degraded-Words", std::to_string(degraded.Size()).c_str());
+    if (!degradedWords.empty()) {
+        resp.set_header("X-Degraded", degradedWords.c_str());
+    }
+    return result;
+}
+
+NJamSpell::TModelPtr FindModel(NJamSpell::TModelRegistry& models,
+                               const httplib::Request& req,
+                               httplib::Response& resp)
+{
+    std::string modelId = req.has_param("lang") ? req.get_param_value("lang") : DEFAULT_MODEL;
+    NJamSpell::TModelPtr model = models.Get(modelId);
+    if (!model) {
+        resp.status = models.Has(modelId) ? 503 : 404;
+        resp.set_content("[error] model " + modelId + " is not available\n", "text/plain");
+        return model;
+    }
+    resp.set_header("X-Model-Checksum", std::to_string(model->CheckSum).c_str());
+    return model;
+}
+
+// Unsigned integer parameter, defaultValue if it is absent. Only digits are
+// accepted and values up to maxValue; otherwise 400 is set to resp.
+bool GetUIntParam(const httplib::Request& req,
+                  const char* name,
+                  uint64_t defaultValue,
+                  uint64_t maxValue,
+                  uint64_t& value,
+                  httplib::Response& resp)
+{
+    if (!req.has_param(name)) {
+        value = defaultValue;
+        return true;
+    }
+    std::string param = req.get_param_value(name);
+    char* end = nullptr;
+    errno = 0;
+    // strtoull skips spaces and accepts sign, "-1" would wrap around
+    unsigned long long parsed = param.empty() || !std::isdigit((unsigned char)param[0]) ? 0 :
+                                std::strtoull(param.c_str(), &end, 10);
+    if (!end || *end != '\0' || errno == ERANGE || parsed > maxValue) {
+        resp.status = 400;
+        resp.set_content(std::string("[error] ") + name + " should be a number from 0 to " +
+                         std::to_string(maxValue) + "\n", "text/plain");
+        return false;
+    }
+    value = parsed;
+    return true;
+}
+
+bool GetBudgetUs(const httplib::Request& req,
+                 uint64_t defaultBudgetMs,
+                 uint64_t startTime,
+                 uint64_t& budgetUs,
+                 httplib::Response& resp)
+{
+    uint64_t budgetMs = 0;
+    if (!GetUIntParam(req, "budget_ms", defaultBudgetMs, std::numeric_limits<uint64_t>::max() / 1000, budgetMs, resp)) {
+        return false;
+    }
+    // time spent before handler (model loading, decoding) counts too
+    budgetUs = budgetMs * 1000;
+    if (budgetUs) {
+        uint64_t spentUs = NJamSpell::GetCurrentTimeUs() - startTime;
+        budgetUs = budgetUs > spentUs ? budgetUs - spentUs : 1;
+    }
+    return true;
+}
+
+// File to load for /reload: empty request means the current file of the
+// model, id of a configured model means its file, other paths are accepted
+// only inside --models-dir (relative ones are taken from there). Returns
+// http status, 200 if modelFile is set.
+int ResolveReloadFile(const NJamSpell::TModelRegistry& models,
+                      const std::string& modelsDir,
+                      const std::string& requested,
+                      std::string& modelFile)
+{
+    if (requested.empty()) {
+        return 200;
+    }
+    if (models.Has(requested)) {
+        modelFile = models.GetModelFile(requested);
+        return 200;
+    }
+    if (modelsDir.empty()) {
+        return 403;
+    }
+    char dir[PATH_MAX];
+    char path[PATH_MAX];
+    std::string requestedPath = requested[0] == '/' ? requested : modelsDir + "/" + requested;
+    if (!realpath(modelsDir.c_str(), dir) || !realpath(requestedPath.c_str(), path)) {
+        return 400;
+    }
+    std::string dirPrefix = std::string(dir) + "/";
+    if (std::string(path).compare(0, dirPrefix.size(), dirPrefix) != 0) {
+        return 403;
+    }
+    modelFile = path;
+    return 200;
+}
+
+void Process(NJamSpell::TModelRegistry& models,
+             NJamSpell::TSessionStore& sessions,
+             NJamSpell::TSlowLog& slowLog,
+             uint64_t defaultBudgetMs,
+             size_t gzipMinBytes,
+             const httplib::Request& req,
+             const std::string& text,
+             httplib::Response& resp,
+             const THandler& handler)
+{
+    uint64_t startTime = NJamSpell::GetCurrentTimeUs();
+    NJamSpell::TModelPtr model = FindModel(models, req, resp);
+    if (!model) {
+        return;
+    }
+    std::wstring input = NJamSpell::UTF8ToWide(text);
+    NJamSpell::TTrace trace;
+    size_t textLen = input.size();
+    uint64_t budgetUs = 0;
+    if (!GetBudgetUs(req, defaultBudgetMs, startTime, budgetUs, resp)) {
+        return;
+    }
+    std::string result;
+    if (req.has_param("session")) {
+        // text replaces session one, or with edit_from and edit_len
+        // replaces that part of it
+        NJamSpell::TSessionPtr session = sessions.Get(req.get_param_value("session"));
+        if (!session) {
+            resp.status = 400;
+            resp.set_content("[error] sessions are disabled\n", "text/plain");
+            return;
+        }
+        std::lock_guard<std::mutex> guard(session->Lock);
+        if (req.has_param("edit_from")) {
+            uint64_t editFrom = 0;
+            uint64_t editLen = 0;
+            const uint64_t maxPos = std::numeric_limits<size_t>::max();
+            if (!GetUIntParam(req, "edit_from", 0, maxPos, editFrom, resp) ||
+                !GetUIntParam(req, "edit_len", 0, maxPos, editLen, resp))
+            {
+                return;
             }
-            nlohmann::json currentResult;
-            currentResult["pos_from"] = currWord.Ptr - &input[0];
-            currentResult["len"] = currWord.Len;
-            currentResult["candidates"] = nlohmann::json::array();
-
-            size_t candidatesSize = std::min(candidates.size(), size_t(7));
-            for (size_t k = 0; k < candidatesSize; ++k) {
-                NJamSpell::TWord candidate = candidates[k];
-                std::string candidateStr = NJamSpell::WideToUTF8(std::wstring(candidate.Ptr, candidate.Len));
-                currentResult["candidates"].push_back(candidateStr);
+            // edit_from + edit_len must not go past session text
+            if (!session->Session.ApplyEdit(editFrom, editLen, input)) {
+                resp.status = 400;
+                resp.set_content("[error] edit is out of session text\n", "text/plain");
+                return;
             }
+        } else {
+            session->Session.SetText(input);
+        }
+        result = handler(model->Corrector, &session->Session, input, 0, &trace, resp);
+        textLen = session->Session.GetText().size();
+    } else {
+        result = handler(model->Corrector, nullptr, input, budgetUs, &trace, resp);
+    }
+    uint64_t processTime = NJamSpell::GetCurrentTimeUs() - startTime;
+    if (slowLog.IsSlow(processTime)) {
+        slowLog.Add(req.path, processTime, textLen, trace);
+    }
+    resp.set_content(result + "\n", "text/plain");
+    NJamSpell::CompressResponse(req, gzipMinBytes, resp);
+}
 
-            results["results"].push_back(currentResult);
+// End of the piece of utf-8 text starting at from, at least minBytes long
+// (unless text ends earlier) and ending right after a sentence end of the
+// tokenizer: '.', '!' or '?' that is not a letter of alphabet. Tokenizer
+// state is empty there, so pieces are split into the same sentences as the
+// whole text, and sentences are corrected independently.
+size_t FindPieceEnd(const std::string& text, size_t from, size_t minBytes,
+                    const std::unordered_set<wchar_t>& alphabet)
+{
+    for (size_t i = from + std::max(minBytes, size_t(1)) - 1; i < text.size(); ++i) {
+        char c = text[i];
+        if ((c == '.' || c == '!' || c == '?') && alphabet.find(wchar_t(c)) == alphabet.end()) {
+            return i + 1;
         }
     }
+    return text.size();
+}
 
-    return results.dump(4);
+// POST /fix?stream=1 - body is corrected piece by piece and every piece is
+// sent as soon as it is fixed, so only one piece is held in wide strings.
+// Output is the same as of /fix; time budget and sessions are not applied.
+void ProcessStream(NJamSpell::TModelRegistry& models,
+                   NJamSpell::TSlowLog& slowLog,
+                   size_t pieceBytes,
+                   const httplib::Request& req,
+                   httplib::Response& resp)
+{
+    uint64_t startTime = NJamSpell::GetCurrentTimeUs();
+    NJamSpell::TModelPtr model = FindModel(models, req, resp);
+    if (!model) {
+        return;
+    }
+    // called while response is written, request and model are alive till then
+    resp.set_chunked_content_provider([&req, &slowLog, model, pieceBytes, startTime](
+        const httplib::Response::DataSink& sink)
+    {
+        const std::string& text = req.body;
+        const NJamSpell::TSpellCorrector& corrector = model->Corrector;
+        const std::unordered_set<wchar_t>& alphabet = corrector.GetLangModel().GetAlphabet();
+        size_t textLen = 0;
+        for (size_t pos = 0; pos < text.size();) {
+            size_t end = FindPieceEnd(text, pos, pieceBytes, alphabet);
+            std::wstring input = NJamSpell::UTF8ToWide(text.substr(pos, end - pos));
+            textLen += input.size();
+            std::string result = NJamSpell::WideToUTF8(corrector.FixFragment(input));
+            if (!sink(result.data(), result.size())) {
+                return;
+            }
+            pos = end;
+        }
+        sink("\n", 1);
+        uint64_t processTime = NJamSpell::GetCurrentTimeUs() - startTime;
+        if (slowLog.IsSlow(processTime)) {
+            slowLog.Add(req.path, processTime, textLen, NJamSpell::TTrace());
+        }
+    }, "text/plain");
 }
 
-std::string FixText(const NJamSpell::TSpellCorrector& corrector,
-                    const std::string& text)
+// Many texts with one model lookup, budget is for the whole batch.
+// Results are in the order of texts: fixed strings for mode=fix (default),
+// /candidates results for mode=candidates.
+void ProcessBatch(NJamSpell::TModelRegistry& models,
+                  NJamSpell::TSlowLog& slowLog,
+                  uint64_t defaultBudgetMs,
+                  size_t gzipMinBytes,
+                  const httplib::Request& req,
+                  httplib::Response& resp)
 {
-    std::wstring input = NJamSpell::UTF8ToWide(text);
-    return NJamSpell::WideToUTF8(corrector.FixFragment(input));
+    uint64_t startTime = NJamSpell::GetCurrentTimeUs();
+    std::string mode = req.has_param("mode") ? req.get_param_value("mode") : "fix";
+    std::vector<std::string> texts;
+    std::string error;
+    if (mode != "fix" && mode != "candidates") {
+        error = "unknown mode " + mode;
+    } else {
+        NJamSpell::ParseBatch(req, texts, error);
+    }
+    if (!error.empty()) {
+        resp.status = 400;
+        resp.set_content("[error] " + error + "\n", "text/plain");
+        return;
+    }
+    NJamSpell::TModelPtr model = FindModel(models, req, resp);
+    if (!model) {
+        return;
+    }
+    uint64_t budgetUs = 0;
+    if (!GetBudgetUs(req, defaultBudgetMs, startTime, budgetUs, resp)) {
+        return;
+    }
+    uint64_t budgetStart = NJamSpell::GetCurrentTimeUs();
+    NJamSpell::TTrace trace;
+    // trace points into inputs, they are kept until the request is logged
+    std::vector<std::wstring> inputs;
+    inputs.reserve(texts.size());
+    size_t textsLen = 0;
+    nlohmann::json results = nlohmann::json::array();
+    nlohmann::json degradedWords = nlohmann::json::array();
+    for (auto&& text: texts) {
+        inputs.push_back(NJamSpell::UTF8ToWide(text));
+        std::wstring& input = inputs.back();
+        textsLen += input.size();
+        uint64_t textBudgetUs = 0;
+        if (budgetUs) {
+            uint64_t spentUs = NJamSpell::GetCurrentTimeUs() - budgetStart;
+            textBudgetUs = budgetUs > spentUs ? budgetUs - spentUs : 1;
+        }
+        if (mode == "candidates") {
+            nlohmann::json result = CandidatesToJson(model->Corrector, input, textBudgetUs, &trace);
+            results.push_back(std::move(result["results"]));
+            if (textBudgetUs) {
+                degradedWords.push_back(std::move(result["degraded"]));
+            }
+        } else if (textBudgetUs) {
+            NJamSpell::TDegradedWords degraded;
+            results.push_back(NJamSpell::WideToUTF8(
+                model->Corrector.FixFragmentWithBudget(input, textBudgetUs, &degraded, &trace)));
+            degradedWords.push_back(DegradedToJson(degraded));
+        } else {
+            results.push_back(NJamSpell::WideToUTF8(model->Corrector.FixFragment(input, &trace)));
+        }
+    }
+    nlohmann::json response;
+    response["results"] = std::move(results);
+    if (budgetUs) {
+        response["degraded"] = std::move(degradedWords);
+    }
+    uint64_t processTime = NJamSpell::GetCurrentTimeUs() - startTime;
+    if (slowLog.IsSlow(processTime)) {
+        slowLog.Add(req.path, processTime, textsLen, trace);
+    }
+    NJamSpell::SetBatchContent(req, response, resp);
+    NJamSpell::CompressResponse(req, gzipMinBytes, resp);
+}
+
+void PrintUsage(const char** argv) {
+    std::cerr << "Usage: " << argv[0] << " model.bin localhost 8080 [options]\n";
+    std::cerr << "    --slow-ms=500          - requests slower than this are kept in /debug/slow\n";
+    std::cerr << "    --slow-buffer=100      - number of slow requests to keep, 0 to disable\n";
+    std::cerr << "    --slow-trace-tokens=50 - slowest tokens of a request to keep in its trace\n";
+    std::cerr << "    --slow-log=slow.jsonl  - also append slow requests to file as json lines\n";
+    std::cerr << "    --cache-dir=/tmp       - directory for .spell cache, default is next to model\n";
+    std::cerr << "    --background-cache=0   - 1 to serve at once while .spell cache is built\n";
+    std::cerr << "    --models=en:en.bin,ru:ru.bin - more models, loaded on first request with ?lang=en\n";
+    std::cerr << "    --memory-budget-mb=0   - unload least recently used models above this, 0 - no limit\n";
+    std::cerr << "    --budget-ms=0          - time budget per request, words are degraded to fit it, 0 - no limit\n";
+    std::cerr << "    --gzip-min-bytes=1024  - gzip responses of this size and more if client accepts it, 0 - never\n";
+    std::cerr << "    --max-sessions=1000    - incremental correction sessions kept (session parameter), 0 to disable\n";
+    std::cerr << "    --stream-piece-kb=64   - POST /fix?stream=1 corrects and sends text by pieces of about this size\n";
+    std::cerr << "    --models-dir=          - /reload accepts model files from this directory, otherwise only model ids\n";
+    std::cerr << "POST json array of texts to /batch[?mode=candidates] to correct many texts in one request\n";
+    std::cerr << "Send SIGHUP (same model files) or POST new.bin path (inside --models-dir) to /reload[?lang=en] to switch model without restart\n";
+}
+
+bool ParseOptions(int argc, const char** argv, std::map<std::string, std::string>& options) {
+    for (int i = 4; i < argc; ++i) {
+        std::string arg = argv[i];
+        size_t eq = arg.find('=');
+        if (arg.compare(0, 2, "--") != 0 || eq == std::string::npos) {
+            return false;
+        }
+        std::string key = arg.substr(2, eq - 2);
+        if (options.find(key) == options.end()) {
+            return false;
+        }
+        options[key] = arg.substr(eq + 1);
+    }
+    return true;
 }
 
 int main(int argc, const char** argv) {
-    if (argc != 4) {
-        std::cerr << "Usage: " << argv[0] << " model.bin localhost 8080\n";
+    std::map<std::string, std::string> options = {
+        {"slow-ms", "500"},
+        {"slow-buffer", "100"},
+        {"slow-trace-tokens", "50"},
+        {"slow-log", ""},
+        {"cache-dir", ""},
+        {"background-cache", "0"},
+        {"models", ""},
+        {"memory-budget-mb", "0"},
+        {"budget-ms", "0"},
+        {"gzip-min-bytes", "1024"},
+        {"max-sessions", "1000"},
+        {"stream-piece-kb", "64"},
+        {"models-dir", ""},
+    };
+    if (argc < 4 || !ParseOptions(argc, argv, options)) {
+        PrintUsage(argv);
         return 42;
     }
 
@@ -62,28 +484,113 @@ int main(int argc, const char** argv) {
     std::string hostname = argv[2];
     int port = std::stoi(argv[3]);
 
-    NJamSpell::TSpellCorrector corrector;
-    std::cerr << "[info] loading model" << std::endl;
-    if (!corrector.LoadLangModel(modelFile)) {
+    NJamSpell::TModelRegistry models(options["cache-dir"], std::stoull(options["memory-budget-mb"]) * 1024 * 1024,
+                                     options["background-cache"] == "1");
+    models.Add(DEFAULT_MODEL, modelFile);
+    std::stringstream modelsOption(options["models"]);
+    std::string model;
+    while (std::getline(modelsOption, model, ',')) {
+        size_t sep = model.find(':');
+        if (sep == std::string::npos || sep == 0) {
+            PrintUsage(argv);
+            return 42;
+        }
+        models.Add(model.substr(0, sep), model.substr(sep + 1));
+    }
+    if (!models.Get(DEFAULT_MODEL)) {
         std::cerr << "[error] failed to load model" << std::endl;
         return 42;
     }
 
+    std::signal(SIGHUP, OnReloadSignal);
+    std::thread([&models]() {
+        while (true) {
+            std::this_thread::sleep_for(std::chrono::milliseconds(200));
+            if (ReloadRequested) {
+                ReloadRequested = 0;
+                models.ReloadLoaded();
+            }
+        }
+    }).detach();
+
+    NJamSpell::TSlowLog slowLog(std::stoul(options["slow-buffer"]),
+                                std::stoul(options["slow-ms"]),
+                                std::stoul(options["slow-trace-tokens"]),
+                                options["slow-log"]);
+
+    uint64_t budgetMs = std::stoull(options["budget-ms"]);
+    size_t gzipMinBytes = std::stoul(options["gzip-min-bytes"]);
+    NJamSpell::TSessionStore sessions(std::stoul(options["max-sessions"]));
+    size_t streamPieceBytes = std::stoul(options["stream-piece-kb"]) * 1024;
+    THandler fixHandler = FixText;
+    THandler candidatesHandler = GetCandidates;
+
     httplib::Server srv;
-    srv.Get("/fix", [&corrector](const httplib::Request& req, httplib::Response& resp) {
-        resp.set_content(FixText(corrector, req.get_param_value("text")) + "\n", "text/plain");
+    srv.Get("/fix", [&](const httplib::Request& req, httplib::Response& resp) {
+        Process(models, sessions, slowLog, budgetMs, gzipMinBytes, req, req.get_param_value("text"), resp, fixHandler);
     });
 
-    srv.Post("/fix", [&corrector](const httplib::Request& req, httplib::Response& resp) {
-        resp.set_content(FixText(corrector, req.body) + "\n", "text/plain");
+    srv.Post("/fix", [&](const httplib::Request& req, httplib::Response& resp) {
+        if (req.get_param_value("stream") == "1") {
+            ProcessStream(models, slowLog, streamPieceBytes, req, resp);
+            return;
+        }
+        Process(models, sessions, slowLog, budgetMs, gzipMinBytes, req, req.body, resp, fixHandler);
+    });
+
+    srv.Get("/candidates", [&](const httplib::Request& req, httplib::Response& resp) {
+        Process(models, sessions, slowLog, budgetMs, gzipMinBytes, req, req.get_param_value("text"), resp, candidatesHandler);
+    });
+
+    srv.Post("/candidates", [&](const httplib::Request& req, httplib::Response& resp) {
+        Process(models, sessions, slowLog, budgetMs, gzipMinBytes, req, req.body, resp, candidatesHandler);
+    });
+
+    srv.Post("/batch", [&](const httplib::Request& req, httplib::Response& resp) {
+        ProcessBatch(models, slowLog, budgetMs, gzipMinBytes, req, resp);
     });
 
-    srv.Get("/candidates", [&corrector](const httplib::Request& req, httplib::Response& resp) {
-        resp.set_content(GetCandidates(corrector, req.get_param_value("text")) + "\n", "text/plain");
+    srv.Delete("/session", [&](const httplib::Request& req, httplib::Response& resp) {
+        nlohmann::json result;
+        result["ok"] = sessions.Remove(req.get_param_value("session"));
+        resp.set_content(result.dump() + "\n", "application/json");
     });
 
-    srv.Post("/candidates", [&corrector](const httplib::Request& req, httplib::Response& resp) {
-        resp.set_content(GetCandidates(corrector, req.body) + "\n", "text/plain");
+    srv.Get("/debug/slow", [&](const httplib::Request& req, httplib::Response& resp) {
+        resp.set_content(slowLog.Dump().dump() + "\n", "application/json");
+        NJamSpell::CompressResponse(req, gzipMinBytes, resp);
+    });
+
+    srv.Get("/status", [&](const httplib::Request& req, httplib::Response& resp) {
+        resp.set_content(models.GetStatus().dump() + "\n", "application/json");
+        NJamSpell::CompressResponse(req, gzipMinBytes, resp);
+    });
+
+    std::string modelsDir = options["models-dir"];
+    srv.Post("/reload", [&models, &modelsDir](const httplib::Request& req, httplib::Response& resp) {
+        std::string requested = req.has_param("model") ? req.get_param_value("model") : req.body;
+        std::string modelId = req.has_param("lang") ? req.get_param_value("lang") : DEFAULT_MODEL;
+        if (!models.Has(modelId)) {
+            resp.status = 404;
+            resp.set_content("[error] model " + modelId + " is not available\n", "text/plain");
+            return;
+        }
+        std::string modelFile;
+        int status = ResolveReloadFile(models, modelsDir, requested, modelFile);
+        if (status != 200) {
+            resp.status = status;
+            resp.set_content("[error] model file should be a model id or a file inside --models-dir\n", "text/plain");
+            return;
+        }
+        NJamSpell::TModelPtr model = models.Reload(modelId, modelFile);
+        nlohmann::json result;
+        result["ok"] = bool(model);
+        if (model) {
+            result["model_checksum"] = model->CheckSum;
+        } else {
+            resp.status = 500;
+        }
+        resp.set_content(result.dump() + "\n", "application/json");
     });
 
     std::cerr << "[info] starting web server at " << hostname << ":" << port << std::endl;
@@ -0,0 +1,217 @@
+#include "model_registry.hpp"
+
+namespace NJamSpell {
+
+nlohmann::json ModelInfoToJson(const TModelInfo& info) {
+    nlohmann::json bytes;
+    bytes["word_to_id"] = info.WordToIdBytes;
+    bytes["id_to_word"] = info.IdToWordBytes;
+    bytes["buckets"] = info.BucketsBytes;
+    bytes["perfect_hash"] = info.PerfectHashBytes;
+    bytes["alphabet"] = info.AlphabetBytes;
+    bytes["deletes1"] = info.Deletes1Bytes;
+    bytes["deletes2"] = info.Deletes2Bytes;
+    bytes["total"] = info.TotalBytes();
+    nlohmann::json result;
+    result["bytes"] = bytes;
+    result["vocab_size"] = info.VocabSize;
+    result["ngrams"] = {info.Grams1, info.Grams2, info.Grams3};
+    result["ngrams_total"] = info.Ngrams;
+    result["buckets"] = info.BucketsNumber;
+    result["bucket_load_factor"] = info.BucketLoadFactor;
+    return result;
+}
+
+TModelRegistry::TModelRegistry(const std::string& cacheDir, uint64_t memoryBudget, bool backgroundCache)
+    : CacheDir(cacheDir)
+    , MemoryBudget(memoryBudget)
+    , BackgroundCache(backgroundCache)
+{
+}
+
+void TModelRegistry::Add(const std::string& id, const std::string& modelFile) {
+    std::lock_guard<std::mutex> guard(Lock);
+    Entries[id].ModelFile = modelFile;
+}
+
+bool TModelRegistry::Has(const std::string& id) const {
+    std::lock_guard<std::mutex> guard(Lock);
+    return Entries.find(id) != Entries.end();
+}
+
+std::string TModelRegistry::GetModelFile(const std::string& id) const {
+    std::lock_guard<std::mutex> guard(Lock);
+    auto it = Entries.find(id);
+    return it == Entries.end() ? std::string() : it->second.ModelFile;
+}
+
+std::shared_ptr<std::mutex> TModelRegistry::GetLoadLock(const std::string& id) {
+    std::lock_guard<std::mutex> guard(Lock);
+    auto it = Entries.find(id);
+    if (it == Entries.end()) {
+        return nullptr;
+    }
+    return it->second.LoadLock;
+}
+
+TModelPtr TModelRegistry::Get(const std::string& id) {
+    std::string modelFile;
+    std::shared_ptr<std::mutex> loadLock;
+    {
+        std::lock_guard<std::mutex> guard(Lock);
+        auto it = Entries.find(id);
+        if (it == Entries.end()) {
+            return nullptr;
+        }
+        it->second.LastAccess = ++AccessCounter;
+        if (it->second.Model) {
+            return it->second.Model;
+        }
+        loadLock = it->second.LoadLock;
+    }
+
+    // concurrent requests to the model wait for one load, other models
+    // keep serving and loading meanwhile
+    std::lock_guard<std::mutex> loadGuard(*loadLock);
+    {
+        std::lock_guard<std::mutex> guard(Lock);
+        TEntry& entry = Entries[id];
+        if (entry.Model) {
+            return entry.Model;
+        }
+        modelFile = entry.ModelFile;
+    }
+    std::cerr << "[info] loading model " << id << " from " << modelFile << std::endl;
+    std::shared_ptr<TModel> model = LoadModel(modelFile);
+    if (!model) {
+        std::cerr << "[error] failed to load model " << modelFile << std::endl;
+        return nullptr;
+    }
+    std::lock_guard<std::mutex> guard(Lock);
+    TEntry& entry = Entries[id];
+    entry.Model = model;
+    entry.LastAccess = ++AccessCounter;
+    entry.Loads += 1;
+    Evict(id);
+    return model;
+}
+
+TModelPtr TModelRegistry::Reload(const std::string& id, const std::string& modelFile) {
+    std::shared_ptr<std::mutex> loadLock = GetLoadLock(id);
+    if (!loadLock) {
+        return nullptr;
+    }
+    std::lock_guard<std::mutex> loadGuard(*loadLock);
+    std::string fileToLoad = modelFile;
+    {
+        std::lock_guard<std::mutex> guard(Lock);
+        auto it = Entries.find(id);
+        if (it == Entries.end()) {
+            return nullptr;
+        }
+        if (fileToLoad.empty()) {
+            fileToLoad = it->second.ModelFile;
+        }
+    }
+    std::cerr << "[info] reloading model " << id << " from " << fileToLoad << std::endl;
+    uint64_t startTime = GetCurrentTimeMs();
+    // old model serves until new one is loaded (and, without background
+    // cache, until its .spell cache is built)
+    std::shared_ptr<TModel> model = LoadModel(fileToLoad);
+    if (!model) {
+        std::cerr << "[error] failed to reload model " << fileToLoad << ", keeping old one" << std::endl;
+        return nullptr;
+    }
+    std::lock_guard<std::mutex> guard(Lock);
+    TEntry& entry = Entries[id];
+    entry.ModelFile = fileToLoad;
+    entry.Model = model;
+    entry.LastAccess = ++AccessCounter;
+    entry.Loads += 1;
+    Evict(id);
+    std::cerr << "[info] model " << id << " reloaded in " << GetCurrentTimeMs() - startTime
+              << "ms, checksum " << model->CheckSum << std::endl;
+    return model;
+}
+
+void TModelRegistry::ReloadLoaded() {
+    std::vector<std::string> ids;
+    {
+        std::lock_guard<std::mutex> guard(Lock);
+        for (auto&& it: Entries) {
+            if (it.second.Model) {
+                ids.push_back(it.first);
+            }
+        }
+    }
+    for (auto&& id: ids) {
+        Reload(id);
+    }
+}
+
+nlohmann::json TModelRegistry::GetStatus() const {
+    std::lock_guard<std::mutex> guard(Lock);
+    nlohmann::json status;
+    uint64_t totalMemory = 0;
+    status["models"] = nlohmann::json::object();
+    for (auto&& it: Entries) {
+        const TEntry& entry = it.second;
+        nlohmann::json model;
+        model["file"] = entry.ModelFile;
+        model["loaded"] = bool(entry.Model);
+        model["loads"] = entry.Loads;
+        if (entry.Model) {
+            model["model_checksum"] = entry.Model->CheckSum;
+            TModelInfo info = entry.Model->Corrector.GetInfo();
+            model["memory_usage"] = info.TotalBytes();
+            model["cache_ready"] = entry.Model->Corrector.IsCacheReady();
+            model["info"] = ModelInfoToJson(info);
+            totalMemory += info.TotalBytes();
+        }
+        status["models"][it.first] = model;
+    }
+    status["memory_usage"] = totalMemory;
+    status["memory_budget"] = MemoryBudget;
+    status["evictions"] = Evictions;
+    return status;
+}
+
+std::shared_ptr<TModel> TModelRegistry::LoadModel(const std::string& modelFile) const {
+    std::shared_ptr<TModel> model = std::make_shared<TModel>();
+    model->Corrector.SetCacheDir(CacheDir);
+    if (!model->Corrector.LoadLangModel(modelFile, BackgroundCache)) {
+        return nullptr;
+    }
+    model->ModelFile = modelFile;
+    model->CheckSum = model->Corrector.GetLangModel().GetCheckSum();
+    return model;
+}
+
+void TModelRegistry::Evict(const std::string& keepId) {
+    if (MemoryBudget == 0) {
+        return;
+    }
+    while (true) {
+        uint64_t totalMemory = 0;
+        TEntry* oldest = nullptr;
+        std::string oldestId;
+        for (auto&& it: Entries) {
+            if (!it.second.Model) {
+                continue;
+            }
+            totalMemory += it.second.Model->Corrector.GetInfo().TotalBytes();
+            if (it.first != keepId && (!oldest || it.second.LastAccess < oldest->LastAccess)) {
+                oldest = &it.second;
+                oldestId = it.first;
+            }
+        }
+        if (totalMemory <= MemoryBudget || !oldest) {
+            return;
+        }
+        std::cerr << "[info] memory budget exceeded, unloading model " << oldestId << std::endl;
+        oldest->Model.reset();
+        Evictions += 1;
+    }
+}
+
+} // NJamSpell
@@ -0,0 +1,65 @@
+#pragma once
+
+#include <map>
+#include <memory>
+#include <mutex>
+#include <string>
+
+#include "jamspell/spell_corrector.hpp"
+#include "contrib/nlohmann/json.hpp"
+
+namespace NJamSpell {
+
+struct TModel {
+    TSpellCorrector Corrector;
+    std::string ModelFile;
+    uint64_t CheckSum = 0;
+};
+
+nlohmann::json ModelInfoToJson(const TModelInfo& info);
+
+using TModelPtr = std::shared_ptr<const TModel>;
+
+// Models by id, loaded on first request. When memory budget is exceeded
+// least recently used models are unloaded, memory is taken from TModelInfo
+// (without deletes filters while .spell cache is built in background). Requests keep a snapshot
+// returned by Get() until they finish, so an evicted or reloaded model
+// is freed when the last in-flight request releases it. With backgroundCache
+// every load (first, after eviction, reload) serves before .spell cache is
+// built. Loads of one model are serialized, different models load in parallel.
+class TModelRegistry {
+public:
+    TModelRegistry(const std::string& cacheDir, uint64_t memoryBudget, bool backgroundCache = false);
+    void Add(const std::string& id, const std::string& modelFile);
+    bool Has(const std::string& id) const;
+    // empty if there is no such model
+    std::string GetModelFile(const std::string& id) const;
+    // nullptr if model failed to load
+    TModelPtr Get(const std::string& id);
+    // loads model in calling thread, empty modelFile means current one;
+    // returns the new model, nullptr if it failed to load (old one stays)
+    TModelPtr Reload(const std::string& id, const std::string& modelFile = "");
+    void ReloadLoaded();
+    nlohmann::json GetStatus() const;
+private:
+    struct TEntry {
+        std::string ModelFile;
+        TModelPtr Model;
+        uint64_t LastAccess = 0;
+        size_t Loads = 0;
+        std::shared_ptr<std::mutex> LoadLock = std::make_shared<std::mutex>();
+    };
+    std::shared_ptr<TModel> LoadModel(const std::string& modelFile) const;
+    std::shared_ptr<std::mutex> GetLoadLock(const std::string& id);
+    void Evict(const std::string& keepId);
+private:
+    const std::string CacheDir;
+    const uint64_t MemoryBudget;
+    const bool BackgroundCache;
+    mutable std::mutex Lock;
+    std::map<std::string, TEntry> Entries;
+    uint64_t AccessCounter = 0;
+    size_t Evictions = 0;
+};
+
+} // NJamSpell
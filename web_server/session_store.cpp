@@ -0,0 +1,38 @@
+#include "session_store.hpp"
+
+namespace NJamSpell {
+
+TSessionStore::TSessionStore(size_t capacity)
+    : Capacity(capacity)
+{
+}
+
+TSessionPtr TSessionStore::Get(const std::string& id) {
+    if (Capacity == 0) {
+        return TSessionPtr();
+    }
+    std::lock_guard<std::mutex> guard(Lock);
+    TEntry& entry = Entries[id];
+    entry.LastAccess = ++AccessCounter;
+    if (entry.Session) {
+        return entry.Session;
+    }
+    entry.Session = std::make_shared<TSession>();
+    if (Entries.size() > Capacity) {
+        auto oldest = Entries.begin();
+        for (auto it = Entries.begin(); it != Entries.end(); ++it) {
+            if (it->second.LastAccess < oldest->second.LastAccess) {
+                oldest = it;
+            }
+        }
+        Entries.erase(oldest);
+    }
+    return entry.Session;
+}
+
+bool TSessionStore::Remove(const std::string& id) {
+    std::lock_guard<std::mutex> guard(Lock);
+    return Entries.erase(id) > 0;
+}
+
+} // NJamSpell
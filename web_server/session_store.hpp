@@ -0,0 +1,39 @@
+#pragma once
+
+#include <map>
+#include <memory>
+#include <mutex>
+#include <string>
+
+#include "jamspell/session.hpp"
+
+namespace NJamSpell {
+
+struct TSession {
+    std::mutex Lock;    // held while the session is used by a request
+    TCorrectionSession Session;
+};
+
+using TSessionPtr = std::shared_ptr<TSession>;
+
+// Correction sessions by client given id, created on first use. Above
+// capacity least recently used sessions are dropped.
+class TSessionStore {
+public:
+    explicit TSessionStore(size_t capacity);
+    // nullptr if sessions are disabled (zero capacity)
+    TSessionPtr Get(const std::string& id);
+    bool Remove(const std::string& id);
+private:
+    struct TEntry {
+        TSessionPtr Session;
+        uint64_t LastAccess = 0;
+    };
+private:
+    const size_t Capacity;
+    std::mutex Lock;
+    std::map<std::string, TEntry> Entries;
+    uint64_t AccessCounter = 0;
+};
+
+} // NJamSpell
@@ -0,0 +1,91 @@
+#include "slow_log.hpp"
+
+namespace NJamSpell {
+
+static const size_t MAX_TOKEN_CHARS = 64;
+
+TSlowLog::TSlowLog(size_t capacity, uint64_t thresholdMs, size_t maxTokens, const std::string& logFile)
+    : Capacity(capacity)
+    , ThresholdUs(thresholdMs * 1000)
+    , MaxTokens(maxTokens)
+{
+    if (!logFile.empty()) {
+        Log.open(logFile, std::ios::app);
+        if (!Log.is_open()) {
+            std::cerr << "[warning] failed to open slow log " << logFile << std::endl;
+        }
+    }
+}
+
+bool TSlowLog::IsSlow(uint64_t timeUs) const {
+    return Capacity > 0 && timeUs >= ThresholdUs;
+}
+
+void TSlowLog::Add(const std::string& path, uint64_t timeUs, size_t textLen, const TTrace& trace) {
+    TSlowRequest request;
+    request.Timestamp = GetCurrentTimeMs();
+    request.Path = path;
+    request.TimeUs = timeUs;
+    request.TextLen = textLen;
+    request.TokensTotal = trace.size();
+
+    std::vector<size_t> slowest(trace.size());
+    for (size_t i = 0; i < slowest.size(); ++i) {
+        slowest[i] = i;
+    }
+    if (slowest.size() > MaxTokens) {
+        std::nth_element(slowest.begin(), slowest.begin() + MaxTokens, slowest.end(), [&trace](size_t a, size_t b) {
+            return trace[a].TimeUs > trace[b].TimeUs;
+        });
+        slowest.resize(MaxTokens);
+        std::sort(slowest.begin(), slowest.end());
+    }
+    for (size_t i: slowest) {
+        const TWordTrace& t = trace[i];
+        nlohmann::json token;
+        token["token"] = WideToUTF8(std::wstring(t.Word.Ptr, std::min(t.Word.Len, MAX_TOKEN_CHARS)));
+        token["len"] = t.Word.Len;
+        token["generated"] = t.Generated;
+        token["scored"] = t.Scored;
+        token["time_us"] = t.TimeUs;
+        if (t.Degradation != DEGRADE_NONE) {
+            token["degraded"] = t.Degradation;
+        }
+        request.Tokens.push_back(token);
+    }
+
+    std::lock_guard<std::mutex> guard(Lock);
+    if (Log.is_open()) {
+        Log << ToJson(request).dump() << "\n";
+        Log.flush();
+    }
+    if (Requests.size() >= Capacity) {
+        Requests.pop_front();
+    }
+    Requests.push_back(std::move(request));
+}
+
+nlohmann::json TSlowLog::Dump() const {
+    nlohmann::json result;
+    result["threshold_ms"] = ThresholdUs / 1000;
+    result["capacity"] = Capacity;
+    result["requests"] = nlohmann::json::array();
+    std::lock_guard<std::mutex> guard(Lock);
+    for (auto it = Requests.rbegin(); it != Requests.rend(); ++it) {
+        result["requests"].push_back(ToJson(*it));
+    }
+    return result;
+}
+
+nlohmann::json TSlowLog::ToJson(const TSlowRequest& request) {
+    nlohmann::json result;
+    result["timestamp"] = request.Timestamp;
+    result["path"] = request.Path;
+    result["time_us"] = request.TimeUs;
+    result["text_len"] = request.TextLen;
+    result["tokens_total"] = request.TokensTotal;
+    result["tokens"] = request.Tokens;
+    return result;
+}
+
+} // NJamSpell
@@ -0,0 +1,44 @@
+#pragma once
+
+#include <algorithm>
+#include <deque>
+#include <fstream>
+#include <mutex>
+#include <string>
+
+#include "jamspell/spell_corrector.hpp"
+#include "contrib/nlohmann/json.hpp"
+
+namespace NJamSpell {
+
+struct TSlowRequest {
+    uint64_t Timestamp = 0;
+    std::string Path;
+    uint64_t TimeUs = 0;
+    size_t TextLen = 0;
+    size_t TokensTotal = 0;
+    nlohmann::json Tokens = nlohmann::json::array();
+};
+
+// Keeps last capacity slow requests. Only maxTokens slowest tokens of each
+// are kept (in text order) and token text is cut to 64 characters, so
+// memory does not depend on size of requests.
+
+class TSlowLog {
+public:
+    TSlowLog(size_t capacity, uint64_t thresholdMs, size_t maxTokens, const std::string& logFile);
+    bool IsSlow(uint64_t timeUs) const;
+    void Add(const std::string& path, uint64_t timeUs, size_t textLen, const TTrace& trace);
+    nlohmann::json Dump() const;
+private:
+    static nlohmann::json ToJson(const TSlowRequest& request);
+private:
+    const size_t Capacity;
+    const uint64_t ThresholdUs;
+    const size_t MaxTokens;
+    mutable std::mutex Lock;
+    std::deque<TSlowRequest> Requests;
+    std::ofstream Log;
+};
+
+} // NJamSpell